@@ -0,0 +1,183 @@
+""" model registry """
+import glob
+import os
+import threading
+import time
+
+import joblib
+
+
+class ModelRegistry:
+    """
+    Lazily loads the serving model and hot-swaps it when a newer artifact appears.
+
+    The model is only unpickled on the first call to `get`, so gunicorn workers boot
+    without paying the load cost. Pickled artifacts (the `.pkl` files `SalesModel.save_model`
+    writes) are opened with `joblib.load(mmap_mode='r')`, but this does not share memory
+    for forests: sklearn copies the node arrays of every tree while unpickling, so each
+    worker holds a private copy of the whole model. Memory is only shared between workers
+    by starting gunicorn with `--preload` and calling `preload()` at import time (the
+    unpickled objects are then shared copy-on-write), or by serving the memory-mapped
+    `.forest` or `.zoo` formats below, whose node arrays live in the OS page cache once.
+
+    Files ending in `.npz` are loaded as a compiled `FlatForest` (see
+    `SalesModel.export_compiled_model`), which predicts without sklearn's per-call overhead.
+    Files ending in `.forest` are compact compiled forests (see `SalesModel.export_compact_model`),
+    memory-mapped rather than read, so loading them is nearly free.
+    Files ending in `.zoo` are per-store model zoos (see `SalesModel.export_model_zoo`); they
+    are memory-mapped and only the forests of the stores being predicted are read.
+    Files ending in `.fcst` are materialized forecast tables (see
+    `SalesModel.materialize_forecasts`), served by lookup instead of prediction.
+    A `FeatureTransformer` saved next to the model (`sales_transformer_<timestamp>.json`)
+    is loaded and swapped together with it.
+
+    When `model_dir` is set, the newest `sales_model_<timestamp>.pkl` in that directory
+    is served. Every `check_interval` seconds the registry looks for a newer file (or a
+    change to the current one), loads it on the request that notices it while other
+    threads keep using the old model, and swaps it in with a single reference
+    assignment, so requests never see a half-loaded model and no restart is needed.
+
+    Attributes
+    ----------
+    model_path : str
+        Fixed model file used when `model_dir` is not set.
+    model_dir : str or None
+        Directory scanned for timestamped model files.
+    pattern : str
+        Glob pattern for timestamped model files inside `model_dir`.
+    check_interval : float
+        Minimum number of seconds between checks for a newer artifact.
+    """
+
+    def __init__(self, model_path='model.pkl', model_dir=None, pattern='sales_model_*.pkl',
+                 check_interval=30.0, mmap_mode='r'):
+        self.model_path = model_path
+        self.model_dir = model_dir
+        self.pattern = pattern
+        self.check_interval = check_interval
+        self.mmap_mode = mmap_mode
+
+        # (version, model, transformer) is swapped as one tuple so readers always see a consistent set
+        self._current = None
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+        # Number of artifacts loaded and the duration of the last load, for monitoring
+        self.loads = 0
+        self.load_seconds = None
+
+    @classmethod
+    def from_env(cls, base_dir='.'):
+        """
+        Builds a registry from the MODEL_PATH, MODEL_DIR, MODEL_PATTERN and
+        MODEL_CHECK_INTERVAL environment variables. Relative paths are resolved
+        against `base_dir`.
+        """
+        model_dir = os.environ.get('MODEL_DIR')
+        return cls(
+            model_path=os.path.join(base_dir, os.environ.get('MODEL_PATH', 'model.pkl')),
+            model_dir=os.path.join(base_dir, model_dir) if model_dir else None,
+            pattern=os.environ.get('MODEL_PATTERN', 'sales_model_*.pkl'),
+            check_interval=float(os.environ.get('MODEL_CHECK_INTERVAL', 30.0)),
+        )
+
+    def resolve_path(self):
+        """Returns the artifact that should currently be served."""
+        if self.model_dir is None:
+            return self.model_path
+
+        # Timestamps are formatted "%Y-%m-%d-%H-%M-%S", so name order is time order
+        candidates = sorted(glob.glob(os.path.join(self.model_dir, self.pattern)))
+        if not candidates:
+            raise FileNotFoundError(f"No model matching '{self.pattern}' in {self.model_dir}")
+        return candidates[-1]
+
+    def _version_of(self, path):
+        stat = os.stat(path)
+        return (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+
+    def _load(self, path):
+        if path.endswith('.npz'):
+            from forest_compiler import FlatForest
+            model = FlatForest.load(path)
+        elif path.endswith('.forest'):
+            from forest_compiler import FlatForest
+            model = FlatForest.load_mapped(path)
+        elif path.endswith('.zoo'):
+            from model_zoo import ModelZoo
+            model = ModelZoo.load(path)
+        elif path.endswith('.fcst'):
+            from forecast_table import ForecastTable
+            model = ForecastTable.load(path)
+        else:
+            model = joblib.load(path, mmap_mode=self.mmap_mode)
+
+        try:
+            from feature_transformer import FeatureTransformer
+        except ImportError:  # The scripts directory is not deployed: serve encoded features only
+            return model, None
+        transformer_path = FeatureTransformer.path_for_model(path)
+        transformer = FeatureTransformer.load(transformer_path) if os.path.exists(transformer_path) else None
+        return model, transformer
+
+    def _entry(self):
+        """Returns the current (version, model, transformer), loading or swapping it first if needed."""
+        current = self._current
+        now = time.monotonic()
+        if current is not None and now - self._last_check < self.check_interval:
+            return current
+
+        # Only one thread loads; others keep serving the current model meanwhile
+        if current is not None and not self._lock.acquire(blocking=False):
+            return current
+        if current is None:
+            self._lock.acquire()
+
+        try:
+            current = self._current
+            self._last_check = time.monotonic()
+            try:
+                path = self.resolve_path()
+                version = self._version_of(path)
+                if current is None or current[0] != version:
+                    start = time.perf_counter()
+                    self._current = (version, *self._load(path))
+                    self.load_seconds = time.perf_counter() - start
+                    self.loads += 1
+            except Exception:
+                if current is None:
+                    raise
+                # Keep serving the previous model if the new artifact cannot be read
+            return self._current
+        finally:
+            self._lock.release()
+
+    def get(self):
+        """Returns the current model, loading or swapping it first if needed."""
+        return self._entry()[1]
+
+    def get_with_transformer(self):
+        """Returns the current model and the FeatureTransformer saved with it (or None) as a pair."""
+        _, model, transformer = self._entry()
+        return model, transformer
+
+    def current(self):
+        """
+        Returns (version, model, transformer) as one consistent snapshot, e.g. to cache
+        predictions under the version of the model that made them.
+        """
+        return self._entry()
+
+    def preload(self):
+        """Loads the model eagerly, e.g. in the gunicorn master when using --preload."""
+        self.get()
+
+    def reload(self):
+        """Forces a check for a newer artifact on the next call to `get`."""
+        self._last_check = 0.0
+        return self.get()
+
+    @property
+    def version(self):
+        """(path, mtime_ns, size) of the loaded artifact, or None before the first load."""
+        current = self._current
+        return current[0] if current is not None else None
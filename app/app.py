@@ -1,65 +1,240 @@
-from flask import Flask, render_template, request
-import pickle
+from flask import Flask, render_template, request, jsonify, g
+import os, sys, time
 import numpy as np
+import pandas as pd
+from model_registry import ModelRegistry
+from prediction_cache import PredictionCache
+from micro_batcher import MicroBatcher
+from serving_metrics import ServingMetrics
+# Add the 'scripts' directory to the Python path for shared training/serving modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'scripts')))
 
 app = Flask(__name__)
 
-# Load the machine learning model
-with open('model.pkl', 'rb') as model_file:
-    model = pickle.load(model_file)
+# The model is loaded lazily on first request and hot-swapped when a newer artifact appears
+registry = ModelRegistry.from_env(base_dir=os.path.dirname(os.path.abspath(__file__)))
+if os.environ.get('MODEL_PRELOAD') == '1':
+    registry.preload()
+
+# Per-stage latency, request, batch and model metrics, merged across workers at /metrics
+metrics = ServingMetrics.from_env()
+
+# Predictions of repeated feature vectors are served from a cache shared by all workers
+# (PREDICTION_CACHE=1); the file is scoped to this app's models
+prediction_cache = PredictionCache.from_env(namespace=registry.model_dir or registry.model_path)
+
+# Concurrent requests of a threaded worker are coalesced into one predict call (MICRO_BATCH=1)
+micro_batcher = MicroBatcher.from_env()
+
+# Materialized forecasts of the known horizon (see SalesModel.materialize_forecasts), hot-swapped like the model
+forecast_dir = os.environ.get('FORECAST_DIR')
+forecasts = ModelRegistry(
+    model_dir=os.path.join(os.path.dirname(os.path.abspath(__file__)), forecast_dir),
+    pattern='sales_forecast_*.fcst',
+    check_interval=float(os.environ.get('MODEL_CHECK_INTERVAL', 30.0)),
+) if forecast_dir else None
+
+# Fields that only identify a forecast cell; a row with any other field is a what-if input
+LOOKUP_FIELDS = ['Id', 'Store', 'Date']
+
+# Feature order expected by the model (see model.py)
+FEATURE_COLUMNS = ['Store', 'DayOfWeek', 'Customers', 'Open', 'Promo', 'StateHoliday',
+                   'SchoolHoliday', 'StoreType', 'Assortment', 'CompetitionDistance',
+                   'CompetitionOpenSinceMonth', 'CompetitionOpenSinceYear', 'Promo2',
+                   'Promo2SinceWeek', 'Promo2SinceYear', 'PromoInterval', 'Day',
+                   'WeekOfYear', 'Month', 'Year', 'IsWeekend', 'IsBeginningOfMonth',
+                   'IsMidMonth', 'IsEndOfMonth']
+
+
+def build_feature_matrix(payload, transformer=None):
+    """
+    Converts a JSON payload into a float feature matrix for the model.
+
+    The payload may be a list of row objects, an object with a 'rows' list, or an
+    object of equal-length column lists. The whole batch is converted in one step.
+    If the model was saved with a FeatureTransformer and the rows carry a 'Date',
+    they are treated as raw store-day rows and transformed exactly like the training
+    data; otherwise the 24 already-encoded FEATURE_COLUMNS are expected.
+    """
+    if isinstance(payload, dict) and 'rows' in payload:
+        payload = payload['rows']
+    if not payload:
+        raise ValueError('No rows provided.')
+
+    frame = pd.DataFrame(payload)
+    if transformer is not None and 'Date' in frame.columns:
+        try:
+            return transformer.transform_features(frame)
+        except KeyError as e:
+            raise ValueError(f'Missing column: {e}')
+
+    missing = [col for col in FEATURE_COLUMNS if col not in frame.columns]
+    if missing:
+        raise ValueError(f'Missing feature columns: {missing}')
+
+    return frame[FEATURE_COLUMNS].to_numpy(dtype=np.float64)
+
+
+def predict(input_features, model=None, version=None):
+    """Predicts with the current model (or the given one), through the prediction cache and micro-batcher if enabled."""
+    if model is None:
+        version, model, _ = registry.current()
+    if micro_batcher is not None:
+        model = micro_batcher.bind(model)
+    metrics.observe_batch(len(input_features))
+    with metrics.stage('predict'):
+        if prediction_cache is None:
+            return model.predict(input_features)
+        return prediction_cache.predict(model, input_features, version)
+
+@app.before_request
+def start_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def record_request(response):
+    metrics.observe_request(request.endpoint or 'unknown', response.status_code,
+                            time.perf_counter() - g.request_start)
+    metrics.observe_model(registry)
+    return response
 
 @app.route('/', methods=['GET', 'POST'])
 def index():
     if request.method == 'POST':
-        # Get form data
-        store = int(request.form['Store'])
-        day_of_week = int(request.form['DayOfWeek'])
-        customers = int(request.form['Customers'])
-        open_store = int(request.form['Open'])
-        promo = int(request.form['Promo'])
-        state_holiday = int(request.form['StateHoliday'])
-        school_holiday = int(request.form['SchoolHoliday'])
-        store_type = int(request.form['StoreType'])
-        assortment = int(request.form['Assortment'])
-        competition_distance = float(request.form['CompetitionDistance'])
-        competition_open_since_month = int(request.form['CompetitionOpenSinceMonth'])
-        competition_open_since_year = int(request.form['CompetitionOpenSinceYear'])
-        promo2 = int(request.form['Promo2'])
-        promo2_since_week = int(request.form['Promo2SinceWeek'])
-        promo2_since_year = int(request.form['Promo2SinceYear'])
-        promo_interval = int(request.form['PromoInterval'])
-        day = int(request.form['Day'])
-        week_of_year = int(request.form['WeekOfYear'])
-        month = int(request.form['Month'])
-        year = int(request.form['Year'])
-        is_weekend = int(request.form['IsWeekend'])
-        is_beginning_of_month = int(request.form['IsBeginningOfMonth'])
-        is_mid_month = int(request.form['IsMidMonth'])
-        is_end_of_month = int(request.form['IsEndOfMonth'])
+        with metrics.stage('parse'):
+            # Get form data
+            store = int(request.form['Store'])
+            day_of_week = int(request.form['DayOfWeek'])
+            customers = int(request.form['Customers'])
+            open_store = int(request.form['Open'])
+            promo = int(request.form['Promo'])
+            state_holiday = int(request.form['StateHoliday'])
+            school_holiday = int(request.form['SchoolHoliday'])
+            store_type = int(request.form['StoreType'])
+            assortment = int(request.form['Assortment'])
+            competition_distance = float(request.form['CompetitionDistance'])
+            competition_open_since_month = int(request.form['CompetitionOpenSinceMonth'])
+            competition_open_since_year = int(request.form['CompetitionOpenSinceYear'])
+            promo2 = int(request.form['Promo2'])
+            promo2_since_week = int(request.form['Promo2SinceWeek'])
+            promo2_since_year = int(request.form['Promo2SinceYear'])
+            promo_interval = int(request.form['PromoInterval'])
+            day = int(request.form['Day'])
+            week_of_year = int(request.form['WeekOfYear'])
+            month = int(request.form['Month'])
+            year = int(request.form['Year'])
+            is_weekend = int(request.form['IsWeekend'])
+            is_beginning_of_month = int(request.form['IsBeginningOfMonth'])
+            is_mid_month = int(request.form['IsMidMonth'])
+            is_end_of_month = int(request.form['IsEndOfMonth'])
 
         # Prepare input for the model
-        input_features = np.array([[store, day_of_week, customers, open_store, promo, state_holiday,
-                                    school_holiday, store_type, assortment, competition_distance,
-                                    competition_open_since_month, competition_open_since_year, promo2,
-                                    promo2_since_week, promo2_since_year, promo_interval, day,
-                                    week_of_year, month, year, is_weekend, is_beginning_of_month,
-                                    is_mid_month, is_end_of_month]])
+        with metrics.stage('features'):
+            input_features = np.array([[store, day_of_week, customers, open_store, promo, state_holiday,
+                                        school_holiday, store_type, assortment, competition_distance,
+                                        competition_open_since_month, competition_open_since_year, promo2,
+                                        promo2_since_week, promo2_since_year, promo_interval, day,
+                                        week_of_year, month, year, is_weekend, is_beginning_of_month,
+                                        is_mid_month, is_end_of_month]])
 
         # Make prediction
-        prediction = model.predict(input_features)[0]
+        prediction = predict(input_features)[0]
 
         # Render the result.html template
-        return render_template('result.html', store=store, day_of_week=day_of_week, customers=customers,
-                               open_store=open_store, promo=promo, state_holiday=state_holiday,
-                               school_holiday=school_holiday, store_type=store_type, assortment=assortment,
-                               competition_distance=competition_distance, competition_open_since_month=competition_open_since_month,
-                               competition_open_since_year=competition_open_since_year, promo2=promo2,
-                               promo2_since_week=promo2_since_week, promo2_since_year=promo2_since_year,
-                               promo_interval=promo_interval, day=day, week_of_year=week_of_year, month=month,
-                               year=year, is_weekend=is_weekend, is_beginning_of_month=is_beginning_of_month,
-                               is_mid_month=is_mid_month, is_end_of_month=is_end_of_month, prediction=prediction)
+        with metrics.stage('render'):
+            return render_template('result.html', store=store, day_of_week=day_of_week, customers=customers,
+                                   open_store=open_store, promo=promo, state_holiday=state_holiday,
+                                   school_holiday=school_holiday, store_type=store_type, assortment=assortment,
+                                   competition_distance=competition_distance, competition_open_since_month=competition_open_since_month,
+                                   competition_open_since_year=competition_open_since_year, promo2=promo2,
+                                   promo2_since_week=promo2_since_week, promo2_since_year=promo2_since_year,
+                                   promo_interval=promo_interval, day=day, week_of_year=week_of_year, month=month,
+                                   year=year, is_weekend=is_weekend, is_beginning_of_month=is_beginning_of_month,
+                                   is_mid_month=is_mid_month, is_end_of_month=is_end_of_month, prediction=prediction)
 
     return render_template('index.html')
 
+@app.route('/predict/batch', methods=['POST'])
+def predict_batch():
+    """Scores many store-day rows with a single model.predict call."""
+    with metrics.stage('parse'):
+        payload = request.get_json(silent=True)
+    if payload is None:
+        return jsonify({'error': 'Request body must be JSON.'}), 400
+
+    version, model, transformer = registry.current()
+    try:
+        with metrics.stage('features'):
+            input_features = build_feature_matrix(payload, transformer)
+    except (ValueError, TypeError) as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        predictions = predict(input_features, model, version)
+    except ValueError as e:  # e.g. a store without a model in a per-store zoo
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'count': len(predictions), 'predictions': predictions.tolist()})
+
+@app.route('/forecast', methods=['GET', 'POST'])
+def forecast():
+    """
+    Serves forecasts of the materialized grid by (Store, Date) with a table lookup, e.g.
+    GET /forecast?store=1&date=2015-08-01 or a POST of such rows. Rows carrying any other
+    field are what-if inputs and are predicted live, like /predict/batch.
+    """
+    if request.method == 'GET':
+        payload = [{'Store': request.args.get('store'), 'Date': request.args.get('date')}]
+    else:
+        payload = request.get_json(silent=True)
+        if isinstance(payload, dict) and 'rows' in payload:
+            payload = payload['rows']
+    if not payload or not isinstance(payload, list):
+        return jsonify({'error': 'Provide store and date, or a JSON list of rows.'}), 400
+
+    frame = pd.DataFrame(payload)
+    what_if = frame.drop(columns=LOOKUP_FIELDS, errors='ignore').notna().any(axis=1).to_numpy()
+    predictions = np.full(len(frame), np.nan)
+
+    lookups = frame[~what_if]
+    if len(lookups):
+        if 'Store' not in lookups.columns or 'Date' not in lookups.columns:
+            return jsonify({'error': 'Lookup rows need Store and Date.'}), 400
+        if forecasts is None:
+            return jsonify({'error': 'No forecast table is configured.'}), 404
+        try:
+            with metrics.stage('lookup'):
+                predictions[~what_if] = forecasts.get().lookup(lookups['Store'].astype(int), lookups['Date'])
+        except (ValueError, TypeError) as e:
+            return jsonify({'error': str(e)}), 400
+        unknown = lookups[np.isnan(predictions[~what_if])]
+        if len(unknown):
+            cells = unknown[['Store', 'Date']].astype(str).to_dict('records')
+            return jsonify({'error': 'No forecast for these cells; send their features for a live prediction.',
+                            'cells': cells}), 404
+
+    if what_if.any():
+        version, model, transformer = registry.current()
+        try:
+            with metrics.stage('features'):
+                input_features = build_feature_matrix(frame[what_if].to_dict('records'), transformer)
+            predictions[what_if] = predict(input_features, model, version)
+        except (ValueError, TypeError) as e:
+            return jsonify({'error': str(e)}), 400
+
+    return jsonify({'count': len(predictions), 'predictions': predictions.tolist(),
+                    'source': np.where(what_if, 'live', 'table').tolist()})
+
+@app.route('/cache/stats', methods=['GET'])
+def cache_stats():
+    """Hit/miss counters of the prediction cache, across all workers."""
+    if prediction_cache is None:
+        return jsonify({'enabled': False})
+    return jsonify({'enabled': True, **prediction_cache.stats()})
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Prometheus text exposition of the metrics of all workers."""
+    return metrics.render(), 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+
 if __name__ == '__main__':
     app.run(debug=True)
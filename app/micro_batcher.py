@@ -0,0 +1,164 @@
+""" micro batcher """
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent predictions into one vectorized `model.predict` call.
+
+    Request threads put their rows on a queue and wait; a single dispatcher thread takes
+    everything queued, waits up to `max_wait` seconds for callers that have submitted a
+    request it has not taken yet (never for requests that have not arrived, nor for
+    callers whose request was already answered or abandoned), stops at `max_batch_size` rows,
+    runs one `predict` per model over the stacked rows and hands every caller its own
+    slice. A lone request is therefore dispatched at once, while under load each
+    forest traversal is shared by many requests.
+
+    Batching needs concurrent requests in one process, i.e. threaded workers such as
+    `gunicorn --worker-class gthread --threads 8`. If a batch fails (e.g. one row is a
+    store without a model in a per-store zoo), its requests are retried one by one, so
+    each caller gets its own result or error.
+
+    Attributes
+    ----------
+    max_batch_size : int
+        Largest number of rows per predict call.
+    max_wait : float
+        Longest time, in seconds, a batch waits for callers that are in flight.
+    """
+
+    def __init__(self, max_batch_size=64, max_wait=0.005):
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._queue = queue.Queue()
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self.batches = 0
+        self.rows = 0
+
+    @classmethod
+    def from_env(cls):
+        """
+        Builds a batcher from MICRO_BATCH_MAX_SIZE and MICRO_BATCH_MAX_WAIT_MS when
+        MICRO_BATCH is '1'; returns None otherwise.
+        """
+        if os.environ.get('MICRO_BATCH') != '1':
+            return None
+        return cls(
+            max_batch_size=int(os.environ.get('MICRO_BATCH_MAX_SIZE', 64)),
+            max_wait=float(os.environ.get('MICRO_BATCH_MAX_WAIT_MS', 5.0)) / 1000,
+        )
+
+    def _ensure_thread(self):
+        # Threads do not survive a fork: each gunicorn worker starts its own dispatcher
+        if self._thread is None or self._pid != os.getpid():
+            with self._lock:
+                if self._thread is None or self._pid != os.getpid():
+                    self._queue = queue.Queue()
+                    self._in_flight = 0
+                    self._thread = threading.Thread(target=self._run, name='micro-batcher', daemon=True)
+                    self._thread.start()
+                    self._pid = os.getpid()
+
+    def predict(self, model, features):
+        """Predicts `features` with `model` as part of the next batch; blocks until done."""
+        self._ensure_thread()
+        features = np.array(features, dtype=np.float64, ndmin=2)
+        future = Future()
+        # Counts requests submitted but not yet taken by the dispatcher
+        with self._lock:
+            self._in_flight += 1
+        try:
+            self._queue.put((model, features, future))
+            return future.result()
+        finally:
+            # A request the dispatcher never took (the put or the wait was interrupted) is
+            # cancelled, so it is skipped if it is still queued and no longer counted
+            with self._lock:
+                if future.cancel():
+                    self._in_flight -= 1
+
+    def bind(self, model):
+        """Returns an object whose `predict` goes through the batcher, e.g. for PredictionCache.predict."""
+        return _BatchedModel(self, model)
+
+    def _take(self, request):
+        # Claims a queued request; False if its caller has already given up on it
+        with self._lock:
+            if not request[2].set_running_or_notify_cancel():
+                return False
+            self._in_flight -= 1
+            return True
+
+    def _collect(self):
+        request = self._queue.get()
+        while not self._take(request):
+            request = self._queue.get()
+        batch = [request]
+        rows = len(request[1])
+        deadline = time.monotonic() + self.max_wait
+        while rows < self.max_batch_size:
+            try:
+                request = self._queue.get_nowait()
+            except queue.Empty:
+                # Only wait for callers that are already in flight
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or self._in_flight <= 0:
+                    break
+                try:
+                    request = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+            if not self._take(request):
+                continue
+            batch.append(request)
+            rows += len(request[1])
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            # Requests may hold different models while one is being hot-swapped
+            by_model = {}
+            for request in batch:
+                by_model.setdefault(id(request[0]), []).append(request)
+            for requests in by_model.values():
+                self._dispatch(requests)
+
+    def _dispatch(self, requests):
+        model = requests[0][0]
+        try:
+            predictions = np.asarray(model.predict(np.vstack([features for _, features, _ in requests])))
+        except Exception:
+            for _, features, future in requests:
+                try:
+                    future.set_result(np.asarray(model.predict(features)))
+                except Exception as e:
+                    future.set_exception(e)
+            return
+
+        self.batches += 1
+        self.rows += len(predictions)
+        offset = 0
+        for _, features, future in requests:
+            future.set_result(predictions[offset:offset + len(features)])
+            offset += len(features)
+
+
+class _BatchedModel:
+    """A model whose `predict` calls go through a MicroBatcher."""
+
+    def __init__(self, batcher, model):
+        self._batcher = batcher
+        self._model = model
+
+    def predict(self, features):
+        return self._batcher.predict(self._model, features)
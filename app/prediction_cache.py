@@ -0,0 +1,253 @@
+""" prediction cache """
+import atexit
+import hashlib
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+# SQLite limits the number of bound parameters per statement
+_BATCH = 500
+
+
+class PredictionCache:
+    """
+    Bounded cache of model predictions, shared by every worker process on the host.
+
+    Entries live in a local SQLite file (WAL mode, so readers never block each other),
+    which stands in for a shared cache service: all gunicorn workers open the same file
+    and see each other's predictions. The default file name includes a hash of
+    `namespace` (the app passes its model location), so other apps and deployments on
+    the host, which may serve other models, get their own file. The key of a row is a
+    hash of its feature vector, canonicalized to float64 with -0.0 and NaN normalized,
+    together with the model version. A new model therefore never serves predictions of
+    the previous one, and the first worker that sees a new version deletes the old
+    entries.
+
+    Entries expire `ttl` seconds after they were written. When the cache holds more
+    than `max_entries`, the least recently used entries are evicted. The size is only
+    checked after every `max_entries // 100` rows a worker writes, so the cache can
+    briefly exceed its bound by about 1% per worker instead of counting the table on
+    every write. Hits, misses and evictions are counted in the same file, so `stats`
+    covers all workers.
+
+    A cache hit takes no SQLite write lock, so hits in different workers never wait for
+    each other: counters are accumulated in memory and added to the file at most every
+    `stats_interval` seconds (and at exit), and an entry's last-use time, which drives
+    LRU eviction, is only refreshed once it is older than `ttl / 10`. Any SQLite error
+    (e.g. a locked or unwritable file) degrades to a miss, never a failed request.
+
+    Attributes
+    ----------
+    path : str
+        SQLite file of the cache.
+    max_entries : int
+        Entries kept before the least recently used ones are evicted.
+    ttl : float
+        Seconds an entry stays valid.
+    stats_interval : float
+        Seconds between writes of this worker's counters to the file.
+    namespace : str
+        Identity of the app, e.g. its model directory; names the default file.
+    """
+
+    def __init__(self, path=None, max_entries=100_000, ttl=3600.0, stats_interval=5.0, namespace=''):
+        if path is None:
+            suffix = hashlib.blake2b(str(namespace).encode(), digest_size=8).hexdigest()
+            path = os.path.join(tempfile.gettempdir(), f'sales_prediction_cache_{suffix}.sqlite')
+        self.path = path
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._local = threading.local()
+        self._version = None
+        # Rows written by this process since the size was last checked
+        self._unchecked_rows = 0
+        self._check_rows = max(1, max_entries // 100)
+        # Hits, misses and evictions not yet written to the stats table
+        self.stats_interval = stats_interval
+        self._counts = {}
+        self._counts_pid = os.getpid()
+        self._counts_lock = threading.Lock()
+        self._last_stats_flush = time.monotonic()
+        atexit.register(self._flush_counts)
+
+    @classmethod
+    def from_env(cls, namespace=''):
+        """
+        Builds a cache from the PREDICTION_CACHE_PATH, PREDICTION_CACHE_SIZE and
+        PREDICTION_CACHE_TTL environment variables when PREDICTION_CACHE is '1';
+        returns None otherwise. Without PREDICTION_CACHE_PATH the file is named after
+        `namespace`.
+        """
+        if os.environ.get('PREDICTION_CACHE') != '1':
+            return None
+        return cls(
+            path=os.environ.get('PREDICTION_CACHE_PATH'),
+            max_entries=int(os.environ.get('PREDICTION_CACHE_SIZE', 100_000)),
+            ttl=float(os.environ.get('PREDICTION_CACHE_TTL', 3600.0)),
+            namespace=namespace,
+        )
+
+    def _connection(self):
+        # One connection per thread and process: SQLite connections must not cross a fork
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=1.0, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute('CREATE TABLE IF NOT EXISTS predictions ('
+                               'key BLOB PRIMARY KEY, version TEXT, value REAL, expires REAL, used REAL)')
+            connection.execute('CREATE INDEX IF NOT EXISTS predictions_used ON predictions (used)')
+            connection.execute('CREATE INDEX IF NOT EXISTS predictions_expires ON predictions (expires)')
+            connection.execute('CREATE TABLE IF NOT EXISTS stats (name TEXT PRIMARY KEY, value INTEGER)')
+            self._local.connection, self._local.pid = connection, os.getpid()
+        return connection
+
+    @staticmethod
+    def keys(features, version):
+        """Returns the cache key of every row of `features` for the model `version`."""
+        features = np.array(features, dtype=np.float64, ndmin=2)
+        # -0.0 becomes 0.0 and every NaN the same NaN, so equal inputs hash equally
+        features = np.where(np.isnan(features), np.nan, features + 0.0)
+        prefix = str(version).encode()
+        return [hashlib.blake2b(prefix + row.tobytes(), digest_size=16).digest() for row in features]
+
+    def _count(self, **counts):
+        """Adds to this worker's counters, writing them to the file if `stats_interval` has passed."""
+        with self._counts_lock:
+            if self._counts_pid != os.getpid():
+                # Counts inherited through a fork belong to the parent
+                self._counts, self._counts_pid = {}, os.getpid()
+            for name, count in counts.items():
+                self._counts[name] = self._counts.get(name, 0) + count
+            due = time.monotonic() - self._last_stats_flush >= self.stats_interval
+        if due:
+            self._flush_counts()
+
+    def _flush_counts(self):
+        with self._counts_lock:
+            if self._counts_pid != os.getpid():
+                self._counts, self._counts_pid = {}, os.getpid()
+            counts, self._counts = self._counts, {}
+            self._last_stats_flush = time.monotonic()
+        rows = [(name, count) for name, count in counts.items() if count]
+        if not rows:
+            return
+        try:
+            self._connection().executemany('INSERT INTO stats (name, value) VALUES (?, ?) '
+                                           'ON CONFLICT (name) DO UPDATE SET value = value + excluded.value', rows)
+        except sqlite3.Error:
+            # Keep the counts for the next attempt
+            with self._counts_lock:
+                for name, count in rows:
+                    self._counts[name] = self._counts.get(name, 0) + count
+
+    def _check_version(self, connection, version):
+        version = str(version)
+        if version != self._version:
+            connection.execute('DELETE FROM predictions WHERE version != ?', (version,))
+            self._version = version
+
+    def get_many(self, keys, version):
+        """
+        Looks up `keys`; returns the cached values (NaN where missing) and the miss mask.
+        """
+        values = np.full(len(keys), np.nan)
+        found = {}
+        now = time.time()
+        try:
+            connection = self._connection()
+            self._check_version(connection, version)
+            for start in range(0, len(keys), _BATCH):
+                batch = keys[start:start + _BATCH]
+                marks = ','.join('?' * len(batch))
+                rows = connection.execute(
+                    f'SELECT key, value, used FROM predictions WHERE key IN ({marks}) AND expires > ?',
+                    (*batch, now)).fetchall()
+                found.update((key, value) for key, value, _ in rows)
+                # Refreshing the last-use time needs the write lock, so only do it when it is stale
+                stale = [key for key, _, used in rows if used < now - self.ttl / 10]
+                if stale:
+                    marks = ','.join('?' * len(stale))
+                    connection.execute(f'UPDATE predictions SET used = ? WHERE key IN ({marks})', (now, *stale))
+        except sqlite3.Error:
+            found = {}
+
+        hits = np.array([key in found for key in keys], dtype=bool)
+        if hits.any():
+            values[hits] = [found[key] for key, hit in zip(keys, hits) if hit]
+        self._count(hits=int(hits.sum()), misses=int((~hits).sum()))
+        return values, ~hits
+
+    def put_many(self, keys, values, version):
+        """
+        Stores `values` under `keys`; every `max_entries // 100` rows, evicts the expired and
+        then the least recently used entries beyond `max_entries`.
+        """
+        now = time.time()
+        rows = [(key, str(version), float(value), now + self.ttl, now) for key, value in zip(keys, values)]
+        try:
+            connection = self._connection()
+            connection.executemany('INSERT OR REPLACE INTO predictions VALUES (?, ?, ?, ?, ?)', rows)
+            self._unchecked_rows += len(rows)
+            if self._unchecked_rows < self._check_rows:
+                return
+            self._unchecked_rows = 0
+            excess = connection.execute('SELECT COUNT(*) FROM predictions').fetchone()[0] - self.max_entries
+            if excess > 0:
+                # Expired entries go first, then the least recently used ones
+                excess -= connection.execute('DELETE FROM predictions WHERE expires <= ?', (now,)).rowcount
+            if excess > 0:
+                connection.execute('DELETE FROM predictions WHERE key IN '
+                                   '(SELECT key FROM predictions ORDER BY used LIMIT ?)', (excess,))
+                self._count(evictions=excess)
+        except sqlite3.Error:
+            pass
+
+    def predict(self, model, features, version):
+        """
+        Returns `model.predict(features)`, serving cached rows from the cache and only
+        predicting (and then caching) the rows that miss.
+        """
+        keys = self.keys(features, version)
+        values, missing = self.get_many(keys, version)
+        if missing.any():
+            predictions = model.predict(np.asarray(features, dtype=np.float64)[missing])
+            values[missing] = predictions
+            self.put_many([key for key, miss in zip(keys, missing) if miss], predictions, version)
+        return values
+
+    def stats(self):
+        """
+        Hits, misses, evictions (across all workers), hit rate and current number of entries.
+        Other workers' counts lag by up to `stats_interval` seconds.
+        """
+        self._flush_counts()
+        try:
+            connection = self._connection()
+            stats = dict(connection.execute('SELECT name, value FROM stats').fetchall())
+            entries = connection.execute('SELECT COUNT(*) FROM predictions').fetchone()[0]
+        except sqlite3.Error:
+            stats, entries = {}, None
+        hits, misses = stats.get('hits', 0), stats.get('misses', 0)
+        return {
+            'hits': hits,
+            'misses': misses,
+            'evictions': stats.get('evictions', 0),
+            'hit_rate': hits / (hits + misses) if hits + misses else 0.0,
+            'entries': entries,
+            'max_entries': self.max_entries,
+            'ttl': self.ttl,
+        }
+
+    def clear(self):
+        """Removes every entry and resets the counters."""
+        with self._counts_lock:
+            self._counts = {}
+        connection = self._connection()
+        connection.execute('DELETE FROM predictions')
+        connection.execute('DELETE FROM stats')
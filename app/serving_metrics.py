@@ -0,0 +1,216 @@
+""" serving metrics """
+import bisect
+import glob
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+# Histogram buckets (upper bounds); +Inf is implied
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+ROWS_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+HELP = {
+    'sales_api_requests_total': ('counter', 'HTTP requests by endpoint and status.'),
+    'sales_api_request_seconds': ('histogram', 'Request latency by endpoint.'),
+    'sales_api_stage_seconds': ('histogram', 'Latency of each request stage (parse, features, predict, render, ...).'),
+    'sales_api_batch_rows': ('histogram', 'Rows per prediction call.'),
+    'sales_api_model_loads_total': ('counter', 'Model artifacts loaded.'),
+    'sales_api_model_load_seconds': ('gauge', 'Duration of the last model load.'),
+    'sales_api_model_info': ('gauge', 'Currently served model artifact.'),
+}
+
+
+class ServingMetrics:
+    """
+    Request, stage, batch and model metrics, aggregated over all workers of a server.
+
+    Every worker process updates plain in-memory counters and histograms (a lock and a
+    bisect per observation, so the overhead is a few microseconds) and writes them to
+    its own `metrics_<pid>.json` in `directory` at most every `flush_interval` seconds.
+    `render` merges the files of all workers and returns the Prometheus text format:
+    counters and histograms are summed, gauges are taken from the most recently
+    written file. Files of exited workers are kept so that counters never go back.
+
+    The default directory is named after the parent process, i.e. the gunicorn master
+    that all workers share, so every server start begins from empty metrics.
+
+    Attributes
+    ----------
+    directory : str or None
+        Directory of the per-worker files.
+    enabled : bool
+        When False every method is a no-op.
+    flush_interval : float
+        Minimum number of seconds between two writes of this worker's file.
+    """
+
+    def __init__(self, directory=None, enabled=True, flush_interval=1.0):
+        self._directory = directory
+        self.enabled = enabled
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+        self._gauges = {}
+        self._last_flush = 0.0
+
+    @classmethod
+    def from_env(cls):
+        """Builds the metrics from METRICS_DIR and METRICS_FLUSH_INTERVAL; METRICS=0 disables them."""
+        return cls(
+            directory=os.environ.get('METRICS_DIR'),
+            enabled=os.environ.get('METRICS') != '0',
+            flush_interval=float(os.environ.get('METRICS_FLUSH_INTERVAL', 1.0)),
+        )
+
+    @property
+    def directory(self):
+        if self._directory is None:
+            self._directory = os.path.join(tempfile.gettempdir(), f'sales_api_metrics_{os.getppid()}')
+        return self._directory
+
+    def inc(self, name, value=1, **labels):
+        """Adds `value` to a counter."""
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, value, buckets=LATENCY_BUCKETS, **labels):
+        """Records one observation in a histogram."""
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = {'buckets': list(buckets), 'counts': [0] * (len(buckets) + 1),
+                                                     'sum': 0.0, 'count': 0}
+            histogram['counts'][bisect.bisect_left(buckets, value)] += 1
+            histogram['sum'] += value
+            histogram['count'] += 1
+
+    def set(self, name, value, **labels):
+        """Sets a gauge, replacing every other label set of the same gauge."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._gauges = {key: v for key, v in self._gauges.items() if key[0] != name}
+            self._gauges[(name, tuple(sorted(labels.items())))] = value
+
+    @contextmanager
+    def stage(self, name):
+        """Times the enclosed block as request stage `name`."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe('sales_api_stage_seconds', time.perf_counter() - start, stage=name)
+
+    def observe_request(self, endpoint, status, seconds):
+        """Counts a finished request and records its latency, then flushes if due."""
+        self.inc('sales_api_requests_total', endpoint=endpoint, status=str(status))
+        self.observe('sales_api_request_seconds', seconds, endpoint=endpoint)
+        self.flush()
+
+    def observe_batch(self, rows):
+        """Records the number of rows of one prediction call."""
+        self.observe('sales_api_batch_rows', rows, buckets=ROWS_BUCKETS)
+
+    def observe_model(self, registry):
+        """Copies the model version, load count and load time of a ModelRegistry into gauges."""
+        if not self.enabled or registry.version is None:
+            return
+        path, mtime_ns, size = registry.version
+        self.set('sales_api_model_info', 1, path=os.path.basename(path), mtime_ns=str(mtime_ns))
+        self.set('sales_api_model_load_seconds', registry.load_seconds)
+        with self._lock:
+            self._counters[('sales_api_model_loads_total', ())] = registry.loads
+
+    def _snapshot(self):
+        with self._lock:
+            return {
+                'time': time.time(),
+                'counters': [[name, dict(labels), value] for (name, labels), value in self._counters.items()],
+                'histograms': [[name, dict(labels), dict(h, counts=list(h['counts']))]
+                               for (name, labels), h in self._histograms.items()],
+                'gauges': [[name, dict(labels), value] for (name, labels), value in self._gauges.items()],
+            }
+
+    def flush(self, force=False):
+        """Writes this worker's file if `flush_interval` has passed (or `force`)."""
+        if not self.enabled:
+            return
+        now = time.monotonic()
+        if not force and now - self._last_flush < self.flush_interval:
+            return
+        self._last_flush = now
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f'metrics_{os.getpid()}.json')
+        with open(path + '.tmp', 'w') as f:
+            json.dump(self._snapshot(), f)
+        os.replace(path + '.tmp', path)
+
+    def _merged(self):
+        counters, histograms, gauges, gauge_time = {}, {}, {}, {}
+        for path in glob.glob(os.path.join(self.directory, 'metrics_*.json')):
+            try:
+                with open(path) as f:
+                    snapshot = json.load(f)
+            except (OSError, ValueError):
+                continue
+            for name, labels, value in snapshot['counters']:
+                key = (name, tuple(sorted(labels.items())))
+                counters[key] = counters.get(key, 0) + value
+            for name, labels, h in snapshot['histograms']:
+                key = (name, tuple(sorted(labels.items())))
+                merged = histograms.setdefault(key, {'buckets': h['buckets'], 'counts': [0] * len(h['counts']),
+                                                     'sum': 0.0, 'count': 0})
+                merged['counts'] = [a + b for a, b in zip(merged['counts'], h['counts'])]
+                merged['sum'] += h['sum']
+                merged['count'] += h['count']
+            for name, labels, value in snapshot['gauges']:
+                if snapshot['time'] >= gauge_time.get(name, 0):
+                    gauges = {key: v for key, v in gauges.items() if key[0] != name}
+                    gauges[(name, tuple(sorted(labels.items())))] = value
+                    gauge_time[name] = snapshot['time']
+        return counters, histograms, gauges
+
+    def render(self):
+        """Returns the metrics of all workers in the Prometheus text exposition format."""
+        if not self.enabled:
+            return ''
+        self.flush(force=True)
+        counters, histograms, gauges = self._merged()
+
+        def label_text(labels, extra=()):
+            pairs = [*labels, *extra]
+            if not pairs:
+                return ''
+            escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in pairs)
+            return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + '}'
+
+        lines = []
+        for name, (kind, text) in HELP.items():
+            samples = []
+            if kind == 'histogram':
+                for (metric, labels), h in sorted(histograms.items()):
+                    if metric != name:
+                        continue
+                    cumulative = 0
+                    for bound, count in zip([*h['buckets'], '+Inf'], h['counts']):
+                        cumulative += count
+                        samples.append(f'{name}_bucket{label_text(labels, [("le", bound)])} {cumulative}')
+                    samples.append(f'{name}_sum{label_text(labels)} {h["sum"]}')
+                    samples.append(f'{name}_count{label_text(labels)} {h["count"]}')
+            else:
+                values = counters if kind == 'counter' else gauges
+                samples = [f'{name}{label_text(labels)} {value}'
+                           for (metric, labels), value in sorted(values.items()) if metric == name]
+            if samples:
+                lines += [f'# HELP {name} {text}', f'# TYPE {name} {kind}', *samples]
+        return '\n'.join(lines) + '\n'
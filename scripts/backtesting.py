@@ -0,0 +1,189 @@
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.metrics import mean_squared_error
+
+from core_budget import available_cores, split_core_budget
+
+
+def rolling_origin_splits(dates, n_folds=5, horizon=42, step=None, window='expanding', train_days=None,
+                          cutoffs=None):
+    """
+    Defines rolling-origin folds as integer row ranges over date-sorted data.
+
+    Every fold trains on the rows up to and including its cutoff date and is evaluated on
+    the `horizon` days after it. Because the rows are sorted by date, both sets are
+    contiguous, so they are returned as slices and indexing an array with them is a view.
+
+    Parameters
+    ----------
+    dates : array-like
+        Row dates, sorted in ascending order.
+    n_folds : int
+        Number of folds, ending at the last date (ignored when `cutoffs` is given).
+    horizon : int
+        Number of days evaluated after each cutoff.
+    step : int or None
+        Days between consecutive cutoffs (default is `horizon`).
+    window : str
+        'expanding' trains on all history up to the cutoff, 'rolling' on the last `train_days`.
+    train_days : int or None
+        Length of the training window for `window='rolling'`.
+    cutoffs : list or None
+        Explicit cutoff dates.
+
+    Returns
+    -------
+    list of tuple
+        (cutoff, train_slice, test_slice) per fold, oldest cutoff first.
+    """
+    dates = pd.to_datetime(pd.Index(dates)).to_numpy()
+    if len(dates) and (dates[1:] < dates[:-1]).any():
+        raise ValueError("dates must be sorted in ascending order.")
+    if window not in ('expanding', 'rolling'):
+        raise ValueError(f"Unknown window '{window}', expected 'expanding' or 'rolling'.")
+    if window == 'rolling' and not train_days:
+        raise ValueError("A rolling window needs train_days.")
+
+    horizon_delta = np.timedelta64(horizon, 'D')
+    if cutoffs is None:
+        step_delta = np.timedelta64(step or horizon, 'D')
+        last = dates[-1]
+        cutoffs = [last - horizon_delta - step_delta * i for i in range(n_folds)][::-1]
+    else:
+        cutoffs = sorted(pd.DatetimeIndex(cutoffs).to_numpy())
+
+    folds = []
+    for cutoff in cutoffs:
+        train_end = np.searchsorted(dates, cutoff, side='right')
+        test_end = np.searchsorted(dates, cutoff + horizon_delta, side='right')
+        train_start = 0
+        if window == 'rolling':
+            train_start = np.searchsorted(dates, cutoff - np.timedelta64(train_days, 'D'), side='right')
+        if train_end > train_start and test_end > train_end:
+            folds.append((pd.Timestamp(cutoff), slice(int(train_start), int(train_end)),
+                          slice(int(train_end), int(test_end))))
+    return folds
+
+
+def _rmsle(y_true, y_pred):
+    return np.sqrt(np.mean((np.log1p(y_pred) - np.log1p(y_true))**2))
+
+
+class Backtester:
+    """
+    Rolling-origin backtests over a single date-sorted feature matrix.
+
+    The rows are sorted by date once; every fold is then a pair of slices into the same
+    X and y arrays, so no fold copies the data. Folds are fitted in parallel threads,
+    which share those arrays, with the core budget split between folds and the
+    estimator's own `n_jobs`. Estimators that support `partial_fit` are instead trained
+    incrementally with an expanding window: each fold only feeds the rows added since
+    the previous cutoff to the same estimator.
+
+    Forests (including the `SalesModel` pipeline) have no `partial_fit`, so every fold is
+    refitted from scratch; only the data is shared between folds, not fitted state.
+    Growing extra trees with `warm_start` would give a model whose old trees never saw
+    the newer rows (and, behind a StandardScaler, were fitted on a different scaling),
+    which is not what a retrain at that cutoff would produce.
+
+    Attributes
+    ----------
+    X : np.ndarray
+        Features sorted by date.
+    y : np.ndarray
+        Target values sorted by date.
+    dates : np.ndarray
+        Sorted row dates.
+    results_ : pd.DataFrame
+        Per-fold results of the last `run`.
+    """
+
+    def __init__(self, estimator, X, y, dates, inner_param='model__n_jobs'):
+        """
+        Parameters
+        ----------
+        estimator : sklearn estimator
+            The estimator or pipeline to backtest (cloned for every fold).
+        X : pd.DataFrame or np.ndarray
+            Features.
+        y : pd.Series or np.ndarray
+            Target values.
+        dates : array-like
+            Date of every row.
+        inner_param : str or None
+            Parameter of `estimator` that controls its own parallelism.
+        """
+        self.estimator = estimator
+        self.inner_param = inner_param
+
+        dates = pd.to_datetime(pd.Index(dates)).to_numpy()
+        X = X.to_numpy(dtype=np.float64) if hasattr(X, 'to_numpy') else np.asarray(X)
+        y = np.asarray(y, dtype=np.float64)
+        if (dates[1:] < dates[:-1]).any():
+            order = np.argsort(dates, kind='stable')
+            dates, X, y = dates[order], X[order], y[order]
+        self.X, self.y, self.dates = X, y, dates
+        self.results_ = None
+
+    def _score(self, model, cutoff, train, test):
+        y_pred = model.predict(self.X[test])
+        y_true = self.y[test]
+        return {
+            'cutoff': cutoff,
+            'train_rows': train.stop - train.start,
+            'test_rows': test.stop - test.start,
+            'rmse': np.sqrt(mean_squared_error(y_true, y_pred)),
+            'rmsle': _rmsle(y_true, y_pred),
+        }
+
+    def _fit_fold(self, estimator, cutoff, train, test):
+        model = clone(estimator).fit(self.X[train], self.y[train])
+        return self._score(model, cutoff, train, test)
+
+    def run(self, n_jobs=-1, reuse_state=True, **split_options):
+        """
+        Evaluates the estimator on every fold.
+
+        Parameters
+        ----------
+        n_jobs : int
+            Total number of cores to use (-1 for all of them).
+        reuse_state : bool
+            Train `partial_fit` estimators incrementally across expanding-window folds.
+            Other estimators, such as random forests, are always refitted for every fold.
+        **split_options
+            Passed to `rolling_origin_splits` (n_folds, horizon, step, window, ...).
+
+        Returns
+        -------
+        pd.DataFrame
+            One row per fold with its cutoff, sizes, RMSE and RMSLE.
+        """
+        folds = rolling_origin_splits(self.dates, **split_options)
+        if not folds:
+            raise ValueError("No fold has both training and test rows.")
+
+        incremental = (reuse_state and hasattr(self.estimator, 'partial_fit')
+                       and split_options.get('window', 'expanding') == 'expanding')
+        if incremental:
+            model = clone(self.estimator)
+            seen = 0
+            results = []
+            for cutoff, train, test in folds:
+                model.partial_fit(self.X[seen:train.stop], self.y[seen:train.stop])
+                seen = train.stop
+                results.append(self._score(model, cutoff, train, test))
+        else:
+            n_cores = available_cores() if n_jobs in (None, -1) else n_jobs
+            outer_jobs, inner_jobs = split_core_budget(n_cores, len(folds))
+            estimator = clone(self.estimator)
+            if self.inner_param and self.inner_param in estimator.get_params():
+                estimator.set_params(**{self.inner_param: inner_jobs})
+            # Threads share X and y, so the folds' slices stay views
+            results = Parallel(n_jobs=outer_jobs, backend='threading')(
+                delayed(self._fit_fold)(estimator, cutoff, train, test) for cutoff, train, test in folds)
+
+        self.results_ = pd.DataFrame(results)
+        return self.results_
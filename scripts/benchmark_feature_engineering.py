@@ -0,0 +1,103 @@
+# scripts/benchmark_feature_engineering.py
+"""
+Reports rows per second of DataPreprocessor's vectorized feature building and of the
+original row-wise implementation. Their outputs are compared in
+tests/test_feature_engineering.py.
+
+Usage:
+    python benchmark_feature_engineering.py --rows 1000000
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from data_preprocessing import DataPreprocessor
+from feature_transformer import FeatureTransformer
+
+
+def make_frame(n_rows: int, seed: int = 42) -> pd.DataFrame:
+    """Builds a frame with the columns the datetime and feature-engineering steps read."""
+    rng = np.random.default_rng(seed)
+    dates = pd.Timestamp('2013-01-01') + pd.to_timedelta(rng.integers(0, 942, n_rows), unit='D')
+    return pd.DataFrame({
+        'Store': rng.integers(1, 1116, n_rows),
+        'Date': dates.strftime('%Y-%m-%d'),
+        'Promo': rng.integers(0, 2, n_rows).astype(float),
+        'StateHoliday': rng.choice(['0', 'a', 'b', 'c'], n_rows, p=[0.97, 0.01, 0.01, 0.01]),
+        'SchoolHoliday': rng.integers(0, 2, n_rows).astype(float),
+        'Dataset': 'Train',
+        'CompetitionOpenSinceMonth': rng.integers(1, 13, n_rows).astype(float),
+        'CompetitionOpenSinceYear': rng.integers(2000, 2015, n_rows).astype(float),
+    })
+
+
+def legacy_extract_datetime_features(df: pd.DataFrame) -> None:
+    """The original row-wise implementation, kept as the reference."""
+    df['Date'] = pd.to_datetime(df['Date'])
+    df['Weekday'] = df['Date'].dt.weekday
+    df['IsWeekend'] = df['Weekday'].apply(lambda x: 1 if x >= 5 else 0)
+    df['Month'] = df['Date'].dt.month
+    df['DaysToHoliday'] = (pd.to_datetime('2023-12-25') - df['Date']).dt.days
+    df['DaysAfterHoliday'] = (df['Date'] - pd.to_datetime('2023-12-25')).dt.days
+    df['IsBeginningOfMonth'] = (df['Date'].dt.day <= 7).astype(int)
+    df['IsMidMonth'] = ((df['Date'].dt.day > 7) & (df['Date'].dt.day <= 21)).astype(int)
+    df['IsEndOfMonth'] = (df['Date'].dt.day > 21).astype(int)
+    df.drop(columns=['Date', 'Dataset', 'CompetitionOpenSinceMonth', 'CompetitionOpenSinceYear'], inplace=True)
+
+
+def legacy_feature_engineering(df: pd.DataFrame) -> None:
+    """The original row-wise implementation, kept as the reference."""
+    df['IsHoliday'] = df.apply(lambda x: 1 if (x['StateHoliday'] != '0' or x['SchoolHoliday'] == 1) else 0, axis=1)
+    df['Promo_duration'] = df.groupby('Store')['Promo'].cumsum()
+
+
+def run_current(df: pd.DataFrame) -> pd.DataFrame:
+    """Runs the current DataPreprocessor steps on `df` without loading any files."""
+    preprocessor = DataPreprocessor.__new__(DataPreprocessor)
+    preprocessor.transformer = FeatureTransformer()
+    preprocessor.train_df = df
+    preprocessor.test_df = df.iloc[:0].copy()
+    preprocessor.extract_datetime_features()
+    preprocessor.feature_engineering()
+    return preprocessor.train_df
+
+
+def run_legacy(df: pd.DataFrame) -> pd.DataFrame:
+    legacy_extract_datetime_features(df)
+    legacy_feature_engineering(df)
+    return df
+
+
+def benchmark(n_rows: int, skip_legacy: bool = False) -> dict:
+    """
+    Times both implementations on the same synthetic frame.
+
+    Returns:
+        dict: Rows per second for each implementation and the speedup.
+    """
+    frame = make_frame(n_rows)
+    results = {'rows': n_rows}
+
+    start = time.perf_counter()
+    run_current(frame.copy())
+    results['vectorized_rows_per_sec'] = n_rows / (time.perf_counter() - start)
+
+    if not skip_legacy:
+        start = time.perf_counter()
+        run_legacy(frame.copy())
+        results['legacy_rows_per_sec'] = n_rows / (time.perf_counter() - start)
+        results['speedup'] = results['vectorized_rows_per_sec'] / results['legacy_rows_per_sec']
+
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=200_000, help='Number of synthetic rows.')
+    parser.add_argument('--skip-legacy', action='store_true', help='Only time the vectorized path.')
+    args = parser.parse_args()
+
+    for key, value in benchmark(args.rows, args.skip_legacy).items():
+        print(f"{key}: {value:,.2f}" if isinstance(value, float) else f"{key}: {value:,}")
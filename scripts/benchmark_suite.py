@@ -0,0 +1,352 @@
+# scripts/benchmark_suite.py
+"""
+Times the data, training and serving paths on synthetic Rossmann data at several
+scale factors and saves the results as JSON, so runs can be compared across commits.
+
+Benchmarks (each at every scale, on data from synthetic_data.py):
+    load_data         parse train.csv out of the zip (columnar cache disabled)
+    load_data_cached  the same load served from the columnar cache
+    preprocess        DataPreprocessor.preprocess on the cleaned train and test files
+    train_model       SalesModel.train_model on the 24 model features
+    make_predictions  SalesModel.make_predictions on all rows
+    endpoint_batch    POST /predict/batch of the Flask app, --batch-size rows per request
+    endpoint_single   POST /predict/batch with one row per request (latency percentiles)
+
+Usage:
+    python benchmark_suite.py --scales 1k 10k 100k --output results.json
+    python benchmark_suite.py --scales 1k 10k 100k --compare baseline.json
+
+With --compare, the run exits with status 1 when any benchmark is more than
+--threshold slower than in the baseline file.
+"""
+import argparse
+import contextlib
+import gc
+import importlib.util
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import warnings
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import sklearn
+
+from data_preprocessing import DataPreprocessor
+from load_data import load_data
+from sales_model_pipeline import SalesModel
+from synthetic_data import MODEL_FEATURES, write_dataset
+
+API_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'API'))
+
+BENCHMARKS = ['load_data', 'load_data_cached', 'preprocess', 'train_model', 'make_predictions',
+              'endpoint_batch', 'endpoint_single']
+DEFAULT_SCALES = ['1k', '10k', '100k']
+_SUFFIXES = {'k': 1_000, 'M': 1_000_000}
+
+
+def parse_scale(scale: str) -> int:
+    """Converts a scale factor such as '10k' or '1M' (or a plain number) to a row count."""
+    scale = str(scale).strip()
+    if scale[-1] in _SUFFIXES:
+        return int(float(scale[:-1]) * _SUFFIXES[scale[-1]])
+    return int(scale)
+
+
+def environment() -> dict:
+    """Describes the code and machine a run was made on."""
+    def git(*args):
+        try:
+            return subprocess.run(['git', *args], capture_output=True, text=True, check=True,
+                                  cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    status = git('status', '--porcelain', '--untracked-files=no')
+    return {
+        'commit': git('rev-parse', 'HEAD'),
+        'dirty': bool(status) if status is not None else None,
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'sklearn': sklearn.__version__,
+    }
+
+
+def time_repeated(run, repeat: int, setup=None) -> list:
+    """
+    Times `run` `repeat` times and returns the durations in seconds.
+
+    Args:
+        run (callable): The timed call; receives the result of `setup` if given.
+        repeat (int): Number of timed calls.
+        setup (callable): Untimed preparation before every call (e.g. a fresh object).
+
+    Returns:
+        list: The duration of every call.
+    """
+    seconds = []
+    for _ in range(repeat):
+        state = setup() if setup is not None else None
+        gc.collect()
+        start = time.perf_counter()
+        run(state) if setup is not None else run()
+        seconds.append(time.perf_counter() - start)
+    return seconds
+
+
+def load_api(work_dir: str):
+    """
+    Imports API/app.py with a prediction-cache-free, file-local configuration.
+
+    The prediction cache is disabled so repeated requests measure the model rather than
+    cache hits, and metrics are written below `work_dir`. Both can be overridden via
+    the usual environment variables.
+    """
+    os.environ.setdefault('PREDICTION_CACHE', '0')
+    os.environ.setdefault('METRICS_DIR', os.path.join(work_dir, 'metrics'))
+    if API_DIR not in sys.path:
+        sys.path.insert(0, API_DIR)
+    spec = importlib.util.spec_from_file_location('sales_api', os.path.join(API_DIR, 'app.py'))
+    api = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(api)
+    return api
+
+
+class BenchmarkSuite:
+    """
+    Runs the benchmarks at a list of scale factors.
+
+    Attributes
+    ----------
+    work_dir : str
+        Directory of the generated data sets (reused across runs) and model files.
+    repeat : int
+        Timed repetitions per benchmark; the best and median durations are reported.
+    n_estimators : int or None
+        Number of trees of the benchmarked forest; None keeps the SalesModel default.
+    endpoint_rows : int
+        Largest number of rows sent to the endpoint per repetition.
+    batch_size : int
+        Rows per request of the `endpoint_batch` benchmark.
+    single_requests : int
+        Requests per repetition of the `endpoint_single` benchmark.
+    """
+
+    def __init__(self, work_dir='benchmark_data', repeat=3, n_estimators=None, endpoint_rows=100_000,
+                 batch_size=1_000, single_requests=200, seed=0, benchmarks=None):
+        self.work_dir = work_dir
+        self.repeat = repeat
+        self.n_estimators = n_estimators
+        self.endpoint_rows = endpoint_rows
+        self.batch_size = batch_size
+        self.single_requests = single_requests
+        self.seed = seed
+        self.benchmarks = benchmarks or BENCHMARKS
+        self._api = None
+
+    def settings(self) -> dict:
+        return {
+            'repeat': self.repeat,
+            'n_estimators': self.n_estimators,
+            'endpoint_rows': self.endpoint_rows,
+            'batch_size': self.batch_size,
+            'single_requests': self.single_requests,
+            'seed': self.seed,
+        }
+
+    def _result(self, name, scale, rows, seconds, **extra):
+        best = min(seconds)
+        result = {
+            'benchmark': name,
+            'scale': scale,
+            'rows': rows,
+            'seconds': seconds,
+            'best': best,
+            'median': float(np.median(seconds)),
+            'rows_per_sec': rows / best if best > 0 else None,
+            **extra,
+        }
+        print(f"  {name:<18} {rows:>11,} rows  best {best:9.4f} s  {result['rows_per_sec'] or 0:>14,.0f} rows/s")
+        return result
+
+    def _wanted(self, *names):
+        return any(name in self.benchmarks for name in names)
+
+    def run_scale(self, scale: str) -> list:
+        """Generates (or reuses) the data set of one scale factor and runs the benchmarks on it."""
+        n_rows = parse_scale(scale)
+        directory = os.path.join(self.work_dir, f'rows_{n_rows}_seed_{self.seed}')
+        print(f"Scale {scale} ({n_rows:,} rows): preparing data in {directory}")
+        paths = write_dataset(directory, n_rows, seed=self.seed)
+        results = []
+
+        if 'load_data' in self.benchmarks:
+            seconds = time_repeated(lambda: load_data(paths['zip'], 'train.csv', use_cache=False), self.repeat)
+            results.append(self._result('load_data', scale, n_rows, seconds))
+
+        if 'load_data_cached' in self.benchmarks:
+            load_data(paths['zip'], 'train.csv')  # Builds the cache file
+            seconds = time_repeated(lambda: load_data(paths['zip'], 'train.csv'), self.repeat)
+            results.append(self._result('load_data_cached', scale, n_rows, seconds))
+
+        if 'preprocess' in self.benchmarks:
+            def new_preprocessor():
+                with contextlib.redirect_stdout(io.StringIO()):
+                    return DataPreprocessor(paths['train_cleaned'], paths['test_cleaned'], paths['test'])
+
+            def preprocess(preprocessor):
+                with contextlib.redirect_stdout(io.StringIO()):
+                    preprocessor.preprocess()
+
+            seconds = time_repeated(preprocess, self.repeat, setup=new_preprocessor)
+            results.append(self._result('preprocess', scale, n_rows, seconds))
+
+        if not self._wanted('train_model', 'make_predictions', 'endpoint_batch', 'endpoint_single'):
+            return results
+
+        features = pd.read_csv(paths['features'])
+        model = SalesModel()
+        if self.n_estimators is not None:
+            model.model_pipeline.set_params(model__n_estimators=self.n_estimators)
+        model.preprocess_data(features, 'Sales')
+        seconds = time_repeated(model.train_model, self.repeat if 'train_model' in self.benchmarks else 1)
+        if 'train_model' in self.benchmarks:
+            results.append(self._result('train_model', scale, len(model.X_train), seconds))
+
+        X = features[MODEL_FEATURES]
+        if 'make_predictions' in self.benchmarks:
+            seconds = time_repeated(lambda: model.make_predictions(X), self.repeat)
+            results.append(self._result('make_predictions', scale, len(X), seconds))
+
+        if self._wanted('endpoint_batch', 'endpoint_single'):
+            results += self._run_endpoint(scale, model, X)
+        return results
+
+    def _run_endpoint(self, scale, model, X):
+        if self._api is None:
+            self._api = load_api(os.path.abspath(self.work_dir))
+        model_dir = os.path.join(self.work_dir, 'models')
+        os.makedirs(model_dir, exist_ok=True)
+        with contextlib.redirect_stdout(io.StringIO()):
+            model_file = model.save_model(model_dir)
+        self._api.registry = self._api.ModelRegistry(model_path=model_file, check_interval=3600.0)
+        client = self._api.app.test_client()
+        results = []
+
+        def post(body):
+            response = client.post('/predict/batch', data=body, content_type='application/json')
+            if response.status_code != 200:
+                raise RuntimeError(f"/predict/batch returned {response.status_code}: {response.get_data(as_text=True)}")
+
+        if 'endpoint_batch' in self.benchmarks:
+            rows = X.iloc[:self.endpoint_rows]
+            bodies = [json.dumps({col: rows[col].iloc[start:start + self.batch_size].tolist() for col in MODEL_FEATURES})
+                      for start in range(0, len(rows), self.batch_size)]
+            post(bodies[0])  # Loads the model
+            seconds = time_repeated(lambda: [post(body) for body in bodies], self.repeat)
+            results.append(self._result('endpoint_batch', scale, len(rows), seconds, requests=len(bodies)))
+
+        if 'endpoint_single' in self.benchmarks:
+            sample = X.sample(min(self.single_requests, len(X)), random_state=self.seed, replace=False)
+            bodies = [json.dumps([row]) for row in sample.to_dict('records')]
+            latencies = []
+
+            def single_requests():
+                for body in bodies:
+                    start = time.perf_counter()
+                    post(body)
+                    latencies.append(time.perf_counter() - start)
+
+            post(bodies[0])
+            seconds = time_repeated(single_requests, self.repeat)
+            results.append(self._result('endpoint_single', scale, len(bodies), seconds, latency_ms={
+                'p50': float(np.percentile(latencies, 50) * 1000),
+                'p99': float(np.percentile(latencies, 99) * 1000),
+            }))
+        return results
+
+    def run(self, scales) -> dict:
+        """Runs every scale factor and returns the results with the environment and settings."""
+        report = {'environment': environment(), 'settings': self.settings(), 'results': []}
+        with warnings.catch_warnings():
+            # e.g. sklearn's "X does not have valid feature names" on every endpoint request
+            warnings.simplefilter('ignore')
+            for scale in scales:
+                report['results'] += self.run_scale(scale)
+        return report
+
+
+def compare_results(baseline: dict, current: dict, threshold: float = 0.1) -> pd.DataFrame:
+    """
+    Compares the best durations of two runs, benchmark by benchmark.
+
+    Args:
+        baseline (dict): Report of the reference run, as saved by this script.
+        current (dict): Report of the new run.
+        threshold (float): Relative slowdown above which a benchmark counts as a regression.
+
+    Returns:
+        pd.DataFrame: Baseline and current best durations, their ratio and a regression flag
+        for every benchmark and scale present in both runs.
+    """
+    def best(report):
+        return pd.DataFrame(report['results']).set_index(['benchmark', 'scale'])['best']
+
+    table = pd.concat({'baseline': best(baseline), 'current': best(current)}, axis=1, join='inner')
+    table['ratio'] = table['current'] / table['baseline']
+    table['regression'] = table['ratio'] > 1 + threshold
+    return table
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scales', nargs='+', default=DEFAULT_SCALES,
+                        help='Training rows per data set, e.g. 1k 10k 100k 1M 10M.')
+    parser.add_argument('--benchmarks', nargs='+', choices=BENCHMARKS, default=BENCHMARKS,
+                        help='Benchmarks to run (default: all).')
+    parser.add_argument('--repeat', type=int, default=3, help='Timed repetitions per benchmark.')
+    parser.add_argument('--n-estimators', type=int, default=None,
+                        help='Trees of the benchmarked forest (default: the SalesModel setting).')
+    parser.add_argument('--endpoint-rows', type=int, default=100_000, help='Largest number of rows sent to the endpoint.')
+    parser.add_argument('--batch-size', type=int, default=1_000, help='Rows per endpoint_batch request.')
+    parser.add_argument('--single-requests', type=int, default=200, help='Requests per endpoint_single repetition.')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the synthetic data.')
+    parser.add_argument('--work-dir', default='benchmark_data', help='Directory of the generated data sets.')
+    parser.add_argument('--output', default=None,
+                        help='Results file (default: benchmark_results/<timestamp>_<commit>.json).')
+    parser.add_argument('--compare', default=None, help='Baseline results file to compare this run against.')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='Relative slowdown reported as a regression (default: 0.1, i.e. 10%%).')
+    args = parser.parse_args()
+
+    suite = BenchmarkSuite(work_dir=args.work_dir, repeat=args.repeat, n_estimators=args.n_estimators,
+                           endpoint_rows=args.endpoint_rows, batch_size=args.batch_size,
+                           single_requests=args.single_requests, seed=args.seed, benchmarks=args.benchmarks)
+    report = suite.run(args.scales)
+
+    output = args.output
+    if output is None:
+        commit = (report['environment']['commit'] or 'unknown')[:10]
+        output = os.path.join('benchmark_results', f"{datetime.now().strftime('%Y-%m-%d-%H-%M-%S')}_{commit}.json")
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results saved to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            table = compare_results(json.load(f), report, args.threshold)
+        print(table.to_string(float_format=lambda value: f'{value:.4f}'))
+        regressions = table[table['regression']]
+        if len(regressions):
+            print(f"{len(regressions)} regression(s) slower than +{args.threshold:.0%}.")
+            sys.exit(1)
@@ -0,0 +1,128 @@
+# scripts/columnar_cache.py
+
+import hashlib # hash file contents and read options into cache keys
+import os # manipulate the files and directories
+import zipfile # read member checksums from the zip directory
+import pandas as pd # for manipulating the dataset
+from dtype_schema import downcast # compact storage types for the Rossmann columns
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:  # pragma: no cover - the cache is simply disabled without pyarrow
+    pa = None
+    feather = None
+
+# Bump when `downcast` or the file layout changes so stale cache files are ignored
+CACHE_VERSION = 3
+
+
+def _file_digest(path: str) -> str:
+    """Returns a content hash of a file, read in 1 MB blocks."""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def source_fingerprint(path: str, member: str = None) -> str:
+    """
+    Returns a content fingerprint for a CSV file or for one member of a zip archive.
+
+    For zip members the CRC-32 and size stored in the archive directory are used, so the
+    fingerprint costs no decompression and changes whenever the member's content changes.
+
+    Args:
+        path (str): Path to the CSV file or zip archive.
+        member (str): Name of the CSV inside the archive, or None for a plain CSV file.
+
+    Returns:
+        str: A hex fingerprint.
+    """
+    if member is None:
+        return _file_digest(path)
+    with zipfile.ZipFile(path, 'r') as zip_ref:
+        info = zip_ref.getinfo(member)
+    return f"{info.CRC:08x}{info.file_size:x}"
+
+
+def _options_digest(read_options: dict) -> str:
+    options = repr(sorted((key, repr(value)) for key, value in read_options.items()))
+    return hashlib.blake2b(f"{CACHE_VERSION}:{options}".encode(), digest_size=4).hexdigest()
+
+
+def cached_frame(path: str, parse, member: str = None, cache_dir: str = None, verbose: bool = False,
+                 **read_options) -> pd.DataFrame:
+    """
+    Returns the DataFrame for a CSV source, served from a memory-mapped Feather cache when possible.
+
+    The cache file is keyed on the content fingerprint of the source and on the read options.
+    On a miss (first load, or the CSV/zip member changed) `parse()` is called, the result is
+    narrowed with `downcast`, written as an uncompressed Feather (Arrow IPC) file and
+    returned. On a hit the Feather file is memory-mapped instead of parsing text. Any cache
+    problem, including pyarrow not being installed, falls back to parsing the CSV.
+
+    Args:
+        path (str): Path to the CSV file or zip archive.
+        parse (callable): Zero-argument function that parses the CSV into a DataFrame.
+        member (str): Name of the CSV inside the archive, or None for a plain CSV file.
+        cache_dir (str): Directory for cache files. Defaults to '.columnar_cache' next to `path`.
+        verbose (bool): Report the memory saved by `downcast` when the CSV is parsed.
+        **read_options: The options `parse` uses, so different reads get different cache files.
+
+    Returns:
+        pd.DataFrame: The loaded data.
+    """
+    if feather is None:
+        return downcast(parse(), verbose=verbose)
+
+    if cache_dir is None:
+        cache_dir = os.path.join(os.path.dirname(os.path.abspath(path)), '.columnar_cache')
+    # The prefix identifies the source, the fingerprint its content, the suffix the read options
+    source_id = hashlib.blake2b(f"{os.path.abspath(path)}:{member}".encode(), digest_size=4).hexdigest()
+    prefix = f"{os.path.splitext(os.path.basename(member or path))[0]}-{source_id}-"
+    suffix = f"-{_options_digest(read_options)}.feather"
+    cache_file = os.path.join(cache_dir, prefix + source_fingerprint(path, member) + suffix)
+
+    if os.path.exists(cache_file):
+        try:
+            table = feather.read_table(cache_file, memory_map=True)
+            return table.to_pandas(split_blocks=True)
+        except (OSError, pa.ArrowException):
+            pass  # Unreadable cache file: rebuild it from the CSV below
+
+    df = downcast(parse(), verbose=verbose)
+
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        table = pa.Table.from_pandas(df, preserve_index=True)
+        feather.write_feather(table, cache_file + '.tmp', compression='uncompressed')
+        os.replace(cache_file + '.tmp', cache_file)
+
+        # Drop cache files of older versions of the same source read with the same options
+        for name in os.listdir(cache_dir):
+            if name.startswith(prefix) and name.endswith(suffix) \
+                    and os.path.join(cache_dir, name) != cache_file:
+                os.remove(os.path.join(cache_dir, name))
+    except (OSError, pa.ArrowException):
+        pass  # Caching is best effort; the parsed data is still returned
+
+    return df
+
+
+def read_csv_cached(path: str, cache_dir: str = None, verbose: bool = False, **read_csv_kwargs) -> pd.DataFrame:
+    """
+    Drop-in replacement for `pd.read_csv(path, **read_csv_kwargs)` backed by the columnar cache.
+
+    Args:
+        path (str): Path to the CSV file.
+        cache_dir (str): Directory for cache files. Defaults to '.columnar_cache' next to `path`.
+        verbose (bool): Report the memory saved by `downcast` when the CSV is parsed.
+        **read_csv_kwargs: Passed to `pd.read_csv`.
+
+    Returns:
+        pd.DataFrame: The loaded data, with ROSSMANN_SCHEMA applied.
+    """
+    return cached_frame(path, lambda: pd.read_csv(path, **read_csv_kwargs),
+                        cache_dir=cache_dir, verbose=verbose, **read_csv_kwargs)
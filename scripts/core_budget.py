@@ -0,0 +1,37 @@
+import os
+
+
+def available_cores():
+    """Returns the number of cores this process may run on."""
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def split_core_budget(n_cores, n_tasks, inner_jobs=None):
+    """
+    Splits a core budget between the search workers (outer) and the estimator (inner).
+
+    Parameters
+    ----------
+    n_cores : int
+        Total number of cores to use.
+    n_tasks : int
+        Number of independent fits the search can run at once (candidates x folds).
+    inner_jobs : int or None
+        Cores per fit. By default the outer level gets as many cores as there are tasks
+        and each fit gets what is left, so outer x inner never exceeds `n_cores`.
+
+    Returns
+    -------
+    tuple of int
+        (outer_jobs, inner_jobs)
+    """
+    n_cores = max(1, int(n_cores))
+    if inner_jobs is None:
+        outer_jobs = max(1, min(n_cores, n_tasks))
+        inner_jobs = max(1, n_cores // outer_jobs)
+    else:
+        inner_jobs = max(1, min(int(inner_jobs), n_cores))
+        outer_jobs = max(1, min(n_cores // inner_jobs, n_tasks))
+    return outer_jobs, inner_jobs
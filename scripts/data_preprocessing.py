@@ -1,6 +1,20 @@
 import pandas as pd
 import numpy as np
-from sklearn.preprocessing import LabelEncoder, StandardScaler
+from sklearn.preprocessing import StandardScaler
+from columnar_cache import read_csv_cached
+from dtype_schema import downcast, memory_usage_mb
+from feature_transformer import FeatureTransformer
+from stage_profiler import StageProfiler
+
+# Define the data types for specific columns
+dtype_dict = {
+    'Store': int,
+    'Sales': float,
+    'Open': float,
+    'StateHoliday': str,
+    'SchoolHoliday': float,
+    'Promo': float
+}
 
 class DataPreprocessor:
     def __init__(self, train_path, test_path, test_id):
@@ -14,20 +28,11 @@ class DataPreprocessor:
         test_id : str
             Path to the CSV file containing test IDs.
         """
-        # Define the data types for specific columns
-        dtype_dict = {
-            'Store': int,
-            'Sales': float,
-            'Open': float,
-            'StateHoliday': str,
-            'SchoolHoliday': float,
-            'Promo': float
-        }
-        
-        # Load training and test datasets
-        self.train_data = pd.read_csv(train_path, dtype=dtype_dict, low_memory=False)
-        self.test_data = pd.read_csv(test_path, dtype=dtype_dict, low_memory=False)
-        self.test_id = pd.read_csv(test_id, dtype=dtype_dict, low_memory=False)
+        # Load training and test datasets (memory-mapped from the columnar cache after the first load).
+        # Parsed CSVs are downcast to ROSSMANN_SCHEMA; the memory saved is reported on the first load.
+        self.train_data = read_csv_cached(train_path, dtype=dtype_dict, low_memory=False, verbose=True)
+        self.test_data = read_csv_cached(test_path, dtype=dtype_dict, low_memory=False, verbose=True)
+        self.test_id = read_csv_cached(test_id, dtype=dtype_dict, low_memory=False)
         self.test_data['Id'] = self.test_id['Id']
         
         # Filter only open stores in the training dataset
@@ -37,9 +42,15 @@ class DataPreprocessor:
         self.train_df = self.train_data.copy()
         self.test_df = self.test_data.copy()
         
+        frames_mb = sum(memory_usage_mb(df) for df in [self.train_data, self.test_data, self.train_df, self.test_df])
+        print(f"Loaded train and test data: {frames_mb:,.1f} MB")
+
         # Initialize the scaler for numerical feature scaling
         self.scaler = StandardScaler()
 
+        # Fitted on the training data; shared with SalesModel.save_model and the serving app
+        self.transformer = FeatureTransformer()
+
     def clean_data(self):
         """Clean the datasets by resetting indexes and dropping unnecessary columns."""
         self.train_df.reset_index(drop=True, inplace=True)
@@ -51,6 +62,9 @@ class DataPreprocessor:
         # Drop 'Id' only from the test dataset
         self.test_df.drop(columns=['Id'], errors='ignore', inplace=True)
 
+        # Learn fill values, label classes and store state from the training data only
+        self.transformer.fit(self.train_df)
+
         # Handle missing values
         self.handle_missing_values()
 
@@ -58,50 +72,29 @@ class DataPreprocessor:
         """Handle missing values consistently across train and test datasets."""
         combined_df = pd.concat([self.train_df, self.test_df], axis=0, keys=['train', 'test'])
 
-        # Fill missing values for 'Open' with the mode
-        combined_df.fillna({'Open': combined_df['Open'].mode()[0]}, inplace=True)
+        # Fill missing values for 'Open' with the mode of the training data
+        self.transformer.fill_missing_values(combined_df)
 
-        # Split back into train and test datasets
-        self.train_df = combined_df.xs('train')
+        # Split back into train and test datasets; the training rows keep their own dtypes
+        # (the concatenation turns 'Sales', missing from the test rows, into float64)
+        self.train_df = combined_df.xs('train').astype(self.train_df.dtypes.to_dict())
         self.test_df = combined_df.xs('test')
 
     def extract_datetime_features(self):
         """Extract datetime features such as weekday, month, and holiday-related variables."""
         for df in [self.train_df, self.test_df]:
-            df['Date'] = pd.to_datetime(df['Date'])
-            
-            # Extract features
-            df['Weekday'] = df['Date'].dt.weekday  # Weekday (0=Monday, 6=Sunday)
-            df['IsWeekend'] = df['Weekday'].apply(lambda x: 1 if x >= 5 else 0)
-            df['Month'] = df['Date'].dt.month
-            # df['Year'] = df['Date'].dt.year # Least important
-            
-            # Calculate days to/from a specific holiday (e.g., Christmas)
-            df['DaysToHoliday'] = (pd.to_datetime('2023-12-25') - df['Date']).dt.days
-            df['DaysAfterHoliday'] = (df['Date'] - pd.to_datetime('2023-12-25')).dt.days
-            
-            # Identify periods within the month
-            df['IsBeginningOfMonth'] = (df['Date'].dt.day <= 7).astype(int)
-            df['IsMidMonth'] = ((df['Date'].dt.day > 7) & (df['Date'].dt.day <= 21)).astype(int)
-            df['IsEndOfMonth'] = (df['Date'].dt.day > 21).astype(int)
-            
-            # Drop unnecessary columns
-            df.drop(columns=['Date', 'Dataset', 'CompetitionOpenSinceMonth', 'CompetitionOpenSinceYear'], inplace=True)
+            self.transformer.add_datetime_features(df)
 
     def feature_engineering(self):
         """Create new features based on existing data, such as holiday flags and promo duration."""
         for df in [self.train_df, self.test_df]:
-            df['IsHoliday'] = df.apply(lambda x: 1 if (x['StateHoliday'] != '0' or x['SchoolHoliday'] == 1) else 0, axis=1)
-            df['Promo_duration'] = df.groupby('Store')['Promo'].cumsum()
+            # Promo duration is counted within each dataset, starting from zero
+            self.transformer.add_holiday_and_promo_features(df, continue_promo=False)
 
     def encode_categorical_data(self):
-        """Encode categorical variables using label encoding."""
-        label_cols = ['StateHoliday', 'StoreType', 'Assortment']
-        label_encoder = LabelEncoder()
-
-        for col in label_cols:
-            self.train_df[col] = label_encoder.fit_transform(self.train_df[col].astype(str))
-            self.test_df[col] = label_encoder.transform(self.test_df[col].astype(str))  # Use transform on test
+        """Encode categorical variables using the label classes learned from the training data."""
+        for df in [self.train_df, self.test_df]:
+            self.transformer.encode_categorical(df)
 
     # def scale_numeric_features(self):
     #     """Scale numeric features consistently across both datasets."""
@@ -118,33 +111,49 @@ class DataPreprocessor:
     #     self.train_df[common_cols] = self.scaler.fit_transform(self.train_df[common_cols])
     #     self.test_df[common_cols] = self.scaler.transform(self.test_df[common_cols])
 
-    def preprocess(self):
-        """Execute the full preprocessing pipeline."""
+    def preprocess(self, profiler=None):
+        """
+        Execute the full preprocessing pipeline.
+
+        Args:
+            profiler (StageProfiler, optional): Records the time, memory and row counts of
+                every stage; read them with `profiler.report()`. Not profiled by default.
+        """
+        profiler = profiler or StageProfiler(enabled=False)
+        # Read after every stage: the stages replace train_df and test_df
+        def frames():
+            return [self.train_df, self.test_df]
+
         print("Cleaning data...")
-        self.clean_data()
+        with profiler.stage('clean', frames):
+            self.clean_data()
 
         print("Extracting datetime features...")
-        self.extract_datetime_features()
+        with profiler.stage('datetime', frames):
+            self.extract_datetime_features()
 
         print("Performing feature engineering...")
-        self.feature_engineering()
+        with profiler.stage('feature_engineering', frames):
+            self.feature_engineering()
 
         print("Encoding categorical data...")
-        self.encode_categorical_data()
+        with profiler.stage('encoding', frames):
+            self.encode_categorical_data()
 
         # print("Scaling numeric features...")
         # self.scale_numeric_features()
-        # Drop 'Sales' from test if it exists
-        self.test_df.drop(columns=['Sales'], errors='ignore', inplace=True)
-    
-        # Set 'Id' as the index for test data
-        self.test_df.reset_index(drop=True, inplace=True)
-        self.test_df.set_index(self.test_data['Id'], inplace=True)
-        
-        # Set 'Date' as index for train data
-        self.train_df.reset_index(drop=True, inplace=True)
-        self.train_df.set_index(self.train_data['Date'], inplace=True)
-        
+        with profiler.stage('finalize', frames):
+            # Drop 'Sales' from test if it exists
+            self.test_df.drop(columns=['Sales'], errors='ignore', inplace=True)
+
+            # Set 'Id' as the index for test data
+            self.test_df.reset_index(drop=True, inplace=True)
+            self.test_df.set_index(self.test_data['Id'], inplace=True)
+
+            # Set 'Date' as index for train data
+            self.train_df.reset_index(drop=True, inplace=True)
+            self.train_df.set_index(self.train_data['Date'], inplace=True)
+
         print("Preprocessing complete.")
         return self.train_df, self.test_df
 
@@ -153,3 +162,108 @@ class DataPreprocessor:
         self.train_df.to_csv(train_file, index=True)
         self.test_df.to_csv(test_file, index=True)
         print(f"Processed data saved to {train_file} and {test_file}.")
+
+
+class ChunkedPreprocessor:
+    """
+    Out-of-core version of the DataPreprocessor training pipeline.
+
+    The training history is read in chunks of `chunksize` rows and processed in two
+    passes, so memory use depends on the chunk size rather than on the history length:
+
+    1. `fit` streams the label, store and 'Open' columns through
+       `FeatureTransformer.partial_fit`.
+    2. `process` transforms each chunk and appends it to the output CSV. The only state
+       carried from one chunk to the next is the per-store promo count, which continues
+       'Promo_duration' across chunk boundaries.
+
+    Chunks follow the row order of the file, so a date-sorted history is processed in
+    date chunks and a store-sorted history in store chunks; the output is the same as
+    `DataPreprocessor.preprocess` followed by `save_data` for the training set.
+
+    Attributes
+    ----------
+    train_path : str
+        Path to the training dataset (train_cleaned.csv).
+    chunksize : int
+        Number of CSV rows read per chunk.
+    transformer : FeatureTransformer
+        The transformer fitted by `fit`, ready to be saved with the model.
+    """
+
+    def __init__(self, train_path, chunksize=500_000):
+        """
+        Parameters
+        ----------
+        train_path : str
+            Path to the training dataset.
+        chunksize : int
+            Number of CSV rows read per chunk.
+        """
+        self.train_path = train_path
+        self.chunksize = chunksize
+        self.transformer = FeatureTransformer()
+
+    def _chunks(self, usecols=None):
+        """Yields the open-store rows of the training data, one compact chunk at a time."""
+        reader = pd.read_csv(self.train_path, dtype=dtype_dict, usecols=usecols,
+                             chunksize=self.chunksize, low_memory=False)
+        for chunk in reader:
+            chunk = downcast(chunk)
+            yield chunk[chunk['Open'] == 1]
+
+    def fit(self):
+        """
+        Fits the transformer state in one pass over the history, reading only the
+        columns the state depends on.
+
+        Returns
+        -------
+        FeatureTransformer
+            The fitted transformer.
+        """
+        header = pd.read_csv(self.train_path, nrows=0).columns
+        columns = ['Store', 'Open'] + FeatureTransformer.LABEL_COLUMNS + FeatureTransformer.STORE_COLUMNS
+        usecols = [col for col in header if col in columns]
+
+        self.transformer = FeatureTransformer()
+        for chunk in self._chunks(usecols=usecols):
+            self.transformer.partial_fit(chunk)
+        return self.transformer
+
+    def process(self, output_file='../data/pre_processed/train_processed.csv'):
+        """
+        Transforms the history chunk by chunk and appends the results to `output_file`.
+
+        Parameters
+        ----------
+        output_file : str
+            Path of the processed training CSV, indexed by 'Date'.
+
+        Returns
+        -------
+        int
+            Number of rows written.
+        """
+        if self.transformer.open_fill_value_ is None:
+            print("Fitting transformer...")
+            self.fit()
+
+        # Promo counts start from zero and are advanced past every processed chunk
+        self.transformer.promo_offsets_ = {}
+        rows = 0
+        for chunk in self._chunks():
+            if chunk.empty:
+                continue
+            features = self.transformer.transform(chunk)
+            features.index = pd.Index(chunk['Date'].to_numpy(), name='Date')
+            self.transformer.update(chunk)
+            if self.transformer.feature_columns_ is None:
+                self.transformer.set_feature_columns(chunk)
+
+            features.to_csv(output_file, mode='w' if rows == 0 else 'a', header=rows == 0, index=True)
+            rows += len(features)
+            print(f"Processed {rows:,} rows...")
+
+        print(f"Processed data saved to {output_file}.")
+        return rows
@@ -1,42 +1,77 @@
 # scripts/data_processing.py
 import pandas as pd
 import matplotlib.pyplot as plt
-import seaborn as sns
+from data_profiler import DataProfiler
+from report_renderer import finish_figure
 
 class DataProcessing:
     
-    def __init__(self, test_data: pd.DataFrame, train_data: pd.DataFrame):
+    def __init__(self, test_data: pd.DataFrame, train_data: pd.DataFrame, chunksize: int = 500_000):
         """
         Initialize the DataProcessing class with the data.
 
         Args:
-            data (pd.DataFrame): The input DataFrame to process.
+            test_data (pd.DataFrame or str): The test data, or the path of its CSV file.
+            train_data (pd.DataFrame or str): The training data, or the path of its CSV file.
+            chunksize (int): Rows profiled per chunk; CSV files are streamed, never loaded whole.
         """
         self.train_data = train_data
         self.test_data = test_data
-    
+        self.profiler = DataProfiler(chunksize=chunksize)
+        self.train_profile = None
+        self.test_profile = None
+
+    def profile_data(self, **read_options) -> dict:
+        """
+        Profiles the training and test data in one streaming pass each and caches the result.
+
+        Args:
+            **read_options: Passed to pd.read_csv when the data are CSV paths (e.g. dtype).
+
+        Returns:
+            dict: 'train' and 'test' profiles (see DataProfiler.profile) and 'dtype_mismatches'.
+        """
+        self.train_profile = self.profiler.profile(self.train_data, **read_options)
+        self.test_profile = self.profiler.profile(self.test_data, **read_options)
+        return {
+            'train': self.train_profile,
+            'test': self.test_profile,
+            'dtype_mismatches': DataProfiler.compare(self.train_profile, self.test_profile),
+        }
+
+    def _profile_of(self, data) -> pd.DataFrame:
+        # Reuse the cached profiles of the train and test data instead of scanning again
+        if data is self.train_data:
+            if self.train_profile is None:
+                self.train_profile = self.profiler.profile(data)
+            return self.train_profile
+        if data is self.test_data:
+            if self.test_profile is None:
+                self.test_profile = self.profiler.profile(data)
+            return self.test_profile
+        return self.profiler.profile(data)
 
     def missing_data_summary(self, data) -> pd.DataFrame:
         """
         Returns a summary of columns with missing data, including count and percentage of missing values.
 
+        Args:
+            data (pd.DataFrame or str): The data, or the path of a CSV file to stream.
+
         Returns:
             pd.DataFrame: A DataFrame with columns 'Missing Count' and 'Percentage (%)' for columns with missing values.
         """
-        # Total missing values per column
-        missing_data = data.isnull().sum()
-        
+        profile = self._profile_of(data)
+
         # Filter only columns with missing values greater than 0
-        missing_data = missing_data[missing_data > 0]
-        
-        # Calculate the percentage of missing data
-        missing_percentage = (missing_data / len(data)) * 100
+        missing = profile[profile['nulls'] > 0]
         
         # Combine the counts and percentages into a DataFrame
         missing_df = pd.DataFrame({
-            'Missing Count': missing_data, 
-            'Percentage (%)': missing_percentage
+            'Missing Count': missing['nulls'], 
+            'Percentage (%)': missing['null_pct']
         })
+        missing_df.index.name = None
         
         # Sort by percentage of missing data
         missing_df = missing_df.sort_values(by='Percentage (%)', ascending=False)
@@ -44,54 +79,76 @@ class DataProcessing:
         return missing_df
 
    
-    def check_data_types(self):
+    def check_data_types(self, verbose: bool = True) -> pd.DataFrame:
         """
-        Function to check and compare the data types of columns in both training and test datasets.
-        
+        Compares the data types of columns in the training and test datasets.
+
+        Columns parsed as different types in different chunks of one file (e.g. StateHoliday
+        holding both 0 and '0') are reported as 'object' with mixed_types set in the profiles.
+
         Args:
-        train_data (pd.DataFrame): The training dataset.
-        test_data (pd.DataFrame): The test dataset.
-        
+            verbose (bool): Print the data types of both datasets and their differences.
+
         Returns:
-        None
+            pd.DataFrame: train_dtype, test_dtype and issue ('dtype mismatch', 'missing in test'
+            or 'missing in train') for every column that differs.
         """
+        train_profile = self._profile_of(self.train_data)
+        test_profile = self._profile_of(self.test_data)
+        differences = DataProfiler.compare(train_profile, test_profile)
+        if not verbose:
+            return differences
+
         # Check data types of the training dataset
         print("Training Dataset Data Types:\n")
-        print(self.train_data.dtypes)
+        print(train_profile['dtype'])
         print("\n" + "="*50 + "\n")
-        
+
         # Check data types of the test dataset
         print("Test Dataset Data Types:\n")
-        print(self.test_data.dtypes)
+        print(test_profile['dtype'])
         print("\n" + "="*50 + "\n")
-        
+
         # Check for differences in column names and data types
         print("Differences in column names and data types between training and test datasets:\n")
-        train_dtypes = self.train_data.dtypes
-        test_dtypes = self.test_data.dtypes
-        
-        for column in train_dtypes.index:
-            if column in test_dtypes.index:
-                if train_dtypes[column] != test_dtypes[column]:
-                    print(f"Data type mismatch for column '{column}':")
-                    print(f"Train: {train_dtypes[column]}, Test: {test_dtypes[column]}")
-                    print("-" * 50)
-            else:
+        for column, row in differences.iterrows():
+            if row['issue'] == 'dtype mismatch':
+                print(f"Data type mismatch for column '{column}':")
+                print(f"Train: {row['train_dtype']}, Test: {row['test_dtype']}")
+                print("-" * 50)
+            elif row['issue'] == 'missing in test':
                 print(f"Column '{column}' is present in training data but missing in test data.")
-        
-        for column in test_dtypes.index:
-            if column not in train_dtypes.index:
+            else:
                 print(f"Column '{column}' is present in test data but missing in training data.")
-    
-    def check_outlier(self, variables):
+        return differences
+
+    def check_outlier(self, variables, save_path=None):
+        """
+        Draws boxplots of the training data from the profile's quartiles and whiskers, without
+        loading or scanning the raw values again. As in a standard boxplot, whiskers end at
+        the most extreme values within 1.5 x IQR of the quartiles; the fliers shown are the
+        minimum and maximum when they lie outside the fences.
+
+        Args:
+            variables (list): Numeric columns to plot.
+            save_path (str, optional): Writes the figure to this file instead of showing it.
+        """
+        profile = self._profile_of(self.train_data)
+
         # Create boxplots for outlier detection
         plt.figure(figsize=(15, 4))
         for i, var in enumerate(variables, 1):
-            plt.subplot(1, len(variables), i)
-            sns.boxplot(y=self.train_data[var])
-            plt.title(f'Boxplot of {var}')
+            stats = profile.loc[var]
+            ax = plt.subplot(1, len(variables), i)
+            ax.bxp([{
+                'med': stats['median'], 'q1': stats['q1'], 'q3': stats['q3'],
+                'whislo': stats['whislo'], 'whishi': stats['whishi'],
+                'fliers': [value for value in (stats['min'], stats['max'])
+                           if value < stats['lower_fence'] or value > stats['upper_fence']],
+            }], showfliers=True)
+            ax.set_xticks([])
+            plt.title(f'Boxplot of {var} ({int(stats["outliers"])} outliers)')
             plt.xlabel('')
 
         plt.tight_layout()
-        plt.show()
-        
+        finish_figure(save_path)
@@ -0,0 +1,188 @@
+import numpy as np
+import pandas as pd
+
+
+class _ColumnStats:
+    """Running statistics of one column, updated chunk by chunk."""
+
+    def __init__(self, sample_size, rng):
+        self.sample_size = sample_size
+        self.rng = rng
+        self.rows = 0
+        self.nulls = 0
+        self.dtypes = []
+        self.non_numeric = False
+        self.numeric_count = 0
+        self.total = 0.0
+        self.min = np.nan
+        self.max = np.nan
+        self.sample = np.empty(0)
+
+    def update(self, column):
+        self.rows += len(column)
+        self.nulls += int(column.isna().sum())
+        if str(column.dtype) not in self.dtypes:
+            self.dtypes.append(str(column.dtype))
+        if not pd.api.types.is_numeric_dtype(column.dtype):
+            self.non_numeric = True
+            return
+
+        values = column.to_numpy(dtype=np.float64, na_value=np.nan)
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return
+        self.min = np.fmin(self.min, values.min())
+        self.max = np.fmax(self.max, values.max())
+        self.total += values.sum()
+        self._sample(values)
+        self.numeric_count += len(values)
+
+    def _sample(self, values):
+        # Reservoir sampling (Algorithm R), vectorized over the chunk: fill the reservoir,
+        # then the i-th value overall replaces a random slot with probability k / i
+        free = self.sample_size - len(self.sample)
+        if free > 0:
+            self.sample = np.concatenate([self.sample, values[:free]])
+            values = values[free:]
+        if len(values) == 0:
+            return
+        positions = self.numeric_count + max(free, 0) + np.arange(1, len(values) + 1)
+        accepted = self.rng.random(len(values)) < self.sample_size / positions
+        slots = self.rng.integers(0, self.sample_size, accepted.sum())
+        self.sample[slots] = values[accepted]
+
+    @property
+    def dtype(self):
+        if len(self.dtypes) == 1:
+            return self.dtypes[0]
+        try:
+            return str(np.result_type(*[np.dtype(dtype) for dtype in self.dtypes]))
+        except TypeError:
+            return 'object'
+
+    def summary(self):
+        summary = {
+            'dtype': self.dtype,
+            'mixed_types': len(self.dtypes) > 1 and self.dtype == 'object',
+            'rows': self.rows,
+            'nulls': self.nulls,
+            'null_pct': 100 * self.nulls / self.rows if self.rows else np.nan,
+            'min': self.min,
+            'max': self.max,
+            'mean': self.total / self.numeric_count if self.numeric_count else np.nan,
+            'q1': np.nan, 'median': np.nan, 'q3': np.nan,
+            'lower_fence': np.nan, 'upper_fence': np.nan,
+            'whislo': np.nan, 'whishi': np.nan,
+            'outliers': np.nan, 'exact': np.nan,
+        }
+        # Numeric statistics of a column that is not numeric throughout would only describe some chunks
+        if self.non_numeric:
+            summary.update(min=np.nan, max=np.nan, mean=np.nan)
+        elif len(self.sample):
+            q1, median, q3 = np.quantile(self.sample, [0.25, 0.5, 0.75])
+            lower, upper = q1 - 1.5 * (q3 - q1), q3 + 1.5 * (q3 - q1)
+            outside = (self.sample < lower) | (self.sample > upper)
+            # Boxplot whiskers end at the most extreme values inside the fences
+            inside = self.sample[~outside]
+            summary.update(q1=q1, median=median, q3=q3, lower_fence=lower, upper_fence=upper,
+                           whislo=inside.min(), whishi=inside.max(),
+                           outliers=int(round(outside.mean() * self.numeric_count)),
+                           exact=self.numeric_count <= self.sample_size)
+        return summary
+
+
+class DataProfiler:
+    """
+    Single-pass data-quality profile of a table that may not fit in memory.
+
+    The input is read in chunks. Each column keeps exact running counts (rows, nulls),
+    the dtypes it was parsed as, and its exact minimum, maximum and mean. Quantiles come
+    from a fixed-size uniform reservoir sample, so they are approximate, and so are the
+    IQR outlier counts and boxplot whisker ends derived from them (Tukey fences, 1.5 x IQR
+    beyond the quartiles; whiskers at the most extreme sampled values inside the fences).
+    While a column has at most `sample_size` values the reservoir holds all of them and
+    the quantiles and counts are exact; the report's `exact` column says which is the case.
+
+    Attributes
+    ----------
+    chunksize : int
+        Rows read (or sliced) per chunk.
+    sample_size : int
+        Reservoir size per numeric column.
+    """
+
+    def __init__(self, chunksize=500_000, sample_size=100_000, seed=0):
+        """
+        Parameters
+        ----------
+        chunksize : int
+            Rows read (or sliced) per chunk.
+        sample_size : int
+            Reservoir size per numeric column; larger is more accurate and uses more memory.
+        seed : int
+            Seed of the reservoir sampling.
+        """
+        self.chunksize = chunksize
+        self.sample_size = sample_size
+        self.seed = seed
+
+    def _chunks(self, source, **read_options):
+        if isinstance(source, pd.DataFrame):
+            for start in range(0, len(source), self.chunksize):
+                yield source.iloc[start:start + self.chunksize]
+        elif isinstance(source, str):
+            yield from pd.read_csv(source, chunksize=self.chunksize, **read_options)
+        else:
+            yield from source
+
+    def profile(self, source, **read_options):
+        """
+        Profiles every column of `source` in one pass.
+
+        Parameters
+        ----------
+        source : str, pd.DataFrame or iterable of pd.DataFrame
+            A CSV path (read in chunks), a DataFrame (sliced in chunks) or any chunk iterator.
+        **read_options
+            Passed to `pd.read_csv` for CSV paths (e.g. dtype, usecols).
+
+        Returns
+        -------
+        pd.DataFrame
+            One row per column: dtype, mixed_types (chunks parsed as different types),
+            rows, nulls, null_pct, min, max, mean, q1, median, q3, the IQR fences, the
+            whisker ends (whislo, whishi), the number of values outside the fences, and
+            whether the quantiles are exact.
+        """
+        rng = np.random.default_rng(self.seed)
+        stats = {}
+        for chunk in self._chunks(source, **read_options):
+            for name in chunk.columns:
+                if name not in stats:
+                    stats[name] = _ColumnStats(self.sample_size, rng)
+                stats[name].update(chunk[name])
+
+        report = pd.DataFrame([column.summary() for column in stats.values()], index=list(stats))
+        report.index.name = 'column'
+        return report
+
+    @staticmethod
+    def compare(train_report, test_report):
+        """
+        Lists the columns whose dtype differs between two profiles, or that only one has.
+
+        Returns
+        -------
+        pd.DataFrame
+            train_dtype, test_dtype and issue ('dtype mismatch', 'missing in test' or
+            'missing in train') per affected column.
+        """
+        columns = train_report.index.union(test_report.index, sort=False)
+        dtypes = pd.DataFrame({
+            'train_dtype': train_report['dtype'].reindex(columns),
+            'test_dtype': test_report['dtype'].reindex(columns),
+        })
+        dtypes['issue'] = np.select(
+            [dtypes['test_dtype'].isna(), dtypes['train_dtype'].isna(), dtypes['train_dtype'] != dtypes['test_dtype']],
+            ['missing in test', 'missing in train', 'dtype mismatch'], default='')
+        return dtypes[dtypes['issue'] != '']
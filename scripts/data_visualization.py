@@ -3,13 +3,61 @@ import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
 from scipy.stats import chi2_contingency
+from dtype_schema import downcast
+from report_renderer import ReportRenderer, finish_figure
+from event_windows import EventWindowLift
 
 class Visualyzer:
     def __init__(self, train_data: pd.DataFrame, test_data: pd.DataFrame):
-        self.train_data = train_data
-        self.test_data = test_data
-
-    def check_promotion_distribution(self):
+        # Compact dtypes (int8 flags, int16 Store, categorical strings), applied to copies so the
+        # caller's frames keep their own dtypes
+        self.train_data = downcast(train_data.copy(), verbose=True)
+        self.test_data = downcast(test_data.copy(), verbose=True)
+        self._cube = None
+
+    # Keys of the aggregate cube; every summary plot is a roll-up of these
+    CUBE_KEYS = ['Store', 'DayOfWeek', 'Promo', 'Promo2', 'StateHoliday', 'Assortment', 'Open']
+    CUBE_VALUES = ['Sales', 'Customers']
+
+    @property
+    def aggregate_cube(self):
+        """
+        Sums and non-null counts of Sales and Customers for every combination of CUBE_KEYS,
+        built in one grouped pass over `train_data` on first use and cached. The summary
+        plots compute their means from this small table instead of rescanning the data.
+        """
+        if self._cube is None:
+            df = self.train_data
+            keys = [key for key in self.CUBE_KEYS if key in df.columns or key in df.index.names]
+            values = [col for col in self.CUBE_VALUES if col in df.columns]
+            aggregations = {}
+            for col in values:
+                aggregations[f'{col}_sum'] = (col, 'sum')
+                aggregations[f'{col}_count'] = (col, 'count')
+            cube = df.groupby(keys, observed=True, dropna=False).agg(**aggregations).reset_index()
+            # Same normalization as the plots apply: mixed 0 / '0' holidays become one label
+            if 'StateHoliday' in cube.columns:
+                cube['StateHoliday'] = cube['StateHoliday'].astype(str)
+            self._cube = cube
+        return self._cube
+
+    def refresh_cube(self):
+        """Drops the cached aggregate cube, e.g. after `train_data` was changed."""
+        self._cube = None
+
+    def _cube_means(self, by, where=None, columns=('Sales', 'Customers')):
+        """Means of `columns` per `by` (cube column names or a Series over the cube), optionally over the rows `where` selects."""
+        cube = self.aggregate_cube
+        if where is not None:
+            mask = where(cube)
+            cube = cube[mask]
+            if isinstance(by, pd.Series):
+                by = by[mask]
+        fields = [f'{col}_{part}' for col in columns for part in ('sum', 'count')]
+        totals = cube.groupby(by, observed=True)[fields].sum()
+        return pd.DataFrame({col: totals[f'{col}_sum'] / totals[f'{col}_count'] for col in columns})
+
+    def check_promotion_distribution(self, save_path=None):
             
         # Compute proportions
         train_promo_dist = self.train_data['Promo'].value_counts(normalize=True)
@@ -64,12 +112,19 @@ class Visualyzer:
         plt.legend()
 
         plt.tight_layout()
-        plt.show()
+        finish_figure(save_path)
     
-    def compare_sales_behavior(self):
+    def compare_sales_behavior(self, window=1, save_path=None):
+        """
+        Plots average sales before, during and after holidays.
+
+        Parameters:
+        window (int): Open days before and after a holiday that count as 'Before' and 'After' it.
+        save_path (str, optional): Writes the figure to this file instead of showing it.
+        """
         # Filter only the relevant columns and ensure the store is open
         df = self.train_data.reset_index()
-        data = df[df['Open'] == 1][['Store', 'Date', 'Sales', 'StateHoliday']]
+        data = df[df['Open'] == 1][['Store', 'Date', 'Sales', 'StateHoliday']].copy()
 
         # Convert 'Date' to datetime if not already
         data['Date'] = pd.to_datetime(data['Date'])
@@ -78,11 +133,16 @@ class Visualyzer:
         data = data.sort_values(by=['Store', 'Date'])
 
         # Identify holiday periods
-        data['HolidayPeriod'] = np.where(data['StateHoliday'].isin(['a', 'b', 'c']), 'During Holiday', 'Non-Holiday')
+        is_holiday = data['StateHoliday'].astype(str).isin(['a', 'b', 'c'])
+        data['HolidayPeriod'] = np.where(is_holiday, 'During Holiday', 'Non-Holiday')
 
-        # Shift rows to capture before and after holidays
-        data['BeforeHoliday'] = data['StateHoliday'].shift(-1).isin(['a', 'b', 'c'])
-        data['AfterHoliday'] = data['StateHoliday'].shift(1).isin(['a', 'b', 'c'])
+        # Shift within each store to capture the days before and after holidays
+        by_store = is_holiday.groupby(data['Store'], observed=True)
+        data['BeforeHoliday'] = False
+        data['AfterHoliday'] = False
+        for days in range(1, window + 1):
+            data['BeforeHoliday'] |= by_store.shift(-days, fill_value=False)
+            data['AfterHoliday'] |= by_store.shift(days, fill_value=False)
 
         # Define before, during, and after periods
         data['HolidayPeriod'] = np.where(data['BeforeHoliday'], 'Before Holiday', data['HolidayPeriod'])
@@ -106,18 +166,14 @@ class Visualyzer:
         plt.xlabel('Holiday Period')
         plt.ylabel('Average Sales')
 
-        # Show plot
-        plt.show()
+        # Show (or save) plot
+        finish_figure(save_path)
     
-    def seasonal_sales_behavior(self, ascending=True): 
+    def seasonal_sales_behavior(self, ascending=True, save_path=None):
     
-        # Filter the dataset for open stores
-        df_open = self.train_data[self.train_data['Open'] == 1].copy()  # Use a copy to avoid modifying the original data
-        # Convert StateHoliday as str
-        df_open['StateHoliday'] = df_open['StateHoliday'].astype(str)
-        
-        # Group by StateHoliday and calculate the average sales
-        seasonal_sales = df_open.groupby('StateHoliday')['Sales'].mean().reset_index()
+        # Average sales of open stores per StateHoliday (labels normalized to str in the cube)
+        seasonal_sales = self._cube_means('StateHoliday', where=lambda cube: cube['Open'] == 1,
+                                          columns=['Sales']).reset_index()
 
         # Rename the holidays for better understanding
         seasonal_sales['StateHoliday'] = seasonal_sales['StateHoliday'].replace({
@@ -147,34 +203,32 @@ class Visualyzer:
         plt.xlabel('Holiday Type')
         plt.ylabel('Average Sales')
 
-        plt.show()
+        finish_figure(save_path)
         
-    def plot_promo_impact(self):
+    def plot_promo_impact(self, save_path=None):
         """
         Plots the impact of promotions on average sales and customer counts.
 
         Parameters:
         train_data (DataFrame): The input dataframe containing promotional and sales data.
+        save_path (str, optional): Writes the figure to this file instead of showing it.
         """
-        # Reset index if needed
-        df = self.train_data.reset_index()
-        
-        # Ensure that 'Promo' and 'Promo2' are of correct type
-        df['Promo'] = df['Promo'].astype(bool)
-        df['Promo2'] = df['Promo2'].astype(bool)
+        # Calculate average sales and customer counts with and without each promotion
+        cube = self.aggregate_cube
+        promo = self._cube_means(cube['Promo'].astype(bool))
+        promo2 = self._cube_means(cube['Promo2'].astype(bool))
 
-        # Calculate average sales and customer counts
-        promo_sales_avg = df[df['Promo']]['Sales'].mean()
-        non_promo_sales_avg = df[~df['Promo']]['Sales'].mean()
+        promo_sales_avg = promo['Sales'].get(True, np.nan)
+        non_promo_sales_avg = promo['Sales'].get(False, np.nan)
 
-        promo2_sales_avg = df[df['Promo2']]['Sales'].mean()
-        non_promo2_sales_avg = df[~df['Promo2']]['Sales'].mean()
+        promo2_sales_avg = promo2['Sales'].get(True, np.nan)
+        non_promo2_sales_avg = promo2['Sales'].get(False, np.nan)
 
-        promo_customers_avg = df[df['Promo']]['Customers'].mean()
-        non_promo_customers_avg = df[~df['Promo']]['Customers'].mean()
+        promo_customers_avg = promo['Customers'].get(True, np.nan)
+        non_promo_customers_avg = promo['Customers'].get(False, np.nan)
 
-        promo2_customers_avg = df[df['Promo2']]['Customers'].mean()
-        non_promo2_customers_avg = df[~df['Promo2']]['Customers'].mean()
+        promo2_customers_avg = promo2['Customers'].get(True, np.nan)
+        non_promo2_customers_avg = promo2['Customers'].get(False, np.nan)
 
         # Bar charts
         fig, axs = plt.subplots(2, 2, figsize=(12, 6))
@@ -200,20 +254,20 @@ class Visualyzer:
         axs[1, 1].set_ylabel('Average Customer Count')
 
         plt.tight_layout()
-        plt.show()
+        finish_figure(save_path)
     
-    def _high_impact_stores(self, top_n=10):
+    def _high_impact_stores(self, top_n=10, save_path=None):
         # Ensure 'Store', 'Promo', 'Promo2', 'Sales', and 'Customers' are present in the DataFrame
-        df = self.train_data.reset_index()
         required_columns = {'Store', 'Promo', 'Promo2', 'Sales', 'Customers'}
-        if not required_columns.issubset(df.columns):
+        available = set(self.train_data.columns) | set(self.train_data.index.names)
+        if not required_columns.issubset(available):
             raise KeyError(f"One or more required columns are missing: {required_columns}")
         
-        # Filter for stores with Promo active and calculate the mean Sales and Customers by store
-        promo_impact = df[df['Promo'] == 1][['Store', 'Sales', 'Customers']].groupby('Store').mean().reset_index()
+        # Mean Sales and Customers by store, for days with Promo active
+        promo_impact = self._cube_means('Store', where=lambda cube: cube['Promo'] == 1).reset_index()
         
-        # Filter for stores with Promo2 active and calculate the mean Sales and Customers by store
-        promo2_impact = df[df['Promo2'] == 1][['Store', 'Sales', 'Customers']].groupby('Store').mean().reset_index()
+        # Mean Sales and Customers by store, for stores with Promo2 active
+        promo2_impact = self._cube_means('Store', where=lambda cube: cube['Promo2'] == 1).reset_index()
         
         # Merge data for comparison
         common_stores_comparison = pd.merge(promo_impact, promo2_impact, on='Store', suffixes=('_Promo', '_Promo2'))
@@ -244,18 +298,12 @@ class Visualyzer:
         axs[1].tick_params(axis='x', rotation=45)
 
         plt.tight_layout()
-        plt.show()
+        finish_figure(save_path)
     
-    def analyze_trend(self):
-        df = self.train_data.reset_index()
-        # Ensure 'Open' column is correctly identified as 0 (closed) and 1 (open)
-        # Create separate DataFrames for open and closed states
-        open_data = df[df['Open'] == 1]
-        closed_data = df[df['Open'] == 0]
-
-        # Aggregate data by DayOfWeek
-        open_daily_agg = open_data.groupby('DayOfWeek').agg({'Sales': 'mean', 'Customers': 'mean'}).reset_index()
-        closed_daily_agg = closed_data.groupby('DayOfWeek').agg({'Sales': 'mean', 'Customers': 'mean'}).reset_index()
+    def analyze_trend(self, save_path=None):
+        # Average Sales and Customers by DayOfWeek for open (1) and closed (0) days
+        open_daily_agg = self._cube_means('DayOfWeek', where=lambda cube: cube['Open'] == 1).reset_index()
+        closed_daily_agg = self._cube_means('DayOfWeek', where=lambda cube: cube['Open'] == 0).reset_index()
 
         # Plot trends
         fig, ax1 = plt.subplots(figsize=(12, 4))
@@ -280,25 +328,23 @@ class Visualyzer:
         plt.title('Customer Behavior Trends: Open vs Closed by Day of the Week')
         fig.tight_layout()
         plt.legend(loc='upper left', bbox_to_anchor=(0.1,0.9))
-        plt.show()
+        finish_figure(save_path)
         
-    def plot_assortment_sales(self):
-        data = self.train_data.copy()
+    def plot_assortment_sales(self, save_path=None):
+        cube = self.aggregate_cube
         # Map assortment types
         assortment_mapping = {
             'a': 'Basic',
             'b': 'Extra',
             'c': 'Extended'
         }
-        data['AssortmentType'] = data['Assortment'].map(assortment_mapping)
-        
-        # Filter data for weekdays and weekends
-        weekday_data = data[data['DayOfWeek'] <= 5]
-        weekend_data = data[data['DayOfWeek'] >= 6]
+        assortment_type = cube['Assortment'].astype(object).map(assortment_mapping).rename('AssortmentType')
         
-        # Calculate average sales for each assortment type
-        weekday_sales = weekday_data.groupby('AssortmentType')['Sales'].mean().reset_index()
-        weekend_sales = weekend_data.groupby('AssortmentType')['Sales'].mean().reset_index()
+        # Calculate average sales for each assortment type on weekdays and weekends
+        weekday_sales = self._cube_means(assortment_type, where=lambda cube: cube['DayOfWeek'] <= 5,
+                                         columns=['Sales']).reset_index()
+        weekend_sales = self._cube_means(assortment_type, where=lambda cube: cube['DayOfWeek'] >= 6,
+                                         columns=['Sales']).reset_index()
         
         # Plotting
         fig, ax = plt.subplots(1, 2, figsize=(14, 6), sharey=True)
@@ -316,5 +362,62 @@ class Visualyzer:
         ax[1].set_ylabel('Average Sales')
         
         plt.tight_layout()
-        plt.show()
-        
\ No newline at end of file
+        finish_figure(save_path)
+        
+    def event_lift(self, event='holiday', window=7):
+        """
+        Returns the EventWindowLift of `event` ('holiday', 'promo', 'school_holiday' or a flag
+        column) over the training data, for every store at once.
+        """
+        return EventWindowLift(self.train_data, event=event, window=window)
+
+    def plot_event_lift(self, event='holiday', window=7, segment=None, save_path=None):
+        """
+        Plots the mean sales lift per day around the start of holidays or promotions.
+
+        Parameters:
+        event (str): 'holiday', 'promo', 'school_holiday' or the name of a flag column.
+        window (int): Days before and after the event start to plot.
+        segment (str, optional): Column splitting the lift into one line per value, such as
+            StoreType, Assortment or StateHoliday; by default one line over all stores.
+        save_path (str, optional): Writes the figure to this file instead of showing it.
+        """
+        lift = self.event_lift(event, window)
+        curves = lift.lift_by_segment(segment) if segment else lift.lift_by_offset().to_frame('All stores').T
+
+        plt.figure(figsize=(12, 4))
+        for label, curve in curves.iterrows():
+            plt.plot(curve.index, 100 * curve.to_numpy(), marker='o', label=str(label))
+        plt.axvline(0, color='grey', linestyle='--')
+        plt.axhline(0, color='grey', linewidth=0.8)
+        plt.title(f'Sales Lift Around {event.replace("_", " ").title()} Starts ({len(lift)} events)')
+        plt.xlabel('Days from Event Start')
+        plt.ylabel('Lift vs Store Baseline (%)')
+        plt.legend()
+        plt.tight_layout()
+        finish_figure(save_path)
+
+    # Plots of the EDA report, in page order
+    REPORT_PLOTS = ['check_promotion_distribution', 'compare_sales_behavior', 'seasonal_sales_behavior',
+                    'plot_promo_impact', '_high_impact_stores', 'analyze_trend', 'plot_assortment_sales',
+                    'plot_event_lift']
+
+    def render_report(self, output_dir, methods=None, n_workers=None, image_format='png', dpi=100):
+        """
+        Renders the plots headlessly (Agg backend) across a process pool and writes them,
+        with an index.html page, to `output_dir`.
+
+        Parameters:
+        output_dir (str): Directory the report is written to.
+        methods (list, optional): Plot methods to render, or (name, kwargs) pairs; defaults to REPORT_PLOTS.
+        n_workers (int, optional): Number of worker processes (default is every available core).
+        image_format (str): 'png' or 'svg'.
+        dpi (int): Resolution of the images.
+
+        Returns:
+        dict: The file of every plot, and 'index' for the HTML page.
+        """
+        # Build the cube before the workers start so they all inherit it
+        self.aggregate_cube
+        renderer = ReportRenderer(output_dir, n_workers=n_workers, image_format=image_format, dpi=dpi)
+        return renderer.render(self, methods or self.REPORT_PLOTS, title='Rossmann EDA Report')
@@ -0,0 +1,109 @@
+# scripts/dtype_schema.py
+
+import numpy as np
+import pandas as pd # for manipulating the dataset
+
+# Storage types for the Rossmann columns. Flags become int8 rather than bool so they can
+# still be summed, averaged and compared with 1 like the original numeric columns.
+ROSSMANN_SCHEMA = {
+    # Identifiers
+    'Store': 'int16',
+    'Id': 'int32',
+    # Flags and small codes
+    'DayOfWeek': 'int8',
+    'Open': 'int8',
+    'Promo': 'int8',
+    'SchoolHoliday': 'int8',
+    'Promo2': 'int8',
+    # Counts
+    'Sales': 'int32',
+    'Customers': 'int32',
+    # Measurements that can be missing
+    'CompetitionDistance': 'float32',
+    'CompetitionOpenSinceMonth': 'float32',
+    'CompetitionOpenSinceYear': 'float32',
+    'Promo2SinceWeek': 'float32',
+    'Promo2SinceYear': 'float32',
+    # Dates are parsed rather than categorized: pd.to_datetime keeps a categorical column
+    # categorical, which breaks the date arithmetic of the feature steps
+    'Date': 'datetime64[ns]',
+    # Low-cardinality strings
+    'StateHoliday': 'category',
+    'StoreType': 'category',
+    'Assortment': 'category',
+    'PromoInterval': 'category',
+}
+
+
+def memory_usage_mb(df: pd.DataFrame) -> float:
+    """Returns the memory used by a DataFrame in MB, including the contents of object columns."""
+    return df.memory_usage(deep=True).sum() / 2**20
+
+
+def memory_report(before_mb: float, after_mb: float) -> None:
+    """Prints the memory used before and after downcasting."""
+    print(f"Memory usage: {before_mb:,.1f} MB -> {after_mb:,.1f} MB ({before_mb / max(after_mb, 1e-9):.1f}x smaller)")
+
+
+def _fits_integer(series: pd.Series, target: str) -> bool:
+    """Whether every value of a numeric column is a whole number within the range of `target`."""
+    values = series.to_numpy()
+    if values.size == 0:
+        return True
+    limits = np.iinfo(target)
+    if values.dtype.kind == 'f' and not (np.isfinite(values).all() and (values == np.round(values)).all()):
+        return False
+    return limits.min <= values.min() and values.max() <= limits.max
+
+
+def downcast(df: pd.DataFrame, schema: dict = None, verbose: bool = False) -> pd.DataFrame:
+    """
+    Narrows the columns of a DataFrame to the storage types in `schema`.
+
+    Integer targets are applied to integer columns, and to float columns that only hold
+    whole numbers (e.g. flags read with an explicit float dtype); a float column with
+    missing or fractional values becomes float32 instead. String columns listed as
+    'category' are normalized to str first, so the mixed 0 / '0' StateHoliday values the
+    CSV parser produces end up in one category. String or categorical columns with a
+    datetime64 target are parsed to dates. Columns that are not in the schema, and
+    values that would not fit the target type, are left alone.
+
+    Args:
+        df (pd.DataFrame): The data. Modified in place.
+        schema (dict): Column name to dtype. Defaults to ROSSMANN_SCHEMA.
+        verbose (bool): Print the memory used before and after.
+
+    Returns:
+        pd.DataFrame: The same DataFrame with compact column types.
+    """
+    if schema is None:
+        schema = ROSSMANN_SCHEMA
+    before = memory_usage_mb(df) if verbose else None
+
+    for column, target in schema.items():
+        if column not in df.columns:
+            continue
+        series = df[column]
+        if series.dtype == target:
+            continue
+        if target == 'category':
+            if pd.api.types.is_object_dtype(series.dtype) or pd.api.types.is_string_dtype(series.dtype):
+                df[column] = series.where(series.isna(), series.astype(str)).astype('category')
+        elif np.dtype(target).kind == 'M':
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                df[column] = pd.to_datetime(series.astype(object))
+            elif pd.api.types.is_object_dtype(series.dtype) or pd.api.types.is_string_dtype(series.dtype):
+                df[column] = pd.to_datetime(series)
+        elif np.dtype(target).kind == 'i':
+            if pd.api.types.is_bool_dtype(series.dtype):
+                df[column] = series.astype(target)
+            elif pd.api.types.is_numeric_dtype(series.dtype) and _fits_integer(series, target):
+                df[column] = series.astype(target)
+            elif pd.api.types.is_float_dtype(series.dtype):
+                df[column] = series.astype('float32')
+        elif pd.api.types.is_float_dtype(series.dtype):
+            df[column] = series.astype(target)
+
+    if verbose:
+        memory_report(before, memory_usage_mb(df))
+    return df
@@ -0,0 +1,156 @@
+import numpy as np
+import pandas as pd
+
+# Built-in event definitions: a function of the rows returning the event flag of every row
+EVENTS = {
+    'holiday': lambda data: data['StateHoliday'].astype(str).isin(['a', 'b', 'c']).to_numpy(),
+    'promo': lambda data: (data['Promo'] == 1).to_numpy(),
+    'school_holiday': lambda data: (data['SchoolHoliday'] == 1).to_numpy(),
+}
+
+
+def _nanmean(values, axis):
+    """np.nanmean that returns NaN for all-NaN slices without a 'Mean of empty slice' warning."""
+    counts = np.sum(~np.isnan(values), axis=axis)
+    totals = np.nansum(values, axis=axis)
+    return np.divide(totals, counts, out=np.full(np.shape(totals), np.nan), where=counts > 0)
+
+
+class EventWindowLift:
+    """
+    Sales lift in a window of days around the start of every holiday or promotion, for
+    all stores at once.
+
+    The rows are scattered into dense (store, day) grids of sales and event flags. An
+    event starts on a day flagged for a store whose previous calendar day is not
+    flagged, so consecutive days (a five-day promo, Christmas) are one event and windows
+    never cross from one store into the next. The window of every event is gathered
+    with a single fancy index into the sales grid, padded with NaN so windows at the
+    edges of the history are simply shorter.
+
+    Lift is the sales of a window day relative to the store's baseline, the mean sales
+    on its open days that are not within `window` days of any event: 0.1 means 10%
+    above normal. Closed and missing days are NaN and ignored by every mean.
+
+    Attributes
+    ----------
+    offsets : np.ndarray
+        Day offsets relative to the event start, -window ... +window.
+    event_store : np.ndarray
+        Store of every event.
+    event_date : pd.DatetimeIndex
+        Start date of every event.
+    baseline : pd.Series
+        Baseline sales per store.
+    lift : np.ndarray
+        Lift of shape (n_events, n_offsets).
+    """
+
+    def __init__(self, data, event='holiday', window=7, target_column='Sales', store_column='Store',
+                 date_column='Date'):
+        """
+        Parameters
+        ----------
+        data : pd.DataFrame
+            Store-day rows with the store, date, target and event columns. The store and
+            date may also be index levels.
+        event : str or array-like
+            'holiday' (StateHoliday a, b or c), 'promo', 'school_holiday', the name of any
+            flag column (nonzero is an event), or a boolean flag per row.
+        window : int
+            Days before and after the event start to include.
+        target_column : str
+            Column the lift is measured on.
+        store_column : str
+            Column (or index level) identifying the store.
+        date_column : str
+            Column (or index level) holding the date.
+        """
+        self.window = int(window)
+        self.offsets = np.arange(-self.window, self.window + 1)
+        self._data = data
+        self._store_column = store_column
+
+        stores = self._values(data, store_column)
+        dates = pd.to_datetime(self._values(data, date_column))
+        day_numbers = dates.to_numpy().astype('datetime64[D]').astype(np.int64)
+        first_day = day_numbers.min()
+        self._day_index = day_numbers - first_day
+        n_days = int(self._day_index.max()) + 1
+        self.dates = pd.date_range(pd.Timestamp(first_day, unit='D'), periods=n_days, freq='D')
+        self.stores, self._store_index = np.unique(stores, return_inverse=True)
+
+        if isinstance(event, str):
+            flags = EVENTS[event](data) if event in EVENTS else (data[event].to_numpy() != 0)
+        else:
+            flags = np.asarray(event, dtype=bool)
+
+        # Dense grids; closed and missing days have no sales
+        sales = np.asarray(data[target_column], dtype=np.float64).copy()
+        if 'Open' in data.columns:
+            sales[data['Open'].to_numpy() != 1] = np.nan
+        self._sales = np.full((len(self.stores), n_days), np.nan)
+        self._sales[self._store_index, self._day_index] = sales
+        events = np.zeros((len(self.stores), n_days), dtype=bool)
+        events[self._store_index, self._day_index] = flags
+
+        starts = events.copy()
+        starts[:, 1:] &= ~events[:, :-1]
+        store_of_event, self._event_day = np.nonzero(starts)
+        self.event_store = self.stores[store_of_event]
+        self.event_date = self.dates[self._event_day]
+        self._store_of_event = store_of_event
+
+        # Baseline: open days farther than `window` days from every event day
+        counts = np.cumsum(np.pad(events, ((0, 0), (self.window + 1, self.window))), axis=1, dtype=np.int64)
+        near_event = (counts[:, 2 * self.window + 1:] - counts[:, :-2 * self.window - 1]) > 0
+        quiet = np.where(near_event, np.nan, self._sales)
+        baseline = _nanmean(np.where(np.isnan(quiet).all(axis=1, keepdims=True), self._sales, quiet), axis=1)
+        self.baseline = pd.Series(baseline, index=pd.Index(self.stores, name=store_column), name='baseline')
+
+        # Gather all windows at once from the NaN-padded sales grid
+        padded = np.pad(self._sales, ((0, 0), (self.window, self.window)), constant_values=np.nan)
+        window_days = self._event_day[:, None] + self.offsets[None, :] + self.window
+        self.sales_windows = padded[store_of_event[:, None], window_days]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self.lift = self.sales_windows / baseline[store_of_event, None] - 1
+
+    @staticmethod
+    def _values(data, column):
+        if column in data.columns:
+            return data[column].to_numpy()
+        return data.index.get_level_values(column).to_numpy()
+
+    def __len__(self):
+        return len(self.event_store)
+
+    def _grouped_mean(self, keys, name):
+        lift = pd.DataFrame(self.lift, columns=pd.Index(self.offsets, name='offset'))
+        return lift.groupby(pd.Index(keys, name=name), observed=True).mean()
+
+    def lift_by_offset(self):
+        """Mean lift per offset day over all events of all stores."""
+        means = _nanmean(self.lift, axis=0) if len(self) else np.full(len(self.offsets), np.nan)
+        return pd.Series(means, index=pd.Index(self.offsets, name='offset'), name='lift')
+
+    def lift_by_store(self):
+        """Mean lift per offset day for every store (stores x offsets)."""
+        return self._grouped_mean(self.event_store, self._store_column)
+
+    def lift_by_segment(self, segment_column):
+        """
+        Mean lift per offset day for every segment (segments x offsets).
+
+        Parameters
+        ----------
+        segment_column : str
+            Column whose value on the event's start day defines its segment: a store
+            attribute such as StoreType or Assortment, or an event attribute such as
+            StateHoliday (public holiday, Easter, Christmas).
+        """
+        codes, segments = pd.factorize(pd.Series(self._values(self._data, segment_column)).astype(str))
+        grid = np.full(self._sales.shape, -1, dtype=np.int64)
+        grid[self._store_index, self._day_index] = codes
+        event_codes = grid[self._store_of_event, self._event_day]
+        labels = np.where(event_codes >= 0, segments.to_numpy()[event_codes], None)
+        return self._grouped_mean(labels, segment_column)
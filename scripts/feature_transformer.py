@@ -0,0 +1,273 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+
+class FeatureTransformer:
+    """
+    A fitted, serializable form of the DataPreprocessor feature steps.
+
+    `fit` learns everything the steps need from the training history once: the fill value
+    for 'Open', the label-encoder classes, the static store attributes and the running
+    per-store promo count. `transform` then applies the same steps to any new batch without
+    touching the training CSVs, which is what the serving app does with the transformer
+    saved next to the model by `SalesModel.save_model`.
+
+    Attributes
+    ----------
+    open_fill_value_ : float
+        Most frequent 'Open' value in the history, used for missing values.
+    classes_ : dict
+        Sorted label classes per encoded column, as learned by LabelEncoder.
+    promo_offsets_ : dict
+        Per-store number of promo days in the history (the last 'Promo_duration' value).
+    store_attributes_ : dict
+        Per-column mapping of Store to its static attributes (StoreType, Assortment, ...).
+    feature_columns_ : list
+        Model input columns produced by `transform`, in training order.
+    """
+
+    LABEL_COLUMNS = ['StateHoliday', 'StoreType', 'Assortment']
+    STORE_COLUMNS = ['StoreType', 'Assortment', 'CompetitionDistance', 'CompetitionOpenSinceMonth',
+                     'CompetitionOpenSinceYear', 'Promo2', 'Promo2SinceWeek', 'Promo2SinceYear', 'PromoInterval']
+    DROP_COLUMNS = ['Customers', 'Id']
+    HOLIDAY = '2023-12-25'
+
+    def __init__(self, target_column='Sales'):
+        """
+        Parameters
+        ----------
+        target_column : str
+            Name of the target column, excluded from `feature_columns_`.
+        """
+        self.target_column = target_column
+        self.open_fill_value_ = None
+        self.classes_ = {}
+        self.promo_offsets_ = {}
+        self.store_attributes_ = {}
+        self.feature_columns_ = None
+        self._open_counts = pd.Series(dtype='float64')
+
+    def fit(self, df):
+        """
+        Learns the transformer state from the raw (cleaned) training history.
+
+        Parameters
+        ----------
+        df : pd.DataFrame
+            The training history, with the columns of train_cleaned.csv.
+
+        Returns
+        -------
+        FeatureTransformer
+            The fitted transformer.
+        """
+        self.__init__(target_column=self.target_column)
+        self.partial_fit(df)
+        self.update(df)
+        self.set_feature_columns(df)
+        return self
+
+    def partial_fit(self, df):
+        """
+        Accumulates the 'Open' fill value, label classes and store attributes from one chunk
+        of history. Fitting chunk by chunk gives the same state as `fit` on the whole history,
+        except for the promo counts, which are advanced with `update`.
+
+        Parameters
+        ----------
+        df : pd.DataFrame
+            A chunk of the training history.
+
+        Returns
+        -------
+        FeatureTransformer
+            The partially fitted transformer.
+        """
+        self._open_counts = self._open_counts.add(df['Open'].value_counts(), fill_value=0)
+        if not self._open_counts.empty:
+            # Same tie-breaking as Series.mode()[0]: the smallest of the most frequent values
+            self.open_fill_value_ = float(self._open_counts[self._open_counts == self._open_counts.max()].index.min())
+
+        for col in self.LABEL_COLUMNS:
+            if col in df:
+                seen = set(self.classes_.get(col, [])) | set(df[col].astype(str).unique())
+                self.classes_[col] = sorted(seen)
+
+        store_columns = [col for col in self.STORE_COLUMNS if col in df]
+        first = df.groupby('Store', observed=True)[store_columns].first()
+        for col in store_columns:
+            mapping = self.store_attributes_.setdefault(col, {})
+            for store, value in first[col].items():
+                if mapping.get(int(store)) is None:
+                    mapping[int(store)] = None if pd.isna(value) else value.item() if hasattr(value, 'item') else value
+        return self
+
+    def set_feature_columns(self, sample):
+        """Records the model input columns `transform` produces for rows like `sample`."""
+        self.feature_columns_ = [col for col in self.transform(sample.head(1)).columns if col != self.target_column]
+
+    def update(self, df):
+        """
+        Advances the per-store promo counts past newly arrived rows, so the next
+        `transform` continues 'Promo_duration' from where `df` ends.
+
+        Parameters
+        ----------
+        df : pd.DataFrame
+            Rows that are now part of the history.
+
+        Returns
+        -------
+        FeatureTransformer
+            The updated transformer.
+        """
+        for store, promo_days in df.groupby('Store', observed=True)['Promo'].sum().items():
+            self.promo_offsets_[int(store)] = self.promo_offsets_.get(int(store), 0.0) + float(promo_days)
+        return self
+
+    def drop_columns(self, df):
+        """Drops columns that are not available at prediction time."""
+        df.drop(columns=self.DROP_COLUMNS, errors='ignore', inplace=True)
+
+    def fill_missing_values(self, df):
+        """Fills missing 'Open' values with the mode learned from the history."""
+        df.fillna({'Open': self.open_fill_value_}, inplace=True)
+
+    def add_store_attributes(self, df):
+        """Adds static store attributes that are missing from `df`, looked up by Store."""
+        for col, mapping in self.store_attributes_.items():
+            if col not in df:
+                df[col] = df['Store'].map(mapping)
+
+    def add_datetime_features(self, df):
+        """Extract datetime features such as weekday, month, and holiday-related variables."""
+        holiday = pd.to_datetime(self.HOLIDAY)
+        dates = df['Date']
+        if isinstance(dates.dtype, pd.CategoricalDtype):
+            # pd.to_datetime maps a categorical through its categories and keeps it categorical
+            dates = dates.astype(str)
+        df['Date'] = pd.to_datetime(dates)
+
+        # Extract features
+        df['Weekday'] = df['Date'].dt.weekday  # Weekday (0=Monday, 6=Sunday)
+        df['IsWeekend'] = (df['Weekday'] >= 5).astype(int)
+        df['Month'] = df['Date'].dt.month
+        # df['Year'] = df['Date'].dt.year # Least important
+
+        # Calculate days to/from a specific holiday (e.g., Christmas)
+        df['DaysToHoliday'] = (holiday - df['Date']).dt.days
+        df['DaysAfterHoliday'] = (df['Date'] - holiday).dt.days
+
+        # Identify periods within the month
+        day = df['Date'].dt.day
+        df['IsBeginningOfMonth'] = (day <= 7).astype(int)
+        df['IsMidMonth'] = ((day > 7) & (day <= 21)).astype(int)
+        df['IsEndOfMonth'] = (day > 21).astype(int)
+
+        # Drop unnecessary columns
+        df.drop(columns=['Date', 'Dataset', 'CompetitionOpenSinceMonth', 'CompetitionOpenSinceYear'],
+                errors='ignore', inplace=True)
+
+    def add_holiday_and_promo_features(self, df, continue_promo=True):
+        """
+        Adds the 'IsHoliday' flag and the cumulative per-store 'Promo_duration'.
+
+        With `continue_promo` the cumulative count starts from each store's promo days in the
+        history instead of from zero, so new batches line up with the training features.
+        """
+        # JSON rows and the mixed-type Rossmann CSV can hold the integer 0 as well as '0'
+        df['IsHoliday'] = ((df['StateHoliday'].astype(str) != '0') | (df['SchoolHoliday'] == 1)).astype(int)
+        # Counted in at least int64: a grouped cumsum of an int8 'Promo' stays int8 when the
+        # counts fit, and the history's promo days added below would then overflow
+        promo = df['Promo'].astype(np.promote_types(df['Promo'].dtype, np.int64))
+        df['Promo_duration'] = promo.groupby(df['Store']).cumsum()
+        if continue_promo:
+            offsets = df['Store'].map(self.promo_offsets_).fillna(0)
+            df['Promo_duration'] += offsets.to_numpy(dtype=df['Promo_duration'].dtype)
+
+    def encode_categorical(self, df):
+        """Label-encodes the categorical columns with the classes learned in `fit`."""
+        for col, classes in self.classes_.items():
+            values = df[col].astype(str)
+            codes = pd.Categorical(values, categories=classes).codes.astype(np.int64)
+            if (codes < 0).any():
+                unseen = sorted(set(values[codes < 0]))
+                raise ValueError(f"{col} contains previously unseen labels: {unseen}")
+            df[col] = codes
+
+    def transform(self, df, continue_promo=True):
+        """
+        Applies all feature steps to a copy of `df`.
+
+        Parameters
+        ----------
+        df : pd.DataFrame
+            New rows with at least Store, Date, Open, Promo, StateHoliday and SchoolHoliday.
+            Store attributes that are missing are filled in from the fitted history.
+        continue_promo : bool
+            Continue 'Promo_duration' from the history (default) or restart it at zero.
+
+        Returns
+        -------
+        pd.DataFrame
+            The transformed features.
+        """
+        df = df.reset_index(drop=True)
+        self.drop_columns(df)
+        self.fill_missing_values(df)
+        self.add_store_attributes(df)
+        self.add_datetime_features(df)
+        self.add_holiday_and_promo_features(df, continue_promo=continue_promo)
+        self.encode_categorical(df)
+        return df
+
+    def transform_features(self, df):
+        """Returns the model input matrix for `df` as a float array in `feature_columns_` order."""
+        return self.transform(df)[self.feature_columns_].to_numpy(dtype=np.float64)
+
+    def to_dict(self):
+        return {
+            'target_column': self.target_column,
+            'open_fill_value': self.open_fill_value_,
+            'classes': self.classes_,
+            'promo_offsets': {str(store): value for store, value in self.promo_offsets_.items()},
+            'store_attributes': {col: {str(store): value for store, value in mapping.items()}
+                                 for col, mapping in self.store_attributes_.items()},
+            'feature_columns': self.feature_columns_,
+        }
+
+    @classmethod
+    def from_dict(cls, state):
+        transformer = cls(target_column=state['target_column'])
+        transformer.open_fill_value_ = state['open_fill_value']
+        transformer.classes_ = state['classes']
+        transformer.promo_offsets_ = {int(store): value for store, value in state['promo_offsets'].items()}
+        transformer.store_attributes_ = {col: {int(store): value for store, value in mapping.items()}
+                                         for col, mapping in state['store_attributes'].items()}
+        transformer.feature_columns_ = state['feature_columns']
+        return transformer
+
+    def save(self, filename):
+        """Saves the fitted state as JSON."""
+        with open(filename, 'w') as f:
+            json.dump(self.to_dict(), f)
+
+    @classmethod
+    def load(cls, filename):
+        """Loads a transformer saved with `save`."""
+        with open(filename) as f:
+            return cls.from_dict(json.load(f))
+
+    @staticmethod
+    def path_for_model(model_path):
+        """Returns the transformer file that belongs next to a model file."""
+        directory, name = os.path.split(model_path)
+        stem = os.path.splitext(name)[0]
+        if stem.startswith('sales_model_'):
+            stem = 'sales_transformer_' + stem[len('sales_model_'):]
+        else:
+            stem = stem + '_transformer'
+        return os.path.join(directory, stem + '.json')
@@ -0,0 +1,139 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+FORECAST_MAGIC = b'SFCT0001'
+_ALIGN = 64
+
+
+class ForecastTable:
+    """
+    Materialized forecasts of a fixed grid of stores x future dates.
+
+    The forecasts are a dense float32 array indexed by (store position, day offset from
+    `start_date`); cells outside the grid are NaN. A store's position comes from a dense
+    array indexed by store id, so looking up any number of (store, date) pairs is a
+    handful of vectorized index operations, with no model involved.
+
+    `save` writes a small JSON header followed by the array, 64-byte aligned, and `load`
+    memory-maps it, so serving workers share one copy in the page cache.
+
+    Attributes
+    ----------
+    values : np.ndarray
+        Forecasts of shape (n_stores, n_days).
+    stores : np.ndarray
+        Store ids, in row order.
+    start_date : pd.Timestamp
+        Date of day offset 0.
+    metadata : dict
+        Free-form information saved with the table (e.g. the model it was built with).
+    """
+
+    def __init__(self, values, stores, start_date, metadata=None):
+        """
+        Parameters
+        ----------
+        values : np.ndarray
+            Forecasts of shape (n_stores, n_days).
+        stores : array-like
+            Store id of every row of `values`.
+        start_date : date-like
+            Date of the first column of `values`.
+        metadata : dict or None
+            Free-form information saved with the table.
+        """
+        self.values = values
+        self.stores = np.asarray(stores, dtype=np.int64)
+        self.start_date = pd.Timestamp(start_date).normalize()
+        self.metadata = metadata or {}
+        self._position = np.full(int(self.stores.max()) + 1 if len(self.stores) else 0, -1, dtype=np.int64)
+        self._position[self.stores] = np.arange(len(self.stores))
+
+    @classmethod
+    def from_predictions(cls, stores, dates, predictions, metadata=None):
+        """
+        Scatters row-wise predictions into a table.
+
+        Parameters
+        ----------
+        stores : array-like
+            Store of every prediction.
+        dates : array-like
+            Date of every prediction.
+        predictions : array-like
+            The predicted values.
+        metadata : dict or None
+            Free-form information saved with the table.
+
+        Returns
+        -------
+        ForecastTable
+        """
+        day_numbers = pd.to_datetime(pd.Index(dates)).to_numpy().astype('datetime64[D]').astype(np.int64)
+        first_day = day_numbers.min()
+        unique_stores, store_index = np.unique(np.asarray(stores, dtype=np.int64), return_inverse=True)
+        values = np.full((len(unique_stores), int(day_numbers.max() - first_day) + 1), np.nan, dtype=np.float32)
+        values[store_index, day_numbers - first_day] = predictions
+        return cls(values, unique_stores, pd.Timestamp(first_day, unit='D'), metadata)
+
+    @property
+    def dates(self):
+        """Dates of the table's columns."""
+        return pd.date_range(self.start_date, periods=self.values.shape[1], freq='D')
+
+    def lookup(self, stores, dates):
+        """
+        Returns the forecast of every (store, date) pair, NaN where the grid has none.
+
+        Parameters
+        ----------
+        stores : array-like
+            Store ids.
+        dates : array-like
+            Dates, one per store.
+
+        Returns
+        -------
+        np.ndarray
+            The forecasts, as float64.
+        """
+        stores = np.atleast_1d(np.asarray(stores, dtype=np.int64))
+        offsets = (pd.to_datetime(pd.Index(np.atleast_1d(dates))).normalize() - self.start_date).days.to_numpy()
+        in_range = (stores >= 0) & (stores < len(self._position))
+        positions = np.where(in_range, self._position[np.where(in_range, stores, 0)], -1)
+        valid = (positions >= 0) & (offsets >= 0) & (offsets < self.values.shape[1])
+
+        forecasts = np.full(len(stores), np.nan)
+        forecasts[valid] = self.values[positions[valid], offsets[valid]]
+        return forecasts
+
+    def save(self, filename):
+        """Writes the table: magic bytes, header length (uint64), JSON header, then the aligned array."""
+        values = np.ascontiguousarray(self.values, dtype=np.float32)
+        header = json.dumps({
+            'stores': self.stores.tolist(),
+            'start_date': self.start_date.strftime('%Y-%m-%d'),
+            'shape': list(values.shape),
+            'metadata': self.metadata,
+        }).encode()
+        data_start = -(-(len(FORECAST_MAGIC) + 8 + len(header)) // _ALIGN) * _ALIGN
+        with open(filename, 'wb') as f:
+            f.write(FORECAST_MAGIC)
+            f.write(np.uint64(len(header)).tobytes())
+            f.write(header)
+            f.seek(data_start)
+            f.write(values.tobytes())
+
+    @classmethod
+    def load(cls, filename):
+        """Memory-maps a table written by `save`."""
+        with open(filename, 'rb') as f:
+            if f.read(len(FORECAST_MAGIC)) != FORECAST_MAGIC:
+                raise ValueError(f"{filename} is not a forecast table.")
+            header_length = int(np.frombuffer(f.read(8), dtype=np.uint64)[0])
+            header = json.loads(f.read(header_length))
+        data_start = -(-(len(FORECAST_MAGIC) + 8 + header_length) // _ALIGN) * _ALIGN
+        values = np.memmap(filename, dtype=np.float32, mode='r', offset=data_start, shape=tuple(header['shape']))
+        return cls(values, header['stores'], header['start_date'], header['metadata'])
@@ -0,0 +1,547 @@
+import json
+
+import numpy as np
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+
+FOREST_MAGIC = b'SFOR0001'
+_ALIGN = 64
+_NODE_ARRAYS = ['feature', 'threshold', 'left', 'right', 'value', 'roots']
+
+_SIGN_BIT = np.int64(-2**63)
+_MAGNITUDE_BITS = np.int64(2**63 - 1)
+
+
+def _float_to_key(x):
+    """Maps float64 values to int64 keys with the same ordering (for bisection over floats)."""
+    bits = np.asarray(x, dtype=np.float64).view(np.int64)
+    return np.where(bits >= 0, bits, -(bits & _MAGNITUDE_BITS))
+
+
+def _key_to_float(key):
+    """Inverse of `_float_to_key`."""
+    bits = np.where(key >= 0, key, (-key) | _SIGN_BIT)
+    return bits.view(np.float64)
+
+
+def fuse_thresholds(feature, threshold, mean, scale):
+    """
+    Rewrites split thresholds of a tree trained on standardized inputs into raw-input space.
+
+    A tree fitted behind a StandardScaler sends a sample left when
+    ``float32((x - mean) / scale) <= threshold``. That transform is monotone, so the
+    set of raw float64 values going left is exactly ``x <= t_raw`` for the largest
+    float64 ``t_raw`` that still satisfies the original test. ``t_raw`` is found by
+    bisection over the ordered float64 bit patterns, vectorized over all nodes, which
+    reproduces the float64 arithmetic and the float32 cast bit for bit.
+
+    Parameters
+    ----------
+    feature : np.ndarray
+        Feature index of every split node.
+    threshold : np.ndarray
+        Split threshold of every split node, in scaled space.
+    mean : np.ndarray
+        Per-feature mean subtracted by the scaler (zeros if none).
+    scale : np.ndarray
+        Per-feature scale the inputs are divided by (ones if none).
+
+    Returns
+    -------
+    np.ndarray
+        float64 thresholds to compare raw inputs against.
+    """
+    node_mean = mean[feature]
+    node_scale = scale[feature]
+
+    def goes_left(key):
+        x = _key_to_float(key)
+        with np.errstate(over='ignore', invalid='ignore'):
+            return ((x - node_mean) / node_scale).astype(np.float32) <= threshold
+
+    lo = np.full(len(threshold), _float_to_key(-np.inf), dtype=np.int64)
+    hi = np.full(len(threshold), _float_to_key(np.inf), dtype=np.int64)
+
+    # Invariant: lo goes left, hi goes right
+    while True:
+        pending = hi - 1 > lo
+        if not pending.any():
+            break
+        mid = (lo >> 1) + (hi >> 1) + (lo & hi & 1)
+        left = goes_left(mid)
+        lo = np.where(pending & left, mid, lo)
+        hi = np.where(pending & ~left, mid, hi)
+
+    return _key_to_float(lo)
+
+
+def float32_floor(x):
+    """
+    Rounds float64 values down to float32.
+
+    For a float32-representable input ``v``, ``v <= x`` holds exactly when
+    ``v <= float32_floor(x)``, so split thresholds narrowed this way keep every decision
+    for such inputs (integers below 2**24, float32 data, ...).
+    """
+    x = np.asarray(x, dtype=np.float64)
+    narrowed = x.astype(np.float32)
+    too_high = narrowed.astype(np.float64) > x
+    narrowed[too_high] = np.nextafter(narrowed[too_high], np.float32(-np.inf))
+    return narrowed
+
+
+def _index_dtype(n):
+    return np.int32 if n < 2**31 else np.int64
+
+
+class FlatForest:
+    """
+    A RandomForest regressor compiled into contiguous NumPy node arrays.
+
+    The StandardScaler of a `SalesModel` pipeline is fused into the split thresholds and
+    all trees are packed into one set of arrays, so prediction is a handful of vectorized
+    gathers over the whole batch and every tree at once. There is no per-call input
+    validation or joblib dispatch, which dominates sklearn's latency for small batches.
+
+    Predictions are bit-identical to the source pipeline's predictions computed with
+    `n_jobs=1`. With `n_jobs>1` sklearn sums tree outputs in thread completion order,
+    so its own results can differ from run to run in the last bits.
+
+    `compact` returns a smaller copy for deployment (float32 or quantized values, float32
+    thresholds, narrow indices, optionally pruned), which `save_mapped` writes to a
+    single aligned file that `load_mapped` memory-maps instead of reading.
+
+    Attributes
+    ----------
+    feature : np.ndarray
+        Feature index tested at each node (0 for leaves).
+    threshold : np.ndarray
+        Raw-input split threshold at each node.
+    left, right : np.ndarray
+        Global index of the left/right child of each node (-1 for leaves).
+    value : np.ndarray
+        Prediction stored at each node, or its code in `codebook`.
+    codebook : np.ndarray or None
+        Distinct leaf values of a quantized forest, indexed by `value`.
+    roots : np.ndarray
+        Global index of the root node of each tree.
+    feature_names : list or None
+        Column names the model was trained on, if known.
+    """
+
+    def __init__(self, feature, threshold, left, right, value, roots, n_features, feature_names=None,
+                 codebook=None):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.n_features = int(n_features)
+        self.feature_names = list(feature_names) if feature_names is not None else None
+        self.codebook = codebook
+
+    @classmethod
+    def from_pipeline(cls, model):
+        """
+        Compiles a fitted forest, optionally preceded by a StandardScaler in a Pipeline.
+
+        Parameters
+        ----------
+        model : sklearn Pipeline or forest estimator
+            A fitted `Pipeline([('scaler', StandardScaler()), ('model', RandomForestRegressor())])`
+            as built by `SalesModel`, or a bare fitted forest regressor.
+
+        Returns
+        -------
+        FlatForest
+        """
+        scaler = None
+        forest = model
+        if isinstance(model, Pipeline):
+            steps = [step for _, step in model.steps if step not in (None, 'passthrough')]
+            if len(steps) == 2 and isinstance(steps[0], StandardScaler):
+                scaler, forest = steps
+            elif len(steps) == 1:
+                forest = steps[0]
+            else:
+                raise ValueError("Only a forest optionally preceded by a StandardScaler can be compiled.")
+
+        if not hasattr(forest, 'estimators_'):
+            raise ValueError("The forest must be fitted before it can be compiled.")
+        if getattr(forest, 'n_outputs_', 1) != 1:
+            raise ValueError("Only single-output forests can be compiled.")
+
+        n_features = forest.n_features_in_
+        mean = np.zeros(n_features)
+        scale = np.ones(n_features)
+        if scaler is not None:
+            if scaler.mean_ is not None:
+                mean = scaler.mean_
+            if scaler.scale_ is not None:
+                scale = scaler.scale_
+
+        feature_names = getattr(model, 'feature_names_in_', None)
+
+        features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+        offset = 0
+        for estimator in forest.estimators_:
+            tree = estimator.tree_
+            is_leaf = tree.children_left == -1
+
+            roots.append(offset)
+            features.append(np.where(is_leaf, 0, tree.feature))
+            thresholds.append(tree.threshold)
+            lefts.append(np.where(is_leaf, -1, tree.children_left + offset))
+            rights.append(np.where(is_leaf, -1, tree.children_right + offset))
+            values.append(tree.value[:, 0, 0])
+            offset += tree.node_count
+
+        feature = np.concatenate(features).astype(np.int64)
+        threshold = np.concatenate(thresholds).astype(np.float64)
+        left = np.concatenate(lefts).astype(np.int64)
+        right = np.concatenate(rights).astype(np.int64)
+        value = np.concatenate(values).astype(np.float64)
+
+        split = left >= 0
+        threshold[split] = fuse_thresholds(feature[split], threshold[split], mean, scale)
+        threshold[~split] = np.inf
+
+        return cls(feature, threshold, left, right, value, np.asarray(roots, dtype=np.int64),
+                   n_features, feature_names)
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @property
+    def n_nodes(self):
+        return len(self.left)
+
+    @property
+    def nbytes(self):
+        """Memory (or file space) taken by the node arrays."""
+        arrays = [getattr(self, name) for name in _NODE_ARRAYS]
+        if self.codebook is not None:
+            arrays.append(self.codebook)
+        return sum(array.nbytes for array in arrays)
+
+    def node_values(self, nodes=None):
+        """Returns the float64 prediction of the given nodes (all nodes by default), decoding quantized values."""
+        values = self.value if nodes is None else self.value[nodes]
+        if self.codebook is not None:
+            values = self.codebook[values]
+        return np.asarray(values, dtype=np.float64)
+
+    def _as_matrix(self, X):
+        if hasattr(X, 'columns') and self.feature_names is not None:
+            X = X[self.feature_names]
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.shape[1] != self.n_features:
+            raise ValueError(f"X has {X.shape[1]} features, but the model expects {self.n_features}.")
+        if np.isnan(X).any():
+            raise ValueError("Input X contains NaN.")
+        return X
+
+    def apply(self, X):
+        """
+        Returns the leaf index reached in every tree, as an array of shape (n_samples, n_trees).
+
+        All (sample, tree) pairs advance one level per step; pairs that reached a leaf are
+        dropped from the active set so deep, unbalanced trees do not slow down short paths.
+        """
+        X = self._as_matrix(X)
+        n_samples, n_trees = X.shape[0], self.n_trees
+
+        node = np.tile(self.roots, n_samples)
+        active = np.arange(node.size)
+        sample = active // n_trees
+
+        while active.size:
+            current = node[active]
+            split = self.left[current] >= 0
+            active, current, sample = active[split], current[split], sample[split]
+            if not active.size:
+                break
+            go_left = X[sample, self.feature[current]] <= self.threshold[current]
+            node[active] = np.where(go_left, self.left[current], self.right[current])
+
+        return node.reshape(n_samples, n_trees)
+
+    def predict(self, X):
+        """
+        Predicts target values for X.
+
+        Parameters
+        ----------
+        X : array-like of shape (n_samples, n_features)
+            Raw (unscaled) features, in training column order.
+
+        Returns
+        -------
+        np.ndarray
+            The predicted values.
+        """
+        leaf_values = self.node_values(self.apply(X))
+        # Sum trees left to right, like sklearn's sequential accumulation, then average
+        return np.cumsum(leaf_values, axis=1)[:, -1] / self.n_trees
+
+    def save(self, filename):
+        """Saves the compiled forest to a `.npz` file (path or open binary file)."""
+        metadata = {'n_features': np.int64(self.n_features)}
+        if self.feature_names is not None:
+            metadata['feature_names'] = np.asarray(self.feature_names, dtype=str)
+        if self.codebook is not None:
+            metadata['codebook'] = self.codebook
+        np.savez(filename, feature=self.feature, threshold=self.threshold, left=self.left,
+                 right=self.right, value=self.value, roots=self.roots, **metadata)
+
+    @classmethod
+    def load(cls, filename):
+        """Loads a compiled forest written by `save`."""
+        with np.load(filename) as data:
+            feature_names = data['feature_names'].tolist() if 'feature_names' in data else None
+            codebook = data['codebook'] if 'codebook' in data else None
+            return cls(data['feature'], data['threshold'], data['left'], data['right'],
+                       data['value'], data['roots'], data['n_features'], feature_names, codebook)
+
+    def prune(self, tolerance):
+        """
+        Collapses every subtree whose leaf values all lie within `tolerance` of each other.
+
+        The collapsed subtree becomes a leaf holding the subtree root's own value, i.e. the
+        mean target of its training samples, which lies between the subtree's smallest and
+        largest leaf values. No tree's output, and hence no forest prediction, therefore
+        moves by more than `tolerance`. Unreachable nodes are dropped.
+
+        Parameters
+        ----------
+        tolerance : float
+            Largest spread of leaf values, in target units, that may be collapsed.
+
+        Returns
+        -------
+        FlatForest
+            A new forest with the same dtypes.
+        """
+        if self.codebook is not None:
+            raise ValueError("Prune before quantizing the leaf values.")
+        left, right = self.left.astype(np.int64), self.right.astype(np.int64)
+        value = self.node_values()
+        low, high = value.copy(), value.copy()
+
+        splits = np.flatnonzero(left >= 0)
+        parent = np.full(len(left), -1, dtype=np.int64)
+        parent[left[splits]] = splits
+        parent[right[splits]] = splits
+
+        # Bottom-up: a split collapses once both children are leaves and their spread is small
+        while splits.size:
+            children_l, children_r = left[splits], right[splits]
+            ready = (left[children_l] < 0) & (left[children_r] < 0)
+            splits = splits[ready]
+            children_l, children_r = children_l[ready], children_r[ready]
+            low[splits] = np.minimum(low[children_l], low[children_r])
+            high[splits] = np.maximum(high[children_l], high[children_r])
+            collapse = splits[high[splits] - low[splits] <= tolerance]
+            if not collapse.size:
+                break
+            left[collapse] = -1
+            right[collapse] = -1
+            # Only the parents of collapsed nodes can become ready in the next pass
+            splits = np.unique(parent[collapse])
+            splits = splits[splits >= 0]
+
+        # Keep the reachable nodes, in their original order
+        reachable = np.zeros(len(left), dtype=bool)
+        frontier = self.roots.astype(np.int64)
+        while frontier.size:
+            reachable[frontier] = True
+            frontier = frontier[left[frontier] >= 0]
+            frontier = np.concatenate([left[frontier], right[frontier]])
+        new_index = np.cumsum(reachable) - 1
+        keep = np.flatnonzero(reachable)
+        is_leaf = left[keep] < 0
+
+        index_dtype = self.left.dtype
+        return FlatForest(
+            feature=np.where(is_leaf, 0, self.feature[keep]).astype(self.feature.dtype),
+            threshold=np.where(is_leaf, np.inf, self.threshold[keep]).astype(self.threshold.dtype),
+            left=np.where(is_leaf, -1, new_index[np.maximum(left[keep], 0)]).astype(index_dtype),
+            right=np.where(is_leaf, -1, new_index[np.maximum(right[keep], 0)]).astype(index_dtype),
+            value=self.value[keep],
+            roots=new_index[self.roots].astype(self.roots.dtype),
+            n_features=self.n_features,
+            feature_names=self.feature_names,
+        )
+
+    def quantize(self, bits=8):
+        """
+        Replaces the leaf values by `bits`-bit codes into a codebook of at most 2**bits values.
+
+        Half of the codebook are quantiles of the leaf values, so codes are densest where
+        most leaves are; the other half is an even grid over their range, which bounds the
+        error in the sparse tail (e.g. the few very high-sales leaves) by a 2**-bits share
+        of the range. Every leaf gets its nearest codebook value.
+
+        Parameters
+        ----------
+        bits : int
+            8 or 16.
+
+        Returns
+        -------
+        FlatForest
+            A new forest sharing the other node arrays.
+        """
+        if bits not in (8, 16):
+            raise ValueError("Leaf values can be quantized to 8 or 16 bits.")
+        if self.codebook is not None:
+            raise ValueError("The forest is already quantized.")
+        value = self.node_values()
+        leaves = value[self.left < 0]
+        half = 2**(bits - 1)
+        codebook = np.unique(np.concatenate([
+            np.quantile(leaves, np.linspace(0, 1, half)),
+            np.linspace(leaves.min(), leaves.max(), half),
+        ]).astype(np.float32))
+        boundaries = (codebook[1:].astype(np.float64) + codebook[:-1]) / 2
+        codes = np.searchsorted(boundaries, value).astype(np.uint8 if bits == 8 else np.uint16)
+        return FlatForest(self.feature, self.threshold, self.left, self.right, codes, self.roots,
+                          self.n_features, self.feature_names, codebook)
+
+    def compact(self, value_bits=None, prune_tolerance=None):
+        """
+        Returns a smaller copy of the forest for deployment.
+
+        Thresholds are stored as float32, rounded down so that every split decision is
+        unchanged for float32-representable inputs (all the integer-coded Rossmann
+        features are); features as uint8 (when there are fewer than 256) and child and
+        root indices as int32. Leaf values are stored as float32, or as 8/16-bit codes
+        with `value_bits`. Pruning with `prune_tolerance` happens first, in full precision.
+        Use `compaction_report` to measure what it costs.
+
+        Parameters
+        ----------
+        value_bits : int or None
+            Quantize the leaf values to 8 or 16 bits; None keeps float32 values.
+        prune_tolerance : float or None
+            Collapse subtrees whose leaf values are within this distance (see `prune`).
+
+        Returns
+        -------
+        FlatForest
+        """
+        forest = self.prune(prune_tolerance) if prune_tolerance is not None else self
+        index_dtype = _index_dtype(forest.n_nodes)
+        narrowed = {
+            'feature': forest.feature.astype(np.uint8 if self.n_features < 256 else np.int32),
+            'threshold': float32_floor(forest.threshold),
+            'left': forest.left.astype(index_dtype),
+            'right': forest.right.astype(index_dtype),
+            'roots': forest.roots.astype(index_dtype),
+        }
+        if value_bits is None:
+            return FlatForest(value=forest.node_values().astype(np.float32), n_features=self.n_features,
+                              feature_names=self.feature_names, **narrowed)
+        # Codes are assigned from the full-precision values
+        return FlatForest(value=forest.node_values(), n_features=self.n_features,
+                          feature_names=self.feature_names, **narrowed).quantize(value_bits)
+
+    def save_mapped(self, filename):
+        """
+        Writes the forest to one file that `load_mapped` can memory-map.
+
+        Layout: magic bytes, the header length (uint64), a JSON header with the offset,
+        dtype and shape of every array, then the arrays themselves, each starting on a
+        64-byte boundary. The arrays are written in their current dtypes, so save the
+        result of `compact` to get a small artifact.
+
+        Parameters
+        ----------
+        filename : str
+            Path of the file.
+        """
+        arrays = {name: np.ascontiguousarray(getattr(self, name)) for name in _NODE_ARRAYS}
+        if self.codebook is not None:
+            arrays['codebook'] = np.ascontiguousarray(self.codebook)
+
+        layout, offset = {}, 0
+        for name, array in arrays.items():
+            offset = -(-offset // _ALIGN) * _ALIGN
+            layout[name] = {'offset': offset, 'dtype': array.dtype.str, 'shape': list(array.shape)}
+            offset += array.nbytes
+
+        header = json.dumps({
+            'n_features': self.n_features,
+            'feature_names': self.feature_names,
+            'arrays': layout,
+        }).encode()
+        data_start = -(-(len(FOREST_MAGIC) + 8 + len(header)) // _ALIGN) * _ALIGN
+
+        with open(filename, 'wb') as f:
+            f.write(FOREST_MAGIC)
+            f.write(np.uint64(len(header)).tobytes())
+            f.write(header)
+            for name, array in arrays.items():
+                f.seek(data_start + layout[name]['offset'])
+                f.write(array.tobytes())
+
+    @classmethod
+    def load_mapped(cls, filename):
+        """Memory-maps a forest written by `save_mapped`; nodes are read from disk as trees are traversed."""
+        with open(filename, 'rb') as f:
+            if f.read(len(FOREST_MAGIC)) != FOREST_MAGIC:
+                raise ValueError(f"{filename} is not a compact forest file.")
+            header_length = int(np.frombuffer(f.read(8), dtype=np.uint64)[0])
+            header = json.loads(f.read(header_length))
+        data_start = -(-(len(FOREST_MAGIC) + 8 + header_length) // _ALIGN) * _ALIGN
+
+        arrays = {
+            name: np.memmap(filename, dtype=np.dtype(spec['dtype']), mode='r',
+                            offset=data_start + spec['offset'], shape=tuple(spec['shape']))
+            for name, spec in header['arrays'].items()
+        }
+        return cls(n_features=header['n_features'], feature_names=header['feature_names'], **arrays)
+
+
+def compaction_report(reference, compact, X, y=None):
+    """
+    Measures what compacting a forest costs in accuracy and what it saves in size.
+
+    Parameters
+    ----------
+    reference : FlatForest
+        The full-precision forest.
+    compact : FlatForest
+        The result of `reference.compact(...)`.
+    X : array-like of shape (n_samples, n_features)
+        Rows to compare the predictions on (e.g. the held-out test set).
+    y : array-like or None
+        True targets of X; adds the RMSE of both forests.
+
+    Returns
+    -------
+    dict
+        Node counts, array sizes in bytes, the largest and mean absolute change of the
+        predictions and, with `y`, the RMSE of both forests.
+    """
+    expected = reference.predict(X)
+    predicted = compact.predict(X)
+    change = np.abs(predicted - expected)
+    report = {
+        'nodes': reference.n_nodes,
+        'nodes_compact': compact.n_nodes,
+        'bytes': reference.nbytes,
+        'bytes_compact': compact.nbytes,
+        'size_ratio': compact.nbytes / reference.nbytes,
+        'max_abs_change': float(change.max()) if len(change) else 0.0,
+        'mean_abs_change': float(change.mean()) if len(change) else 0.0,
+    }
+    if y is not None:
+        y = np.asarray(y, dtype=np.float64)
+        report['rmse'] = float(np.sqrt(np.mean((expected - y) ** 2)))
+        report['rmse_compact'] = float(np.sqrt(np.mean((predicted - y) ** 2)))
+    return report
@@ -0,0 +1,160 @@
+import os
+import shutil
+import tempfile
+
+import joblib
+import numpy as np
+from joblib import parallel_config
+from sklearn.base import clone
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401 (enables HalvingGridSearchCV)
+from sklearn.model_selection import GridSearchCV, HalvingGridSearchCV
+
+from core_budget import available_cores, split_core_budget
+
+
+class HyperparameterTuner:
+    """
+    Hyperparameter search with a memory-mapped feature matrix and a fixed core budget.
+
+    `GridSearchCV(n_jobs=-1)` around a forest with `n_jobs=-1` starts one forest thread per
+    core in every search worker and pickles the training data to each of them. This tuner
+    instead dumps X and y once to a memmap that all workers open read-only, and divides
+    `n_jobs` cores between the search workers and the forest's own `n_jobs`. Candidates
+    are evaluated exhaustively (`search='grid'`) or by successive halving
+    (`search='halving'`), which scores every candidate on a small budget first and only
+    gives more samples (or trees) to the best ones.
+
+    Attributes
+    ----------
+    best_params_ : dict
+        The best parameters found.
+    best_score_ : float
+        Mean cross-validated score of the best parameters.
+    best_estimator_ : estimator
+        The estimator refitted with the best parameters on the full training data.
+    cv_results_ : dict
+        The search's cross-validation results.
+    outer_jobs_, inner_jobs_ : int
+        The core split used by the last search.
+    """
+
+    def __init__(self, estimator, param_grid, n_jobs=-1, search='grid', cv=5,
+                 scoring='neg_root_mean_squared_error', inner_jobs=None, inner_param='model__n_jobs',
+                 factor=3, resource='n_samples', min_resources='exhaust', max_resources='auto',
+                 temp_folder=None, verbose=0):
+        """
+        Parameters
+        ----------
+        estimator : sklearn estimator
+            The estimator or pipeline to tune.
+        param_grid : dict
+            Parameter names (str) as keys and lists of settings to try as values.
+        n_jobs : int
+            Total core budget; -1 uses every available core.
+        search : str
+            'grid' for an exhaustive search, 'halving' for successive halving.
+        cv : int or cross-validation generator
+            Cross-validation splitting strategy.
+        scoring : str
+            Scoring used to rank candidates.
+        inner_jobs : int or None
+            Cores given to each fit; see `split_core_budget`.
+        inner_param : str or None
+            Parameter of `estimator` that controls its own parallelism.
+        factor : int
+            Halving only: the candidates kept (1/factor) and the budget growth per round.
+        resource : str
+            Halving only: 'n_samples', or an estimator parameter such as 'model__n_estimators'
+            to stop weak candidates early with fewer trees.
+        min_resources : int or str
+            Halving only: the budget of the first round.
+        max_resources : int or str
+            Halving only: the largest budget; must be set when `resource` is a parameter.
+        temp_folder : str or None
+            Directory for the memmapped data. Defaults to the system temp directory.
+        verbose : int
+            Verbosity of the search.
+        """
+        self.estimator = estimator
+        self.param_grid = param_grid
+        self.n_jobs = n_jobs
+        self.search = search
+        self.cv = cv
+        self.scoring = scoring
+        self.inner_jobs = inner_jobs
+        self.inner_param = inner_param
+        self.factor = factor
+        self.resource = resource
+        self.min_resources = min_resources
+        self.max_resources = max_resources
+        self.temp_folder = temp_folder
+        self.verbose = verbose
+
+    def _n_splits(self):
+        return self.cv if isinstance(self.cv, int) else self.cv.get_n_splits()
+
+    def _n_candidates(self):
+        grids = self.param_grid if isinstance(self.param_grid, list) else [self.param_grid]
+        return sum(int(np.prod([len(values) for values in grid.values()])) for grid in grids)
+
+    def _make_search(self, estimator, outer_jobs):
+        if self.search == 'grid':
+            return GridSearchCV(estimator, self.param_grid, cv=self.cv, scoring=self.scoring,
+                                n_jobs=outer_jobs, refit=False, verbose=self.verbose)
+        if self.search == 'halving':
+            return HalvingGridSearchCV(estimator, self.param_grid, cv=self.cv, scoring=self.scoring,
+                                       factor=self.factor, resource=self.resource,
+                                       min_resources=self.min_resources, max_resources=self.max_resources,
+                                       n_jobs=outer_jobs, refit=False, verbose=self.verbose)
+        raise ValueError(f"Unknown search '{self.search}', expected 'grid' or 'halving'.")
+
+    def fit(self, X, y):
+        """
+        Runs the search on memmapped copies of X and y, then refits the best candidate
+        on the original X and y with the whole core budget.
+
+        Parameters
+        ----------
+        X : pd.DataFrame or np.ndarray
+            Training features.
+        y : pd.Series or np.ndarray
+            Training target values.
+
+        Returns
+        -------
+        HyperparameterTuner
+            The fitted tuner.
+        """
+        n_cores = available_cores() if self.n_jobs in (None, -1) else self.n_jobs
+        self.outer_jobs_, self.inner_jobs_ = split_core_budget(
+            n_cores, self._n_candidates() * self._n_splits(), self.inner_jobs)
+
+        estimator = clone(self.estimator)
+        if self.inner_param:
+            estimator.set_params(**{self.inner_param: self.inner_jobs_})
+
+        folder = tempfile.mkdtemp(prefix='tuning_', dir=self.temp_folder)
+        try:
+            # One read-only copy on disk; workers map it instead of receiving pickled arrays
+            joblib.dump(np.ascontiguousarray(X, dtype=np.float64), os.path.join(folder, 'X.mmap'))
+            joblib.dump(np.ascontiguousarray(y, dtype=np.float64), os.path.join(folder, 'y.mmap'))
+            X_shared = joblib.load(os.path.join(folder, 'X.mmap'), mmap_mode='r')
+            y_shared = joblib.load(os.path.join(folder, 'y.mmap'), mmap_mode='r')
+
+            search = self._make_search(estimator, self.outer_jobs_)
+            # Caps the BLAS/OpenMP threads of every search worker to the inner budget as well
+            with parallel_config(backend='loky', inner_max_num_threads=self.inner_jobs_):
+                search.fit(X_shared, y_shared)
+        finally:
+            shutil.rmtree(folder, ignore_errors=True)
+
+        self.best_params_ = search.best_params_
+        self.best_score_ = search.best_score_
+        self.cv_results_ = search.cv_results_
+
+        # Refit on the original data so the model keeps the DataFrame's feature names
+        self.best_estimator_ = clone(self.estimator).set_params(**self.best_params_)
+        if self.inner_param:
+            self.best_estimator_.set_params(**{self.inner_param: self.n_jobs})
+        self.best_estimator_.fit(X, y)
+        return self
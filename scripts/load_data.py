@@ -3,6 +3,8 @@
 import os # manipulate the files and directories
 import zipfile # unzipp data.zip
 import pandas as pd # for manipulating the dataset
+from columnar_cache import cached_frame # memory-mapped Feather cache of parsed CSVs
+from dtype_schema import downcast, memory_report, memory_usage_mb # compact storage types for the Rossmann columns
 
 def extract_zip(zip_path: str, extract_to: str) -> None:
     """
@@ -29,23 +31,80 @@ def load_csv_from_zip(extracted_dir: str, filename: str) -> pd.DataFrame:
     file_path = os.path.join(extracted_dir, filename)
     return pd.read_csv(file_path, index_col=0)
 
-def load_data(zip_path: str, filename: str, extract_to) -> pd.DataFrame:
+def read_csv_from_zip(zip_path: str, filename: str, usecols=None, dtype=None, chunksize: int = 250_000,
+                      index_col=0, verbose: bool = False) -> pd.DataFrame:
     """
-    Orchestrates the extraction and loading of data from a zip file.
+    Parses one CSV member of a zip file as a stream, without extracting anything to disk.
+
+    The member is decompressed on the fly and parsed `chunksize` rows at a time; each chunk
+    is narrowed to compact dtypes before the next one is read, so peak memory stays close
+    to the size of the final (compact) DataFrame.
+
+    Args:
+        zip_path (str): The path to the zip file.
+        filename (str): The name of the CSV file inside the zip.
+        usecols (list): Columns to parse; the others are skipped by the parser.
+        dtype (dict): Column types passed to `pd.read_csv`.
+        chunksize (int): Number of rows parsed per chunk.
+        index_col (int or str): Column to use as the index (position within `usecols` if given).
+        verbose (bool): Print the memory used before and after downcasting.
+
+    Returns:
+        pd.DataFrame: The loaded data as a pandas DataFrame.
+    """
+    chunks = []
+    parsed_mb = 0.0
+    with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+        with zip_ref.open(filename) as stream:
+            for chunk in pd.read_csv(stream, usecols=usecols, dtype=dtype, index_col=index_col,
+                                     chunksize=chunksize, low_memory=False):
+                if verbose:
+                    parsed_mb += memory_usage_mb(chunk)
+                chunks.append(downcast(chunk))
+
+    # Chunks can end up with different category sets; downcast again to unify them
+    df = downcast(pd.concat(chunks))
+    if verbose:
+        memory_report(parsed_mb, memory_usage_mb(df))
+    return df
+
+def load_data(zip_path: str, filename: str, extract_to=None, usecols=None, dtype=None, chunksize: int = 250_000,
+              cache_dir: str = None, use_cache: bool = True, verbose: bool = False) -> pd.DataFrame:
+    """
+    Orchestrates the loading of one CSV file from a zip file.
+
+    Only the requested member is read, streamed straight out of the archive and parsed in
+    chunks (see `read_csv_from_zip`); nothing is extracted to disk. Parsed members are cached
+    as memory-mapped Feather files keyed on the member's checksum in the zip directory, so
+    later loads skip the CSV parsing too. When the zip changes the checksum changes and the
+    CSV is parsed again.
 
     Args:
         zip_path (str): The path to the zip file.
         filename (str): The name of the CSV file to load.
+        extract_to (str): Unused; kept for backwards compatibility now that nothing is extracted.
+        usecols (list): Columns to load; the others are skipped by the parser.
+        dtype (dict): Column types passed to `pd.read_csv`.
+        chunksize (int): Number of rows parsed per chunk.
+        cache_dir (str): Directory for cache files. Defaults to '.columnar_cache' next to the zip.
+        use_cache (bool): Set to False to always parse the CSV.
+        verbose (bool): Print the memory used before and after downcasting when the CSV is parsed.
 
     Returns:
         pd.DataFrame: The processed data as a pandas DataFrame.
     """
     try:
-        
-        extract_zip(zip_path, extract_to)
-    
-        df = load_csv_from_zip(extract_to, filename)
-    
+
+        def parse():
+            return read_csv_from_zip(zip_path, filename, usecols=usecols, dtype=dtype, chunksize=chunksize,
+                                     verbose=verbose)
+
+        if not use_cache:
+            return parse()
+
+        df = cached_frame(zip_path, parse, member=filename, cache_dir=cache_dir,
+                          index_col=0, usecols=usecols, dtype=dtype)
+
         return df
     
     except Exception as e:
@@ -0,0 +1,265 @@
+import json
+import os
+import shutil
+import tempfile
+from multiprocessing import Pool
+
+import joblib
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor
+
+from forest_compiler import FlatForest
+from core_budget import available_cores
+
+ZOO_MAGIC = b'SZOO0001'
+_ALIGN = 64
+_NODE_ARRAYS = ['feature', 'threshold', 'left', 'right', 'value']
+
+# Per-store forests are small: each one only sees a single store's history
+DEFAULT_FOREST_PARAMS = {
+    'n_estimators': 50,
+    'min_samples_split': 10,
+    'min_samples_leaf': 2,
+    'random_state': 42,
+}
+
+
+def _fit_group(task):
+    """Process-pool worker: fits one group's forest on its rows of the memmapped data and compiles it."""
+    key, X_path, y_path, start, stop, params = task
+    X = joblib.load(X_path, mmap_mode='r')[start:stop]
+    y = joblib.load(y_path, mmap_mode='r')[start:stop]
+    forest = RandomForestRegressor(n_jobs=1, **params).fit(X, y)
+    return key, FlatForest.from_pipeline(forest)
+
+
+class ModelZoo:
+    """
+    One compiled forest per store, or per cluster of stores, packed into a single artifact.
+
+    `train` fits every group's forest in a process pool. Each worker reads only its own
+    rows from a shared memmap and is replaced after `max_tasks_per_child` groups, so
+    worker memory stays bounded however many stores there are. Every forest is
+    compiled into a `FlatForest`.
+
+    `save` packs all forests into one `.zoo` file: a JSON index followed by the node
+    arrays of every forest, concatenated and 64-byte aligned. `load` memory-maps the file
+    and only builds the forests of the stores a prediction actually needs, as views
+    into the mapped arrays, so a serving worker never reads the other stores' models.
+
+    Attributes
+    ----------
+    store_groups : dict
+        Maps each store to the key of the forest that serves it.
+    n_features : int
+        Number of input features.
+    feature_names : list or None
+        Input columns, in training order.
+    store_column : str
+        Name of the store feature used to route rows.
+    """
+
+    def __init__(self, forests, store_groups, n_features, feature_names=None, store_column='Store'):
+        """
+        Parameters
+        ----------
+        forests : dict
+            Maps group keys to their FlatForest.
+        store_groups : dict
+            Maps each store to its group key.
+        n_features : int
+            Number of input features.
+        feature_names : list or None
+            Input columns, in training order.
+        store_column : str
+            Name of the store feature used to route rows.
+        """
+        self._forests = {str(group): forest for group, forest in forests.items()}
+        self.store_groups = {int(store): str(group) for store, group in store_groups.items()}
+        self.n_features = int(n_features)
+        self.feature_names = list(feature_names) if feature_names is not None else None
+        self.store_column = store_column
+        self._arrays = None
+        self._index = None
+
+    @classmethod
+    def train(cls, X, y, store_column='Store', clusters=None, n_workers=None, max_tasks_per_child=10,
+              temp_folder=None, **forest_params):
+        """
+        Trains one forest per store (or per cluster) in a process pool.
+
+        Parameters
+        ----------
+        X : pd.DataFrame
+            Training features, including `store_column`.
+        y : pd.Series or np.ndarray
+            Training target values.
+        store_column : str
+            Column identifying the store of each row.
+        clusters : dict or None
+            Maps stores to cluster keys; stores of one cluster share a forest. Stores that
+            are not listed (by default, all of them) get their own forest.
+        n_workers : int or None
+            Number of worker processes (default is every available core).
+        max_tasks_per_child : int
+            Groups a worker fits before it is replaced, which returns its memory to the OS.
+        temp_folder : str or None
+            Directory for the memmapped training data.
+        **forest_params
+            RandomForestRegressor parameters, overriding DEFAULT_FOREST_PARAMS.
+
+        Returns
+        -------
+        ModelZoo
+        """
+        params = {**DEFAULT_FOREST_PARAMS, **forest_params}
+        feature_names = list(X.columns)
+        unique_stores, store_of_row = np.unique(X[store_column].to_numpy().astype(np.int64), return_inverse=True)
+        clusters = clusters or {}
+        # Stores without a cluster get their own forest
+        store_groups = {int(store): str(clusters.get(store, store)) for store in unique_stores}
+
+        # Sort rows by group once so every group is a contiguous range of the memmap
+        groups = np.array([store_groups[int(store)] for store in unique_stores])[store_of_row]
+        order = np.argsort(groups, kind='stable')
+        keys, starts = np.unique(groups[order], return_index=True)
+        stops = np.append(starts[1:], len(order))
+
+        folder = tempfile.mkdtemp(prefix='model_zoo_', dir=temp_folder)
+        try:
+            X_path = os.path.join(folder, 'X.mmap')
+            y_path = os.path.join(folder, 'y.mmap')
+            joblib.dump(np.ascontiguousarray(X.to_numpy(dtype=np.float64)[order]), X_path)
+            joblib.dump(np.ascontiguousarray(np.asarray(y, dtype=np.float64)[order]), y_path)
+
+            tasks = [(key, X_path, y_path, int(start), int(stop), params)
+                     for key, start, stop in zip(keys, starts, stops)]
+            with Pool(processes=n_workers or available_cores(), maxtasksperchild=max_tasks_per_child) as pool:
+                forests = dict(pool.imap_unordered(_fit_group, tasks))
+        finally:
+            shutil.rmtree(folder, ignore_errors=True)
+
+        return cls(forests, store_groups, len(feature_names), feature_names, store_column)
+
+    @property
+    def groups(self):
+        """Keys of all forests in the zoo."""
+        return sorted(set(self.store_groups.values()))
+
+    def forest_for_group(self, group):
+        """Returns the FlatForest of a group, building it from the mapped file on first use."""
+        forest = self._forests.get(group)
+        if forest is None:
+            node_start, node_stop, root_start, root_stop = self._index[group]
+            nodes = {name: self._arrays[name][node_start:node_stop] for name in _NODE_ARRAYS}
+            forest = FlatForest(roots=self._arrays['roots'][root_start:root_stop],
+                                n_features=self.n_features, **nodes)
+            self._forests[group] = forest
+        return forest
+
+    def forest_for(self, store):
+        """Returns the FlatForest serving `store`."""
+        try:
+            group = self.store_groups[int(store)]
+        except KeyError:
+            raise ValueError(f"No model for store {store}.")
+        return self.forest_for_group(group)
+
+    def predict(self, X):
+        """
+        Predicts target values for X, routing every row to its store's forest.
+
+        Parameters
+        ----------
+        X : array-like of shape (n_samples, n_features)
+            Raw features, in training column order.
+
+        Returns
+        -------
+        np.ndarray
+            The predicted values.
+        """
+        if hasattr(X, 'columns') and self.feature_names is not None:
+            X = X[self.feature_names]
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        store_index = self.feature_names.index(self.store_column) if self.feature_names else 0
+        stores = X[:, store_index].astype(np.int64)
+
+        predictions = np.empty(len(X))
+        order = np.argsort(stores, kind='stable')
+        unique_stores, starts = np.unique(stores[order], return_index=True)
+        for store, rows in zip(unique_stores, np.split(order, starts[1:])):
+            predictions[rows] = self.forest_for(store).predict(X[rows])
+        return predictions
+
+    def save(self, filename):
+        """
+        Packs every forest into one `.zoo` file.
+
+        Layout: magic bytes, the header length (uint64), a JSON header with the store
+        index and the offset, dtype and shape of every array, then the arrays themselves,
+        each starting on a 64-byte boundary.
+        """
+        groups = self.groups
+        forests = [self.forest_for_group(group) for group in groups]
+
+        index, node_offset, root_offset = {}, 0, 0
+        for group, forest in zip(groups, forests):
+            n_nodes, n_roots = len(forest.value), len(forest.roots)
+            index[group] = [node_offset, node_offset + n_nodes, root_offset, root_offset + n_roots]
+            node_offset += n_nodes
+            root_offset += n_roots
+
+        arrays = {name: np.concatenate([getattr(forest, name) for forest in forests]) for name in _NODE_ARRAYS}
+        arrays['roots'] = np.concatenate([forest.roots for forest in forests])
+        # Narrow what can be narrowed; child indices are local to each forest
+        arrays['feature'] = arrays['feature'].astype(np.int32)
+        arrays['left'] = arrays['left'].astype(np.int32)
+        arrays['right'] = arrays['right'].astype(np.int32)
+        arrays['roots'] = arrays['roots'].astype(np.int32)
+
+        layout, offset = {}, 0
+        for name, array in arrays.items():
+            offset = -(-offset // _ALIGN) * _ALIGN
+            layout[name] = {'offset': offset, 'dtype': array.dtype.str, 'shape': list(array.shape)}
+            offset += array.nbytes
+
+        header = json.dumps({
+            'n_features': self.n_features,
+            'feature_names': self.feature_names,
+            'store_column': self.store_column,
+            'store_groups': {str(store): group for store, group in self.store_groups.items()},
+            'index': index,
+            'arrays': layout,
+        }).encode()
+        data_start = -(-(len(ZOO_MAGIC) + 8 + len(header)) // _ALIGN) * _ALIGN
+
+        with open(filename, 'wb') as f:
+            f.write(ZOO_MAGIC)
+            f.write(np.uint64(len(header)).tobytes())
+            f.write(header)
+            for name, array in arrays.items():
+                f.seek(data_start + layout[name]['offset'])
+                f.write(np.ascontiguousarray(array).tobytes())
+
+    @classmethod
+    def load(cls, filename):
+        """Memory-maps a `.zoo` file written by `save`; forests are built lazily per store."""
+        with open(filename, 'rb') as f:
+            if f.read(len(ZOO_MAGIC)) != ZOO_MAGIC:
+                raise ValueError(f"{filename} is not a model zoo file.")
+            header_length = int(np.frombuffer(f.read(8), dtype=np.uint64)[0])
+            header = json.loads(f.read(header_length))
+        data_start = -(-(len(ZOO_MAGIC) + 8 + header_length) // _ALIGN) * _ALIGN
+
+        zoo = cls({}, {int(store): group for store, group in header['store_groups'].items()},
+                  header['n_features'], header['feature_names'], header['store_column'])
+        zoo._index = header['index']
+        zoo._arrays = {
+            name: np.memmap(filename, dtype=np.dtype(spec['dtype']), mode='r',
+                            offset=data_start + spec['offset'], shape=tuple(spec['shape']))
+            for name, spec in header['arrays'].items()
+        }
+        return zoo
@@ -4,6 +4,8 @@ from sklearn.preprocessing import LabelEncoder, StandardScaler, OneHotEncoder #
 from sklearn.compose import ColumnTransformer # type: ignore
 from sklearn.impute import SimpleImputer # type: ignore
 from sklearn.pipeline import Pipeline # type: ignore
+from dtype_schema import downcast
+from stage_profiler import StageProfiler
 
 class DataPreprocessor:
     def __init__(self, df):
@@ -12,7 +14,7 @@ class DataPreprocessor:
         
         :param df: Pandas DataFrame containing the dataset to preprocess
         """
-        self.df = df.copy()
+        self.df = downcast(df.copy(), verbose=True)
         self.scaler = StandardScaler()
 
     def handle_missing_values(self):
@@ -31,8 +33,8 @@ class DataPreprocessor:
         num_imputer = SimpleImputer(strategy='median')
         cat_imputer = SimpleImputer(strategy='most_frequent')
 
-        num_cols = self.df.select_dtypes(include=['int64', 'float64']).columns
-        cat_cols = self.df.select_dtypes(include=['object']).columns
+        num_cols = self.df.select_dtypes(include='number').columns
+        cat_cols = self.df.select_dtypes(include=['object', 'category']).columns
 
         self.df[num_cols] = num_imputer.fit_transform(self.df[num_cols])
         self.df[cat_cols] = cat_imputer.fit_transform(self.df[cat_cols])
@@ -112,27 +114,39 @@ class DataPreprocessor:
         Scales the numeric features using Standard Scaler for uniform scaling.
         This ensures that features like 'Sales', 'Customers', 'CompetitionDistance', etc., are normalized.
         """
-        num_cols = self.df.select_dtypes(include=['float64', 'int64']).columns
+        num_cols = self.df.select_dtypes(include='number').columns
         self.df[num_cols] = self.scaler.fit_transform(self.df[num_cols])
 
-    def preprocess(self):
+    def preprocess(self, profiler=None):
         """
         The main function to run all preprocessing steps sequentially.
+
+        :param profiler: Optional StageProfiler recording the time, memory and row counts
+                         of every step; read them with `profiler.report()`.
         """
+        profiler = profiler or StageProfiler(enabled=False)
+        def frames():
+            return [self.df]
+
         print("Handling missing values...")
-        self.handle_missing_values()
+        with profiler.stage('clean', frames):
+            self.handle_missing_values()
 
         print("Extracting datetime features...")
-        self.extract_datetime_features()
+        with profiler.stage('datetime', frames):
+            self.extract_datetime_features()
 
         print("Performing feature engineering...")
-        self.feature_engineering()
+        with profiler.stage('feature_engineering', frames):
+            self.feature_engineering()
 
         print("Encoding categorical data...")
-        self.encode_categorical_data()
+        with profiler.stage('encoding', frames):
+            self.encode_categorical_data()
 
         print("Scaling numeric features...")
-        self.scale_numeric_features()
+        with profiler.stage('scaling', frames):
+            self.scale_numeric_features()
 
         print("Preprocessing complete.")
         return self.df
@@ -0,0 +1,208 @@
+import html
+import os
+import re
+from multiprocessing import Pool
+
+import matplotlib
+import matplotlib.pyplot as plt
+import numpy as np
+import seaborn as sns
+
+from core_budget import available_cores
+
+# Above this many points a scatter plot is drawn as a density (hexbin or 2D histogram)
+DENSITY_THRESHOLD = 20_000
+
+
+def finish_figure(save_path=None, dpi=None):
+    """
+    Shows the current figure, or writes it to `save_path` and closes it.
+
+    Parameters
+    ----------
+    save_path : str or None
+        Output file (the extension picks the format, e.g. .png or .svg). None shows the
+        figure interactively, as the plotting methods always did.
+    dpi : int or None
+        Resolution of the saved image (default is matplotlib's `savefig.dpi`).
+
+    Returns
+    -------
+    str or None
+        The path written, if any.
+    """
+    if save_path is None:
+        plt.show()
+        return None
+    fig = plt.gcf()
+    fig.savefig(save_path, dpi=dpi, bbox_inches='tight')
+    plt.close(fig)
+    return save_path
+
+
+def density_scatter(x, y, ax=None, max_points=DENSITY_THRESHOLD, kind='hexbin', gridsize=80, cmap='viridis',
+                    **scatter_kws):
+    """
+    Scatter plot that switches to density rendering for large inputs.
+
+    Up to `max_points` points are drawn as individual markers. Above that, drawing every
+    marker is slow and the plot is a solid blob anyway, so the points are binned instead:
+    `kind='hexbin'` draws hexagonal bins and `kind='hist2d'` a rectangular 2D histogram,
+    both coloured by log count.
+
+    Parameters
+    ----------
+    x, y : array-like
+        Point coordinates.
+    ax : matplotlib Axes or None
+        Axes to draw on (default is the current axes).
+    max_points : int
+        Largest number of points drawn as markers.
+    kind : str
+        'hexbin' or 'hist2d'.
+    gridsize : int
+        Number of bins along the x axis.
+    cmap : str
+        Colour map of the density plot.
+    **scatter_kws
+        Passed to `sns.scatterplot` when markers are drawn.
+
+    Returns
+    -------
+    bool
+        True if the points were binned.
+    """
+    ax = ax or plt.gca()
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    if len(x) <= max_points:
+        sns.scatterplot(x=x, y=y, ax=ax, **scatter_kws)
+        return False
+
+    if kind == 'hexbin':
+        mappable = ax.hexbin(x, y, gridsize=gridsize, bins='log', mincnt=1, cmap=cmap)
+    elif kind == 'hist2d':
+        *_, mappable = ax.hist2d(x, y, bins=gridsize, cmap=cmap, norm=matplotlib.colors.LogNorm(), cmin=1)
+    else:
+        raise ValueError(f"Unknown kind '{kind}', expected 'hexbin' or 'hist2d'.")
+    ax.figure.colorbar(mappable, ax=ax, label='Count')
+    return True
+
+
+# Object whose plotting methods the pool workers call; set once per worker
+_target = None
+
+
+def _init_worker(target):
+    global _target
+    _target = target
+    plt.switch_backend('Agg')
+
+
+def _render(task):
+    """Pool worker: calls one plotting method with `save_path` and returns the file written."""
+    key, name, kwargs, save_path, dpi = task
+    with matplotlib.rc_context({'savefig.dpi': dpi}):
+        getattr(_target, name)(save_path=save_path, **kwargs)
+    plt.close('all')
+    return key, save_path
+
+
+def _task_key(name, kwargs):
+    """Output name of one rendered method: its name plus a slug of its arguments, e.g. 'plot_sales_store-1'."""
+    key = name.strip('_')
+    if kwargs:
+        slug = '_'.join(f'{arg}-{value}' for arg, value in sorted(kwargs.items()))
+        key += '_' + re.sub(r'[^A-Za-z0-9.-]+', '-', slug).strip('-')
+    return key
+
+
+class ReportRenderer:
+    """
+    Renders the plotting methods of an object to image files with the Agg backend.
+
+    Every method must accept a `save_path` argument and pass it to `finish_figure`. The
+    methods are rendered in a process pool. The object is handed to each worker once,
+    when the worker starts, and is not pickled again for every figure. An `index.html`
+    page then shows the figures in the requested order.
+
+    Attributes
+    ----------
+    output_dir : str
+        Directory the images and the HTML page are written to.
+    n_workers : int
+        Number of worker processes.
+    image_format : str
+        File extension of the images, e.g. 'png' or 'svg'.
+    """
+
+    def __init__(self, output_dir, n_workers=None, image_format='png', dpi=100):
+        """
+        Parameters
+        ----------
+        output_dir : str
+            Directory the report is written to (created if needed).
+        n_workers : int or None
+            Number of worker processes (default is every available core).
+        image_format : str
+            File extension of the images.
+        dpi : int
+            Resolution of the images.
+        """
+        self.output_dir = output_dir
+        self.n_workers = n_workers or available_cores()
+        self.image_format = image_format
+        self.dpi = dpi
+
+    def render(self, target, methods, title='Report'):
+        """
+        Renders `methods` of `target` and writes the HTML index.
+
+        Parameters
+        ----------
+        target : object
+            Object with the plotting methods, e.g. a Visualyzer or a SalesModel.
+        methods : list
+            Method names, or (name, kwargs) pairs.
+        title : str
+            Title of the HTML page.
+
+        Returns
+        -------
+        dict
+            Maps each rendered method to the image it was written to, plus 'index' to the HTML
+            page. Methods called with arguments are keyed by their name and a slug of the
+            arguments (e.g. 'plot_sales_store-1'), so the same method can be rendered several
+            times; a key that would still repeat gets the method's position appended.
+        """
+        os.makedirs(self.output_dir, exist_ok=True)
+        tasks = []
+        keys = set()
+        for position, method in enumerate(methods):
+            name, kwargs = (method, {}) if isinstance(method, str) else method
+            key = _task_key(name, kwargs)
+            if key in keys or key == 'index':
+                key = f'{key}_{position}'
+            keys.add(key)
+            save_path = os.path.join(self.output_dir, f'{key}.{self.image_format}')
+            tasks.append((key, name, kwargs, save_path, self.dpi))
+
+        n_workers = max(1, min(self.n_workers, len(tasks)))
+        with Pool(processes=n_workers, initializer=_init_worker, initargs=(target,)) as pool:
+            outputs = dict(pool.imap_unordered(_render, tasks))
+
+        images = {key: outputs[key] for key, *_ in tasks}
+        images['index'] = self._write_index(images, title)
+        return images
+
+    def _write_index(self, images, title):
+        sections = '\n'.join(
+            f'<h2>{html.escape(name.strip("_").replace("_", " ").capitalize())}</h2>\n'
+            f'<img src="{html.escape(os.path.basename(path))}" alt="{html.escape(name)}">'
+            for name, path in images.items())
+        page = (f'<!DOCTYPE html>\n<html>\n<head><meta charset="utf-8"><title>{html.escape(title)}</title></head>\n'
+                f'<body>\n<h1>{html.escape(title)}</h1>\n{sections}\n</body>\n</html>\n')
+        index_path = os.path.join(self.output_dir, 'index.html')
+        with open(index_path, 'w') as f:
+            f.write(page)
+        return index_path
@@ -4,12 +4,20 @@ import matplotlib.pyplot as plt
 import seaborn as sns
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.pipeline import Pipeline
-from sklearn.model_selection import GridSearchCV
+from sklearn.base import clone
 from sklearn.preprocessing import StandardScaler
 from sklearn.metrics import mean_squared_error
 from sklearn.model_selection import train_test_split
 import joblib  # For saving and loading models
+import os
 from datetime import datetime
+from forest_compiler import FlatForest, compaction_report
+from feature_transformer import FeatureTransformer
+from hyperparameter_tuning import HyperparameterTuner
+from backtesting import Backtester
+from model_zoo import ModelZoo
+from forecast_table import ForecastTable
+from report_renderer import DENSITY_THRESHOLD, density_scatter, finish_figure
 
 class SalesModel:
     """
@@ -27,6 +35,12 @@ class SalesModel:
         Training target values.
     y_test : pd.Series
         Testing target values.
+    transformer : FeatureTransformer or None
+        The fitted feature transformer, saved and loaded together with the model.
+    model_zoo : ModelZoo or None
+        Per-store (or per-cluster) forests trained by `train_store_models`.
+    compact_report : dict or None
+        Size and accuracy cost of the last `export_compact_model`.
         
     Methods
     -------
@@ -36,14 +50,32 @@ class SalesModel:
         Trains the RandomForestRegressor model using the preprocessed training data.
     evaluate_model():
         Evaluates the trained model on the test data and returns the RMSE.
-    tune_model(param_grid):
-        Performs hyperparameter tuning using GridSearchCV.
+    update_model(new_data):
+        Adds (or replaces) trees fitted on newly arrived days via warm start.
+    drift_against_full_refit(train_data, eval_data):
+        Compares the incrementally updated model with a full refit.
+    backtest(data, target_column, **split_options):
+        Evaluates the model on rolling-origin (time-ordered) folds.
+    tune_model(param_grid, n_jobs, search):
+        Performs hyperparameter tuning within a core budget (grid search or successive halving).
     save_model():
         Saves the trained model to a file with a timestamp.
+    export_compiled_model():
+        Compiles the trained pipeline into a FlatForest and saves it with a timestamp.
+    export_compact_model(value_bits, prune_tolerance):
+        Saves a float32, optionally quantized and pruned, memory-mappable forest and reports its accuracy cost.
+    train_store_models(clusters, n_workers):
+        Trains one compact forest per store or cluster of stores in a process pool.
+    export_model_zoo():
+        Packs the per-store forests into one indexed artifact and saves it with a timestamp.
+    materialize_forecasts(grid, dates):
+        Scores the whole forecast grid at once and saves it as a lookup table with a timestamp.
     load_model(filename):
         Loads a trained model from a file.
     feature_importance():
         Returns the feature importance from the trained model.
+    plot_actual_vs_predicted(save_path):
+        Plots actual vs predicted test values (density-binned for large test sets), shown or saved.
     """
 
     def __init__(self):
@@ -66,6 +98,9 @@ class SalesModel:
         self.X_test = None
         self.y_train = None
         self.y_test = None
+        self.transformer = None
+        self.model_zoo = None
+        self.compact_report = None
 
     def preprocess_data(self, data, target_column, test_size=0.2, random_state=42):
         """
@@ -131,44 +166,400 @@ class SalesModel:
         """Calculates Root Mean Squared Logarithmic Error (RMSLE)."""
         return np.sqrt(np.mean((np.log1p(y_pred) - np.log1p(y_true))**2))
 
-    def tune_model(self, param_grid):
+    def tune_model(self, param_grid, n_jobs=-1, search='grid', cv=5, **tuner_options):
         """
-        Performs hyperparameter tuning using GridSearchCV.
-        
+        Performs hyperparameter tuning with a HyperparameterTuner.
+
+        The training features are memory-mapped once for all search workers, and `n_jobs`
+        cores are split between the search and the forest instead of both using every core.
+
         Parameters
         ----------
         param_grid : dict
             Dictionary with parameters names (str) as keys and lists of parameter settings to try as values.
-        
+        n_jobs : int
+            Total number of cores to use (-1 for all of them).
+        search : str
+            'grid' for an exhaustive grid search, 'halving' for successive halving.
+        cv : int
+            Number of cross-validation folds.
+        **tuner_options
+            Further HyperparameterTuner options, e.g. `resource='model__n_estimators'`.
+
         Returns
         -------
         dict
             The best parameters found during tuning.
         """
-        grid_search = GridSearchCV(self.model_pipeline, param_grid, cv=5, scoring='neg_root_mean_squared_error', n_jobs=-1)
-        grid_search.fit(self.X_train, self.y_train)
-        self.model_pipeline = grid_search.best_estimator_
-        return grid_search.best_params_
+        tuner = HyperparameterTuner(self.model_pipeline, param_grid, n_jobs=n_jobs, search=search, cv=cv,
+                                    **tuner_options)
+        tuner.fit(self.X_train, self.y_train)
+        self.model_pipeline = tuner.best_estimator_
+        return tuner.best_params_
+
+    def backtest(self, data, target_column, n_jobs=-1, **split_options):
+        """
+        Backtests the model pipeline on rolling-origin folds of date-indexed data.
+
+        Unlike the shuffled split of `preprocess_data`, every fold trains on the days up to
+        its cutoff and is scored on the days after it. The folds are row ranges over one
+        date-sorted feature matrix, evaluated in parallel (see `Backtester`). The forest
+        has no incremental fit, so every fold refits the whole pipeline from scratch.
+
+        Parameters
+        ----------
+        data : pd.DataFrame
+            The dataset containing both features and the target column, indexed by date.
+        target_column : str
+            The name of the target column.
+        n_jobs : int
+            Total number of cores to use (-1 for all of them).
+        **split_options
+            Fold definition: n_folds, horizon (days), step (days), window ('expanding' or
+            'rolling'), train_days, or explicit cutoffs.
+
+        Returns
+        -------
+        pd.DataFrame
+            RMSE and RMSLE per fold.
+        """
+        features = [col for col in data.columns if col != target_column]
+        backtester = Backtester(self.model_pipeline, data[features], data[target_column], data.index)
+        return backtester.run(n_jobs=n_jobs, **split_options)
+
+    def _feature_columns(self, data, target_column):
+        """Returns the model input columns of `data`, in training order when known."""
+        names = getattr(self.model_pipeline, 'feature_names_in_', None)
+        if names is not None:
+            return list(names)
+        return [col for col in data.columns if col != target_column]
+
+    def update_model(self, new_data, target_column='Sales', n_new_trees=10, replace_oldest=False):
+        """
+        Incrementally updates the trained forest with newly arrived days.
+
+        Features for the new rows are computed with the fitted `transformer`, which
+        continues each store's cumulative 'Promo_duration' from its running promo count,
+        so only the new rows are processed and no history is re-read. Next, `n_new_trees`
+        trees are fitted on the new rows via warm start and added to the forest; with
+        `replace_oldest` the same number of the oldest trees is dropped first, keeping the
+        forest size constant. The scaler is kept as fitted, so existing trees are unchanged.
+        New trees get the seeds that follow every tree grown so far (counted in the
+        forest's `n_trees_grown_`), so they never repeat the bootstrap and feature draws of
+        trees still in the forest. Only once the new trees are fitted are the transformer's
+        promo counts advanced past the new rows; if the fit fails, the model and the
+        transformer are both left as they were.
+
+        Parameters
+        ----------
+        new_data : pd.DataFrame
+            The new days, with the raw columns of train_cleaned.csv (Store, Date, Sales, ...).
+        target_column : str
+            The name of the target column.
+        n_new_trees : int
+            Number of trees fitted on the new days.
+        replace_oldest : bool
+            Drop the `n_new_trees` oldest trees before adding the new ones.
+
+        Returns
+        -------
+        pd.DataFrame
+            The processed new rows (features and target), indexed by 'Date', ready to be
+            appended to the processed training data.
+        """
+        if self.transformer is None:
+            raise ValueError("update_model needs the fitted transformer saved with the model.")
+
+        # Only open days are used for training, as in DataPreprocessor
+        new_data = new_data[new_data['Open'] == 1]
+        processed = self.transformer.transform(new_data)
+        processed.index = pd.Index(new_data['Date'].to_numpy(), name='Date')
+
+        X_new = processed[self._feature_columns(processed, target_column)]
+        y_new = processed[target_column]
+
+        preprocessing = self.model_pipeline[:-1]
+        forest = self.model_pipeline[-1]
+        trees_grown = max(getattr(forest, 'n_trees_grown_', 0), len(forest.estimators_))
+        estimators, n_estimators = forest.estimators_, forest.n_estimators
+        if replace_oldest:
+            if n_new_trees >= len(forest.estimators_):
+                raise ValueError("replace_oldest would drop every existing tree.")
+            forest.estimators_ = forest.estimators_[n_new_trees:]
+
+        # With warm start sklearn seeds new trees from draw len(estimators_) onwards of the
+        # random_state stream. After dropping trees that would repeat the seeds of trees
+        # still in the forest, so the stream is advanced past every tree grown so far.
+        random_state = forest.random_state
+        if isinstance(random_state, (int, np.integer)):
+            stream = np.random.RandomState(random_state)
+            stream.randint(np.iinfo(np.int32).max, size=trees_grown - len(forest.estimators_))
+            forest.set_params(random_state=stream)
+
+        forest.set_params(warm_start=True, n_estimators=len(forest.estimators_) + n_new_trees)
+        try:
+            forest.fit(preprocessing.transform(X_new), y_new)
+        except BaseException:
+            # Keep the trees the transformer's promo counts still belong to
+            forest.estimators_ = estimators
+            forest.set_params(n_estimators=n_estimators)
+            raise
+        finally:
+            forest.set_params(warm_start=False, random_state=random_state)
+        forest.n_trees_grown_ = trees_grown + n_new_trees
+        self.transformer.update(new_data)
+        return processed
+
+    def drift_against_full_refit(self, train_data, eval_data, target_column='Sales'):
+        """
+        Reports how far the incrementally updated model drifts from a full refit.
+
+        A fresh copy of the pipeline, with the same number of trees, is fitted on
+        `train_data` (the full history including the new days) and both models are scored
+        on `eval_data`.
+
+        Parameters
+        ----------
+        train_data : pd.DataFrame
+            Processed history including the new days, with the target column.
+        eval_data : pd.DataFrame
+            Processed evaluation rows, with the target column.
+        target_column : str
+            The name of the target column.
 
-    def save_model(self):
+        Returns
+        -------
+        dict
+            RMSE of the incremental model and of the full refit, and the relative drift.
+        """
+        columns = self._feature_columns(train_data, target_column)
+        forest = self.model_pipeline[-1]
+
+        full_refit = clone(self.model_pipeline)
+        full_refit.set_params(model__warm_start=False, model__n_estimators=len(forest.estimators_))
+        full_refit.fit(train_data[columns], train_data[target_column])
+
+        y_true = eval_data[target_column]
+        incremental_rmse = np.sqrt(mean_squared_error(y_true, self.model_pipeline.predict(eval_data[columns])))
+        full_refit_rmse = np.sqrt(mean_squared_error(y_true, full_refit.predict(eval_data[columns])))
+        report = {
+            'incremental_rmse': incremental_rmse,
+            'full_refit_rmse': full_refit_rmse,
+            'drift': (incremental_rmse - full_refit_rmse) / full_refit_rmse,
+        }
+        print(f"Incremental RMSE: {incremental_rmse:.2f}, full refit RMSE: {full_refit_rmse:.2f} "
+              f"(drift {report['drift']:+.2%})")
+        return report
+
+    def _save_transformer(self, model_filename):
+        """Saves the fitted transformer, if any, next to the given model file."""
+        if self.transformer is None:
+            return
+        filename = FeatureTransformer.path_for_model(model_filename)
+        self.transformer.save(filename + '.tmp')
+        os.replace(filename + '.tmp', filename)
+        print(f"Transformer saved as {filename}")
+
+    def save_model(self, directory='.'):
         """
         Saves the trained model to a file with the current timestamp in the filename.
-        
+
+        The file is written under a temporary name and renamed into place, so a serving
+        ModelRegistry watching `directory` never picks up a partially written model.
+        If `transformer` is set it is saved first, as `sales_transformer_<timestamp>.json`.
+
+        Parameters
+        ----------
+        directory : str
+            Directory in which the model file is written (default is the current directory).
+
         Returns
         -------
-        None
+        str
+            The path of the saved model file.
         """
         # Get current timestamp and format it
         timestamp = datetime.now().strftime("%Y-%m-%d-%H-%M-%S")
-        filename = f"sales_model_{timestamp}.pkl"
-        
-        # Save the model
-        joblib.dump(self.model_pipeline, filename)
+        filename = os.path.join(directory, f"sales_model_{timestamp}.pkl")
+
+        # Save the transformer and the model, then atomically move the model into place
+        self._save_transformer(filename)
+        joblib.dump(self.model_pipeline, filename + '.tmp')
+        os.replace(filename + '.tmp', filename)
         print(f"Model saved as {filename}")
+        return filename
+
+    def export_compiled_model(self, directory='.'):
+        """
+        Compiles the trained pipeline into a FlatForest (scaler fused into the split
+        thresholds, all trees packed into flat arrays) and saves it with the current
+        timestamp in the filename, using the same atomic rename as `save_model`.
+
+        Parameters
+        ----------
+        directory : str
+            Directory in which the compiled model is written (default is the current directory).
+
+        Returns
+        -------
+        str
+            The path of the saved `.npz` file.
+        """
+        compiled = FlatForest.from_pipeline(self.model_pipeline)
+
+        timestamp = datetime.now().strftime("%Y-%m-%d-%H-%M-%S")
+        filename = os.path.join(directory, f"sales_model_{timestamp}.npz")
+
+        self._save_transformer(filename)
+        with open(filename + '.tmp', 'wb') as f:
+            compiled.save(f)
+        os.replace(filename + '.tmp', filename)
+        print(f"Compiled model saved as {filename}")
+        return filename
+
+    def export_compact_model(self, directory='.', value_bits=None, prune_tolerance=None):
+        """
+        Compiles the trained pipeline into a compact FlatForest (float32 thresholds and
+        values, narrow indices, optionally quantized leaf values and pruned subtrees; see
+        `FlatForest.compact`) and saves it as `sales_model_<timestamp>.forest`, using the
+        same atomic rename as `save_model`. The serving registry memory-maps the file, so
+        loading it costs no unpickling and workers share one copy in the page cache.
+
+        The accuracy cost is measured against the full-precision forest on the test
+        split, printed and kept in `compact_report`.
+
+        Parameters
+        ----------
+        directory : str
+            Directory in which the compact model is written (default is the current directory).
+        value_bits : int or None
+            Quantize the leaf values to 8 or 16 bits (default keeps float32 values).
+        prune_tolerance : float or None
+            Collapse subtrees whose leaf values lie within this many sales units (default: no pruning).
+
+        Returns
+        -------
+        str
+            The path of the saved `.forest` file.
+        """
+        reference = FlatForest.from_pipeline(self.model_pipeline)
+        compact = reference.compact(value_bits=value_bits, prune_tolerance=prune_tolerance)
+
+        timestamp = datetime.now().strftime("%Y-%m-%d-%H-%M-%S")
+        filename = os.path.join(directory, f"sales_model_{timestamp}.forest")
+
+        self._save_transformer(filename)
+        compact.save_mapped(filename + '.tmp')
+        os.replace(filename + '.tmp', filename)
+
+        self.compact_report = compaction_report(reference, compact, self.X_test, self.y_test)
+        self.compact_report['file_bytes'] = os.path.getsize(filename)
+        report = self.compact_report
+        print(f"Compact model saved as {filename}: {report['file_bytes'] / 1024**2:,.1f} MB, "
+              f"{report['size_ratio']:.0%} of the full-precision node arrays, "
+              f"{report['nodes_compact']:,} of {report['nodes']:,} nodes kept")
+        print(f"Prediction change: max {report['max_abs_change']:.2f}, mean {report['mean_abs_change']:.4f}; "
+              f"test RMSE {report['rmse']:.2f} -> {report['rmse_compact']:.2f}")
+        return filename
+
+    def train_store_models(self, clusters=None, n_workers=None, max_tasks_per_child=10, **forest_params):
+        """
+        Trains one compact forest per store, or per cluster of stores, on the training data.
+
+        The forests are fitted in a process pool whose workers read only their own store's
+        rows from a shared memmap and are recycled after `max_tasks_per_child` stores
+        (see `ModelZoo.train`).
+
+        Parameters
+        ----------
+        clusters : dict or None
+            Maps stores to cluster keys; stores of one cluster share a forest.
+        n_workers : int or None
+            Number of worker processes (default is every available core).
+        max_tasks_per_child : int
+            Stores a worker trains before it is replaced.
+        **forest_params
+            RandomForestRegressor parameters for the per-store forests.
+
+        Returns
+        -------
+        ModelZoo
+            The trained per-store models.
+        """
+        self.model_zoo = ModelZoo.train(self.X_train, self.y_train, clusters=clusters, n_workers=n_workers,
+                                        max_tasks_per_child=max_tasks_per_child, **forest_params)
+        return self.model_zoo
+
+    def export_model_zoo(self, directory='.'):
+        """
+        Packs the per-store forests into one `sales_model_<timestamp>.zoo` file, using the
+        same atomic rename as `save_model`. The serving registry memory-maps it and only
+        reads the models of the stores it is asked about.
+
+        Parameters
+        ----------
+        directory : str
+            Directory in which the artifact is written (default is the current directory).
+
+        Returns
+        -------
+        str
+            The path of the saved `.zoo` file.
+        """
+        if self.model_zoo is None:
+            raise ValueError("Train the per-store models with train_store_models first.")
+
+        timestamp = datetime.now().strftime("%Y-%m-%d-%H-%M-%S")
+        filename = os.path.join(directory, f"sales_model_{timestamp}.zoo")
+
+        self._save_transformer(filename)
+        self.model_zoo.save(filename + '.tmp')
+        os.replace(filename + '.tmp', filename)
+        print(f"Model zoo saved as {filename}")
+        return filename
+
+    def materialize_forecasts(self, grid, dates=None, directory='.', store_column='Store', date_column='Date'):
+        """
+        Scores a whole grid of stores x future dates with one `make_predictions` call and
+        saves the forecasts as a `sales_forecast_<timestamp>.fcst` table (see ForecastTable),
+        which the serving app looks up instead of running the model.
+
+        Parameters
+        ----------
+        grid : pd.DataFrame
+            Preprocessed feature rows of the forecast horizon, e.g. test_processed.csv.
+        dates : array-like or None
+            Date of every row, if `grid` has no `date_column` column or index level (the
+            processed test set does not; its dates are in the raw test.csv, by Id).
+        directory : str
+            Directory in which the table is written (default is the current directory).
+        store_column : str
+            Column identifying the store.
+        date_column : str
+            Column or index level holding the date.
+
+        Returns
+        -------
+        str
+            The path of the saved table.
+        """
+        if dates is None:
+            dates = (grid[date_column] if date_column in grid.columns
+                     else grid.index.get_level_values(date_column))
+        predictions = self.make_predictions(grid[self._feature_columns(grid, 'Sales')])
+
+        timestamp = datetime.now().strftime("%Y-%m-%d-%H-%M-%S")
+        table = ForecastTable.from_predictions(grid[store_column].to_numpy(), dates, predictions,
+                                               metadata={'created': timestamp, 'rows': len(grid)})
+        filename = os.path.join(directory, f"sales_forecast_{timestamp}.fcst")
+        table.save(filename + '.tmp')
+        os.replace(filename + '.tmp', filename)
+        print(f"Forecast table saved as {filename}")
+        return filename
 
     def load_model(self, filename):
         """
-        Loads a trained model from a file.
+        Loads a trained model from a file, and the transformer saved next to it if there is one.
         
         Parameters
         ----------
@@ -181,6 +572,9 @@ class SalesModel:
         """
         self.model_pipeline = joblib.load(filename)
 
+        transformer_file = FeatureTransformer.path_for_model(filename)
+        self.transformer = FeatureTransformer.load(transformer_file) if os.path.exists(transformer_file) else None
+
     def feature_importance(self):
         """
         Returns the feature importance from the trained model.
@@ -194,9 +588,21 @@ class SalesModel:
         feature_names = self.X_train.columns
         return pd.Series(importances, index=feature_names).sort_values(ascending=False)
 
-    def plot_actual_vs_predicted(self):
+    def plot_actual_vs_predicted(self, save_path=None, max_points=DENSITY_THRESHOLD, kind='hexbin'):
         """
         Plots the actual vs predicted values for the test set with enhanced visuals.
+
+        Test sets larger than `max_points` are drawn as a density plot instead of one
+        marker per row, which is much faster to render and easier to read.
+
+        Parameters
+        ----------
+        save_path : str or None
+            Writes the figure to this file instead of showing it.
+        max_points : int
+            Largest test set drawn as individual markers.
+        kind : str
+            Density rendering for larger test sets: 'hexbin' or 'hist2d'.
         
         Returns
         -------
@@ -211,12 +617,13 @@ class SalesModel:
         # Set a color palette
         sns.set_palette("Set2")
         
-        # Scatter plot
-        sns.scatterplot(x=self.y_test, y=y_pred, alpha=0.6, s=100, edgecolor='w', linewidth=0.5)
+        # Scatter plot, or density bins for large test sets
+        density_scatter(self.y_test, y_pred, max_points=max_points, kind=kind,
+                        alpha=0.6, s=100, edgecolor='w', linewidth=0.5)
 
         # Plot the reference line (y = x)
-        plt.plot([min(self.y_test), max(self.y_test)], 
-                [min(self.y_test), max(self.y_test)], 
+        y_min, y_max = self.y_test.min(), self.y_test.max()
+        plt.plot([y_min, y_max], [y_min, y_max],
                 color='darkorange', linestyle='--', linewidth=2, label='Ideal Prediction')
 
         # Set plot labels and title with larger font sizes
@@ -237,9 +644,9 @@ class SalesModel:
         # Set background color
         plt.gca().set_facecolor('lightgrey')
 
-        # Show the plot
+        # Show (or save) the plot
         plt.tight_layout()
-        plt.show()
+        finish_figure(save_path)
 
     def make_predictions(self, test_data):
         """
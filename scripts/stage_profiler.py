@@ -0,0 +1,191 @@
+import cProfile
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+import pandas as pd
+
+from dtype_schema import memory_usage_mb
+
+try:
+    import resource
+except ImportError:  # Not available on Windows: peak RSS is not reported
+    resource = None
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far, in MB (None where unsupported)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / 1024**2 if sys.platform == 'darwin' else peak / 1024
+
+
+def current_rss_mb():
+    """Current resident set size of this process in MB (None where /proc is unavailable)."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1024**2
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+class _SamplingProfiler:
+    """Samples the stack of one thread at a fixed interval and counts collapsed stacks."""
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.stacks = Counter()
+        self._thread_id = threading.get_ident()
+        self._stop = threading.Event()
+        self._sampler = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f'{os.path.basename(code.co_filename)}:{code.co_name}')
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def start(self):
+        self._sampler.start()
+
+    def stop(self):
+        self._stop.set()
+        self._sampler.join()
+
+    def dump(self, path):
+        # Collapsed-stack format, readable by flamegraph.pl and speedscope
+        with open(path, 'w') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f'{stack} {count}\n')
+
+
+class StageProfiler:
+    """
+    Opt-in timing and memory profile of the stages of a pipeline.
+
+    Each `stage` block records its wall time, the process's peak RSS after it and how
+    much the peak grew during it, the current RSS, and the rows and deep memory of the
+    pipeline's DataFrames before and after it. With `profile_dir` set, every stage is
+    also profiled and dumped there: 'cprofile' writes a `.prof` file for pstats or
+    snakeviz, 'sampling' writes collapsed stacks (`.folded`) for flame graphs at a much
+    lower overhead. A disabled profiler records nothing and costs nothing.
+
+    Attributes
+    ----------
+    enabled : bool
+        Whether stages are recorded.
+    profile_dir : str or None
+        Directory of the per-stage profile dumps.
+    profiler : str
+        'cprofile' or 'sampling'.
+    records : list of dict
+        One entry per finished stage.
+    """
+
+    def __init__(self, enabled=True, profile_dir=None, profiler='cprofile', sampling_interval=0.005):
+        """
+        Parameters
+        ----------
+        enabled : bool
+            Whether stages are recorded.
+        profile_dir : str or None
+            Directory for a profile dump per stage; None records timings and memory only.
+        profiler : str
+            'cprofile' for deterministic profiles, 'sampling' for a stack sampler.
+        sampling_interval : float
+            Seconds between stack samples of the sampling profiler.
+        """
+        if profiler not in ('cprofile', 'sampling'):
+            raise ValueError(f"Unknown profiler '{profiler}', expected 'cprofile' or 'sampling'.")
+        self.enabled = enabled
+        self.profile_dir = profile_dir
+        self.profiler = profiler
+        self.sampling_interval = sampling_interval
+        self.records = []
+
+    @staticmethod
+    def _measure(frames):
+        frames = [df for df in (frames() if callable(frames) else frames or []) if df is not None]
+        if not frames:
+            return None, None
+        return sum(len(df) for df in frames), sum(memory_usage_mb(df) for df in frames)
+
+    def _start_profile(self):
+        if self.profile_dir is None:
+            return None
+        profile = cProfile.Profile() if self.profiler == 'cprofile' else _SamplingProfiler(self.sampling_interval)
+        if self.profiler == 'cprofile':
+            profile.enable()
+        else:
+            profile.start()
+        return profile
+
+    def _dump_profile(self, profile, name):
+        os.makedirs(self.profile_dir, exist_ok=True)
+        path = os.path.join(self.profile_dir, f'{len(self.records):02d}_{name}')
+        if self.profiler == 'cprofile':
+            profile.disable()
+            path += '.prof'
+            profile.dump_stats(path)
+        else:
+            profile.stop()
+            path += '.folded'
+            profile.dump(path)
+        return path
+
+    @contextmanager
+    def stage(self, name, frames=None):
+        """
+        Records the enclosed block as stage `name`.
+
+        Parameters
+        ----------
+        name : str
+            Stage name.
+        frames : callable or list or None
+            The DataFrames the stage works on, or a function returning them (called before
+            and after the stage, so frames replaced by the stage are measured correctly).
+        """
+        if not self.enabled:
+            yield
+            return
+
+        rows_in, memory_in = self._measure(frames)
+        peak_before = peak_rss_mb()
+        profile = self._start_profile()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            profile_path = self._dump_profile(profile, name) if profile is not None else None
+            rows_out, memory_out = self._measure(frames)
+            peak_after = peak_rss_mb()
+            self.records.append({
+                'stage': name,
+                'seconds': seconds,
+                'peak_rss_mb': peak_after,
+                'peak_rss_growth_mb': peak_after - peak_before if peak_after is not None else None,
+                'rss_mb': current_rss_mb(),
+                'rows_in': rows_in,
+                'rows_out': rows_out,
+                'memory_in_mb': memory_in,
+                'memory_out_mb': memory_out,
+                'profile': profile_path,
+            })
+
+    def report(self):
+        """Returns the recorded stages as a DataFrame indexed by stage name."""
+        columns = ['stage', 'seconds', 'peak_rss_mb', 'peak_rss_growth_mb', 'rss_mb', 'rows_in', 'rows_out',
+                   'memory_in_mb', 'memory_out_mb', 'profile']
+        return pd.DataFrame(self.records, columns=columns).set_index('stage')
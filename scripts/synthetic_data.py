@@ -0,0 +1,309 @@
+# scripts/synthetic_data.py
+"""
+Generates synthetic data in the Rossmann schema at any scale.
+
+The raw files (train.csv, test.csv, store.csv and the zip of all three), the cleaned
+and merged files read by DataPreprocessor, and the 24 encoded model features of
+API/model.py are all produced from one seeded generator. Sales follow the weekly,
+promo, holiday and store-level patterns of the real data closely enough for the
+pipelines to do representative work; the values themselves are not meant to be
+realistic forecasting targets.
+
+Usage:
+    python synthetic_data.py --rows 1000000 --output ../data/synthetic
+"""
+import argparse
+import os
+import zipfile
+
+import numpy as np
+import pandas as pd
+
+# Number of stores and training days in the real data
+ROSSMANN_STORES = 1115
+ROSSMANN_DAYS = 942
+
+# Model features in the order of API/model.py
+MODEL_FEATURES = ['Store', 'DayOfWeek', 'Customers', 'Open', 'Promo', 'StateHoliday',
+                  'SchoolHoliday', 'StoreType', 'Assortment', 'CompetitionDistance',
+                  'CompetitionOpenSinceMonth', 'CompetitionOpenSinceYear', 'Promo2',
+                  'Promo2SinceWeek', 'Promo2SinceYear', 'PromoInterval', 'Day',
+                  'WeekOfYear', 'Month', 'Year', 'IsWeekend', 'IsBeginningOfMonth',
+                  'IsMidMonth', 'IsEndOfMonth']
+
+PROMO_INTERVALS = ['Jan,Apr,Jul,Oct', 'Feb,May,Aug,Nov', 'Mar,Jun,Sept,Dec']
+
+# Relative customer frequency by DayOfWeek (1 = Monday)
+_WEEKDAY_FACTOR = np.array([1.12, 1.0, 0.97, 0.97, 1.03, 1.05, 0.35])
+
+# (month, day, StateHoliday) of the public holidays; Easter is approximated by a fixed date
+_STATE_HOLIDAYS = [(1, 1, 'a'), (5, 1, 'a'), (10, 3, 'a'), (4, 5, 'b'), (4, 6, 'b'), (12, 25, 'c'), (12, 26, 'c')]
+
+
+def grid_shape(n_rows: int, n_stores: int = None) -> tuple:
+    """
+    Returns the (stores, days) grid used for `n_rows` training rows.
+
+    Small data sets grow the number of stores up to the real 1115 at the real history
+    length; beyond that (about 1M rows) the history gets longer.
+
+    Args:
+        n_rows (int): Number of training rows.
+        n_stores (int): Number of stores; derived from `n_rows` when None.
+
+    Returns:
+        tuple: (number of stores, number of days).
+    """
+    if n_stores is None:
+        n_stores = int(min(ROSSMANN_STORES, max(1, -(-n_rows // ROSSMANN_DAYS))))
+    return n_stores, -(-n_rows // n_stores)
+
+
+def generate_store(n_stores: int, seed: int = 0) -> pd.DataFrame:
+    """
+    Generates store.csv: the static attributes of every store.
+
+    Args:
+        n_stores (int): Number of stores.
+        seed (int): Random seed.
+
+    Returns:
+        pd.DataFrame: One row per store, with the columns of the Rossmann store.csv.
+    """
+    rng = np.random.default_rng([seed, 1])
+    promo2 = rng.random(n_stores) < 0.5
+    no_competition_date = rng.random(n_stores) < 0.3
+    return pd.DataFrame({
+        'Store': np.arange(1, n_stores + 1),
+        'StoreType': rng.choice(list('abcd'), n_stores, p=[0.54, 0.02, 0.13, 0.31]),
+        'Assortment': rng.choice(list('abc'), n_stores, p=[0.53, 0.01, 0.46]),
+        'CompetitionDistance': np.where(rng.random(n_stores) < 0.003, np.nan,
+                                        np.round(rng.lognormal(7.8, 1.2, n_stores), -1)),
+        'CompetitionOpenSinceMonth': np.where(no_competition_date, np.nan, rng.integers(1, 13, n_stores)),
+        'CompetitionOpenSinceYear': np.where(no_competition_date, np.nan, rng.integers(2000, 2015, n_stores)),
+        'Promo2': promo2.astype(int),
+        'Promo2SinceWeek': np.where(promo2, rng.integers(1, 51, n_stores), np.nan),
+        'Promo2SinceYear': np.where(promo2, rng.integers(2009, 2016, n_stores), np.nan),
+        'PromoInterval': np.where(promo2, rng.choice(PROMO_INTERVALS, n_stores), None),
+    })
+
+
+def _calendar(dates: pd.DatetimeIndex) -> dict:
+    """Per-day weekday, promo flag, state holiday code, ISO week and date string."""
+    holidays = {(month, day): code for month, day, code in _STATE_HOLIDAYS}
+    return {
+        'dow': dates.dayofweek.to_numpy() + 1,
+        # Promotions run Monday to Friday of every other week
+        'promo': ((dates.isocalendar().week.to_numpy() % 2 == 0) & (dates.dayofweek < 5)).astype(int),
+        'state_holiday': np.array([holidays.get((d.month, d.day), '0') for d in dates]),
+        'week': dates.isocalendar().week.to_numpy().astype(int),
+        'strings': np.asarray(dates.strftime('%Y-%m-%d')),
+    }
+
+
+def _store_days(stores: pd.DataFrame, dates: pd.DatetimeIndex, store_index: np.ndarray, day_index: np.ndarray,
+                rng: np.random.Generator) -> pd.DataFrame:
+    """Store-day rows (without Sales and Customers) for the given store and day positions."""
+    calendar = _calendar(dates)
+    n = len(store_index)
+    dow = calendar['dow'][day_index]
+    state_holiday = calendar['state_holiday'][day_index]
+
+    # Each store belongs to one of four states, whose six-week summer school holidays are staggered
+    state = store_index % 4
+    week = calendar['week'][day_index]
+    school_holiday = ((week >= 27 + 2 * state) & (week < 33 + 2 * state)) | (week >= 52) | (week == 1)
+
+    # Closed on Sundays (except a few stores), on public holidays and on the odd refurbishment day
+    open_sunday = (store_index % 37) == 0
+    is_open = ~(((dow == 7) & ~open_sunday) | (state_holiday != '0') | (rng.random(n) < 0.01))
+    return pd.DataFrame({
+        'Store': stores['Store'].to_numpy()[store_index],
+        'DayOfWeek': dow,
+        'Date': calendar['strings'][day_index],
+        'Open': is_open.astype(int),
+        'Promo': calendar['promo'][day_index],
+        'StateHoliday': state_holiday,
+        'SchoolHoliday': school_holiday.astype(int),
+    })
+
+
+def generate_train(n_rows: int, n_stores: int = None, end_date: str = '2015-07-31', seed: int = 0) -> tuple:
+    """
+    Generates train.csv and the matching store.csv.
+
+    The rows cover every store on every day of a history ending at `end_date`, ordered
+    like the real file (newest day first, then by store). When `n_rows` is not a
+    multiple of the number of stores, the oldest day is only partially included.
+
+    Args:
+        n_rows (int): Number of training rows.
+        n_stores (int): Number of stores; derived from `n_rows` when None (see `grid_shape`).
+        end_date (str): Last day of the history.
+        seed (int): Random seed.
+
+    Returns:
+        tuple: (train, store) DataFrames.
+    """
+    n_stores, n_days = grid_shape(n_rows, n_stores)
+    rng = np.random.default_rng([seed, 2])
+    store = generate_store(n_stores, seed)
+    dates = pd.date_range(end=end_date, periods=n_days, freq='D')
+
+    position = np.arange(n_rows)
+    day_index = n_days - 1 - position // n_stores
+    store_index = position % n_stores
+    train = _store_days(store, dates, store_index, day_index, rng)
+
+    # Customers scale with a store-level base, the weekday, promotions and school holidays
+    store_type_factor = store['StoreType'].map({'a': 1.0, 'b': 2.5, 'c': 1.0, 'd': 0.9}).to_numpy()
+    base_customers = rng.lognormal(6.4, 0.4, n_stores) * store_type_factor
+    spend = rng.uniform(6.5, 11.5, n_stores) * np.where(store['Assortment'].to_numpy() == 'c', 1.1, 1.0)
+    is_open = train['Open'].to_numpy() == 1
+    promo = train['Promo'].to_numpy()
+    customers = (base_customers[store_index] * _WEEKDAY_FACTOR[train['DayOfWeek'].to_numpy() - 1]
+                 * (1 + 0.2 * promo) * (1 + 0.05 * train['SchoolHoliday'].to_numpy())
+                 * rng.normal(1.0, 0.1, n_rows).clip(0.5))
+    customers = np.where(is_open, np.round(customers), 0).astype(int)
+    sales = customers * spend[store_index] * (1 + 0.1 * promo) * rng.normal(1.0, 0.05, n_rows).clip(0.7)
+
+    train.insert(3, 'Sales', np.where(is_open, np.round(sales), 0).astype(int))
+    train.insert(4, 'Customers', customers)
+    return train, store
+
+
+def generate_test(store: pd.DataFrame, start_date: str = '2015-08-01', n_days: int = 48, seed: int = 0) -> pd.DataFrame:
+    """
+    Generates test.csv: every store on the `n_days` days from `start_date`.
+
+    Rows are ordered like the real file (newest day first, then by store) and numbered
+    by 'Id'. A few 'Open' values are missing, as in the real data.
+
+    Args:
+        store (pd.DataFrame): The stores, as returned by `generate_store`.
+        start_date (str): First day of the forecast horizon.
+        n_days (int): Length of the forecast horizon.
+        seed (int): Random seed.
+
+    Returns:
+        pd.DataFrame: The test rows, with the columns of the Rossmann test.csv.
+    """
+    rng = np.random.default_rng([seed, 3])
+    n_stores = len(store)
+    dates = pd.date_range(start=start_date, periods=n_days, freq='D')
+    position = np.arange(n_stores * n_days)
+    test = _store_days(store, dates, position % n_stores, n_days - 1 - position // n_stores, rng)
+    test['Open'] = test['Open'].astype(float)
+    test.loc[rng.random(len(test)) < 1e-4, 'Open'] = np.nan
+    test.insert(0, 'Id', position + 1)
+    return test
+
+
+def clean_and_merge(df: pd.DataFrame, store: pd.DataFrame, dataset: str) -> pd.DataFrame:
+    """
+    Merges store attributes into train or test rows as the cleaned files read by DataPreprocessor.
+
+    Missing competition and Promo2 dates become 0 and 'PromoInterval' is encoded as
+    1-3 (0 without Promo2); the 'Dataset' column marks the rows as 'Train' or 'Test'.
+
+    Args:
+        df (pd.DataFrame): Rows of train.csv or test.csv.
+        store (pd.DataFrame): Rows of store.csv.
+        dataset (str): 'Train' or 'Test'.
+
+    Returns:
+        pd.DataFrame: The merged rows, without 'Id'.
+    """
+    merged = df.drop(columns=['Id'], errors='ignore').merge(store, on='Store', how='left')
+    for col in ['CompetitionDistance', 'CompetitionOpenSinceMonth', 'CompetitionOpenSinceYear',
+                'Promo2SinceWeek', 'Promo2SinceYear']:
+        merged[col] = merged[col].fillna(0)
+    intervals = {interval: code for code, interval in enumerate(PROMO_INTERVALS, start=1)}
+    merged['PromoInterval'] = merged['PromoInterval'].map(intervals).fillna(0).astype(int)
+    merged['Dataset'] = dataset
+    return merged
+
+
+def model_features(merged: pd.DataFrame) -> pd.DataFrame:
+    """
+    Encodes cleaned training rows as the 24 model features of API/model.py plus 'Sales'.
+
+    Args:
+        merged (pd.DataFrame): Rows as returned by `clean_and_merge`.
+
+    Returns:
+        pd.DataFrame: MODEL_FEATURES followed by 'Sales', all numeric.
+    """
+    dates = pd.to_datetime(merged['Date'])
+    day = dates.dt.day
+    features = merged.assign(
+        StateHoliday=merged['StateHoliday'].map({'0': 0, 'a': 1, 'b': 2, 'c': 3}),
+        StoreType=merged['StoreType'].map({'a': 1, 'b': 2, 'c': 3, 'd': 4}),
+        Assortment=merged['Assortment'].map({'a': 1, 'b': 2, 'c': 3}),
+        Day=day,
+        WeekOfYear=dates.dt.isocalendar().week.astype(int),
+        Month=dates.dt.month,
+        Year=dates.dt.year,
+        IsWeekend=(merged['DayOfWeek'] >= 6).astype(int),
+        IsBeginningOfMonth=(day <= 7).astype(int),
+        IsMidMonth=((day > 7) & (day <= 21)).astype(int),
+        IsEndOfMonth=(day > 21).astype(int),
+    )
+    return features[MODEL_FEATURES + ['Sales']]
+
+
+def write_dataset(directory: str, n_rows: int, n_stores: int = None, seed: int = 0, overwrite: bool = False) -> dict:
+    """
+    Writes a complete synthetic data set to `directory`.
+
+    The files are train.csv, test.csv, store.csv, rossmann-store-sales.zip (all three),
+    train_cleaned.csv and test_cleaned.csv (the inputs of DataPreprocessor) and
+    features.csv (the 24 model features plus 'Sales'). An existing data set is reused
+    unless `overwrite` is set.
+
+    Args:
+        directory (str): Output directory, created if needed.
+        n_rows (int): Number of training rows.
+        n_stores (int): Number of stores; derived from `n_rows` when None.
+        seed (int): Random seed.
+        overwrite (bool): Regenerate files that already exist.
+
+    Returns:
+        dict: Path of every file, keyed by its name without extension ('train', 'zip', ...).
+    """
+    paths = {name: os.path.join(directory, f'{name}.csv')
+             for name in ['train', 'test', 'store', 'train_cleaned', 'test_cleaned', 'features']}
+    paths['zip'] = os.path.join(directory, 'rossmann-store-sales.zip')
+    if not overwrite and all(os.path.exists(path) for path in paths.values()):
+        return paths
+
+    os.makedirs(directory, exist_ok=True)
+    train, store = generate_train(n_rows, n_stores, seed=seed)
+    test = generate_test(store, seed=seed)
+    train.to_csv(paths['train'], index=False)
+    test.to_csv(paths['test'], index=False)
+    store.to_csv(paths['store'], index=False)
+
+    merged = clean_and_merge(train, store, 'Train')
+    merged.to_csv(paths['train_cleaned'], index=False)
+    clean_and_merge(test, store, 'Test').to_csv(paths['test_cleaned'], index=False)
+    model_features(merged).to_csv(paths['features'], index=False)
+
+    # Written last: its presence marks a complete data set
+    with zipfile.ZipFile(paths['zip'] + '.tmp', 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name in ['train', 'test', 'store']:
+            archive.write(paths[name], f'{name}.csv')
+    os.replace(paths['zip'] + '.tmp', paths['zip'])
+    return paths
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=100_000, help='Number of training rows.')
+    parser.add_argument('--stores', type=int, default=None, help='Number of stores (default: derived from --rows).')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed.')
+    parser.add_argument('--output', default='../data/synthetic', help='Output directory.')
+    args = parser.parse_args()
+
+    for name, path in write_dataset(args.output, args.rows, args.stores, args.seed, overwrite=True).items():
+        print(f"{name}: {path}")
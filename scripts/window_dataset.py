@@ -0,0 +1,152 @@
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+class SlidingWindowDataset:
+    """
+    Lookback windows and multi-horizon targets for sequence models, for all stores at once.
+
+    The rows are scattered once into a dense (store, day, channel) grid covering every
+    calendar day; days a store was closed or has no row are zeros with the 'Open'
+    channel set to 0. The windows are then a `sliding_window_view` over the day axis of
+    that grid: a strided view that copies nothing and, because stores are a separate
+    axis, never crosses from one store into the next. Only the (store, start) pairs of
+    valid windows are kept, and `batches` gathers the windows of one batch at a time,
+    so the full (windows x lookback x channels) tensor is never built.
+
+    A window is valid when it lies inside the store's observed date range and, with
+    `skip_closed_targets`, when the store is open on every target day.
+
+    Attributes
+    ----------
+    stores : np.ndarray
+        Store ids, in grid order.
+    dates : pd.DatetimeIndex
+        Calendar days of the grid.
+    channels : list
+        Input channels: the target, 'Open', then the exogenous columns.
+    grid : np.ndarray
+        Dense values of shape (n_stores, n_days, n_channels).
+    windows : np.ndarray
+        Read-only view of shape (n_stores, n_starts, lookback, n_channels).
+    window_store, window_start : np.ndarray
+        Grid store index and start day of every valid window.
+    """
+
+    def __init__(self, data, lookback=10, horizons=(1,), target_column='Sales',
+                 exog_columns=('Promo', 'SchoolHoliday', 'StateHoliday'), store_column='Store',
+                 date_column='Date', skip_closed_targets=True, dtype=np.float32):
+        """
+        Parameters
+        ----------
+        data : pd.DataFrame
+            Store-day rows with the store, date, target and exogenous columns. The date may
+            be a column or the index (as in train_processed.csv).
+        lookback : int
+            Number of days in each input window.
+        horizons : sequence of int
+            Days ahead of the last window day to predict (1 is the next day).
+        target_column : str
+            Column predicted, also used as the first input channel.
+        exog_columns : sequence of str
+            Additional input channels, such as promotions and holidays.
+        store_column : str
+            Column identifying the store.
+        date_column : str
+            Column (or index name) holding the date.
+        skip_closed_targets : bool
+            Drop windows whose target days include a day the store was closed.
+        dtype : numpy dtype
+            Data type of the grid and the batches.
+        """
+        self.lookback = int(lookback)
+        self.horizons = np.asarray(sorted(horizons), dtype=np.int64)
+        if self.lookback < 1 or len(self.horizons) == 0 or self.horizons[0] < 1:
+            raise ValueError("lookback and horizons must be positive.")
+        self.target_column = target_column
+        self.exog_columns = list(exog_columns)
+        self.channels = [target_column, 'Open'] + self.exog_columns
+
+        dates = pd.to_datetime(data[date_column] if date_column in data.columns
+                               else data.index.get_level_values(date_column))
+        day_numbers = dates.to_numpy().astype('datetime64[D]').astype(np.int64)
+        first_day = day_numbers.min()
+        day_index = day_numbers - first_day
+        n_days = int(day_index.max()) + 1
+        self.dates = pd.date_range(pd.Timestamp(first_day, unit='D'), periods=n_days, freq='D')
+
+        self.stores, store_index = np.unique(data[store_column].to_numpy(), return_inverse=True)
+        n_stores = len(self.stores)
+
+        # Scatter the rows into the dense grid; closed and missing days stay zero
+        self.grid = np.zeros((n_stores, n_days, len(self.channels)), dtype=dtype)
+        self.grid[store_index, day_index, 0] = data[target_column].to_numpy(dtype=dtype)
+        is_open = data['Open'].to_numpy(dtype=dtype) if 'Open' in data.columns else 1
+        self.grid[store_index, day_index, 1] = is_open
+        for channel, column in enumerate(self.exog_columns, start=2):
+            self.grid[store_index, day_index, channel] = data[column].to_numpy(dtype=dtype)
+
+        first = np.full(n_stores, n_days, dtype=np.int64)
+        last = np.full(n_stores, -1, dtype=np.int64)
+        np.minimum.at(first, store_index, day_index)
+        np.maximum.at(last, store_index, day_index)
+
+        max_horizon = int(self.horizons[-1])
+        n_starts = n_days - self.lookback - max_horizon + 1
+        if n_starts < 1:
+            raise ValueError("The history is shorter than lookback + the largest horizon.")
+
+        self.windows = sliding_window_view(self.grid, self.lookback, axis=1).transpose(0, 1, 3, 2)[:, :n_starts]
+
+        # A window starting at day t uses days t .. t+lookback-1 and predicts day t+lookback-1+h
+        starts = np.arange(n_starts)
+        valid = (starts[None, :] >= first[:, None]) & (starts[None, :] + self.lookback - 1 + max_horizon <= last[:, None])
+        if skip_closed_targets:
+            for horizon in self.horizons:
+                target_days = starts + self.lookback - 1 + horizon
+                valid &= self.grid[:, target_days, 1] > 0
+        self.window_store, self.window_start = np.nonzero(valid)
+
+    def __len__(self):
+        return len(self.window_store)
+
+    def _targets(self, store_index, start):
+        target_days = start[:, None] + self.lookback - 1 + self.horizons[None, :]
+        return self.grid[store_index[:, None], target_days, 0]
+
+    def batches(self, batch_size=256, shuffle=False, seed=None):
+        """
+        Yields (X, y) batches: X of shape (batch, lookback, n_channels) and y of shape
+        (batch, n_horizons). Only the windows of the current batch are copied.
+
+        Parameters
+        ----------
+        batch_size : int
+            Number of windows per batch.
+        shuffle : bool
+            Visit the windows in random order.
+        seed : int or None
+            Seed for the shuffle.
+        """
+        order = np.arange(len(self))
+        if shuffle:
+            np.random.default_rng(seed).shuffle(order)
+        for offset in range(0, len(order), batch_size):
+            batch = order[offset:offset + batch_size]
+            store_index, start = self.window_store[batch], self.window_start[batch]
+            yield self.windows[store_index, start], self._targets(store_index, start)
+
+    def store_arrays(self, store):
+        """Returns (X, y) for every valid window of one store, e.g. for a single-store model."""
+        position = np.searchsorted(self.stores, store)
+        if position == len(self.stores) or self.stores[position] != store:
+            raise KeyError(f"Unknown store {store}.")
+        selected = self.window_store == position
+        store_index, start = self.window_store[selected], self.window_start[selected]
+        return self.windows[store_index, start], self._targets(store_index, start)
+
+    def target_dates(self, horizon=None):
+        """Returns the date predicted by every valid window, for `horizon` (default the first)."""
+        horizon = self.horizons[0] if horizon is None else horizon
+        return self.dates[self.window_start + self.lookback - 1 + horizon]
@@ -0,0 +1,9 @@
+import os
+import sys
+
+# The scripts and the API use flat imports between their modules
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+for directory in ['scripts', 'API']:
+    path = os.path.join(ROOT, directory)
+    if path not in sys.path:
+        sys.path.insert(0, path)
@@ -0,0 +1,22 @@
+import pandas as pd
+
+from data_preprocessing import ChunkedPreprocessor, DataPreprocessor
+from synthetic_data import write_dataset
+
+
+def test_chunked_preprocessor_matches_in_memory_pipeline(tmp_path):
+    # 50 stores over ~1,000 days: every date repeats, and chunks split the history mid-store
+    paths = write_dataset(str(tmp_path / 'data'), 50_000, n_stores=50)
+
+    preprocessor = DataPreprocessor(paths['train_cleaned'], paths['test_cleaned'], paths['test'])
+    preprocessor.preprocess()
+    preprocessor.save_data(str(tmp_path / 'train.csv'), str(tmp_path / 'test.csv'))
+
+    chunked = ChunkedPreprocessor(paths['train_cleaned'], chunksize=7_000)
+    chunked.fit()
+    rows = chunked.process(str(tmp_path / 'train_chunked.csv'))
+
+    expected = pd.read_csv(tmp_path / 'train.csv')
+    assert rows == len(expected)
+    pd.testing.assert_frame_equal(pd.read_csv(tmp_path / 'train_chunked.csv'), expected)
+    assert chunked.transformer.feature_columns_ == preprocessor.transformer.feature_columns_
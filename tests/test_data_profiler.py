@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+from matplotlib.cbook import boxplot_stats
+
+from data_profiler import DataProfiler
+
+
+def test_whiskers_match_a_standard_boxplot():
+    rng = np.random.default_rng(0)
+    values = np.concatenate([rng.normal(100, 10, 5_000), [0.0, 5.0, 300.0]])
+    profile = DataProfiler(chunksize=700).profile(pd.DataFrame({'x': values}))
+
+    expected = boxplot_stats(values)[0]
+    for key in ['q1', 'med', 'q3', 'whislo', 'whishi']:
+        assert profile.loc['x', 'median' if key == 'med' else key] == expected[key]
+    assert profile.loc['x', 'outliers'] == len(expected['fliers'])
+
+
+def test_profile_is_exact_while_values_fit_in_the_reservoir():
+    rng = np.random.default_rng(1)
+    values = rng.gamma(2.0, 1_000.0, 9_000)
+    values[::10] = np.nan
+    df = pd.DataFrame({'x': values, 'flag': rng.integers(0, 2, 9_000), 'label': 'a'})
+    profile = DataProfiler(chunksize=1_000, sample_size=10_000).profile(df)
+
+    present = values[~np.isnan(values)]
+    q1, median, q3 = np.quantile(present, [0.25, 0.5, 0.75])
+    row = profile.loc['x']
+    assert (row['rows'], row['nulls'], row['null_pct']) == (9_000, 900, 10.0)
+    assert (row['min'], row['max']) == (present.min(), present.max())
+    assert np.isclose(row['mean'], present.mean())
+    assert (row['q1'], row['median'], row['q3']) == (q1, median, q3)
+    assert row['outliers'] == np.sum((present < q1 - 1.5 * (q3 - q1)) | (present > q3 + 1.5 * (q3 - q1)))
+    assert row['exact']
+    assert np.isnan(profile.loc['label', 'mean'])
+
+    sampled = DataProfiler(chunksize=1_000, sample_size=1_000).profile(df)
+    assert not sampled.loc['x', 'exact']
+    assert (sampled.loc['x', 'min'], sampled.loc['x', 'max']) == (present.min(), present.max())
+
+
+def test_mixed_chunk_types_are_reported_as_object():
+    chunks = [pd.DataFrame({'StateHoliday': [0, 0]}), pd.DataFrame({'StateHoliday': ['0', 'a']})]
+    row = DataProfiler().profile(iter(chunks)).loc['StateHoliday']
+    assert row['dtype'] == 'object'
+    assert row['mixed_types']
+
+
+def test_compare_lists_mismatched_and_one_sided_columns():
+    profiler = DataProfiler()
+    train = profiler.profile(pd.DataFrame({'Store': [1, 2], 'Open': [1, 0], 'Sales': [5, 6]}))
+    test = profiler.profile(pd.DataFrame({'Store': [1, 2], 'Open': [1.0, np.nan], 'Id': [1, 2]}))
+
+    differences = DataProfiler.compare(train, test)
+    assert differences['issue'].to_dict() == {
+        'Open': 'dtype mismatch', 'Sales': 'missing in test', 'Id': 'missing in train'}
+    assert differences.loc['Open', ['train_dtype', 'test_dtype']].tolist() == ['int64', 'float64']
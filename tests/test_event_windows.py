@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from event_windows import EventWindowLift
+
+
+@pytest.fixture
+def data():
+    dates = pd.date_range('2015-01-01', periods=10)
+    rows = []
+    # Store 1: a holiday on day 5, with sales of 150, 200 and 120 around it and 100 otherwise
+    for day, date in enumerate(dates):
+        sales = {4: 150, 5: 200, 6: 120}.get(day, 100)
+        rows.append((1, date, sales, 1, 'a' if day == 5 else '0'))
+    # Store 2: a two-day holiday at the start of the history, closed on day 7
+    for day, date in enumerate(dates):
+        sales = {0: 80, 1: 90}.get(day, 100)
+        rows.append((2, date, sales if day != 7 else 0, int(day != 7), 'b' if day < 2 else '0'))
+    # Store 3: never open, so it has no baseline
+    for day, date in enumerate(dates):
+        rows.append((3, date, 0, 0, 'c' if day == 5 else '0'))
+    return pd.DataFrame(rows, columns=['Store', 'Date', 'Sales', 'Open', 'StateHoliday'])
+
+
+@pytest.mark.filterwarnings('error')
+def test_lift_matches_hand_computed_example(data):
+    lift = EventWindowLift(data, event='holiday', window=1)
+
+    assert lift.event_store.tolist() == [1, 2, 3]
+    assert lift.event_date.strftime('%Y-%m-%d').tolist() == ['2015-01-06', '2015-01-01', '2015-01-06']
+    # Baselines exclude the days within one day of an event and closed days
+    np.testing.assert_array_equal(lift.baseline.to_numpy(), [100.0, 100.0, np.nan])
+
+    np.testing.assert_allclose(lift.lift[0], [0.5, 1.0, 0.2])
+    np.testing.assert_allclose(lift.lift[1], [np.nan, -0.2, -0.1])
+    assert np.isnan(lift.lift[2]).all()
+    np.testing.assert_allclose(lift.lift_by_offset().to_numpy(), [0.5, 0.4, 0.05])
+    np.testing.assert_allclose(lift.lift_by_store().loc[2].to_numpy(), [np.nan, -0.2, -0.1])
+
+
+@pytest.mark.filterwarnings('error')
+def test_offsets_without_any_sales_are_nan_without_warnings(data):
+    lift = EventWindowLift(data[data['Store'] != 1], event='holiday', window=1)
+    np.testing.assert_allclose(lift.lift_by_offset().to_numpy(), [np.nan, -0.2, -0.1])
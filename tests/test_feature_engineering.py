@@ -0,0 +1,8 @@
+import pandas as pd
+
+from benchmark_feature_engineering import make_frame, run_current, run_legacy
+
+
+def test_vectorized_features_match_legacy_implementation():
+    frame = make_frame(2_000, seed=7)
+    pd.testing.assert_frame_equal(run_current(frame.copy()), run_legacy(frame.copy()))
@@ -0,0 +1,39 @@
+import pandas as pd
+
+from feature_transformer import FeatureTransformer
+
+
+def test_is_holiday_treats_integer_and_string_zero_alike():
+    df = pd.DataFrame({
+        'Store': [1, 1, 2, 2, 3],
+        'StateHoliday': [0, '0', 'a', 0, 'b'],
+        'SchoolHoliday': [0, 0, 0, 1, 0],
+        'Promo': [1, 0, 1, 1, 0],
+    })
+    FeatureTransformer().add_holiday_and_promo_features(df, continue_promo=False)
+    assert df['IsHoliday'].tolist() == [0, 0, 1, 1, 1]
+
+
+def test_is_holiday_with_integer_column():
+    df = pd.DataFrame({'Store': [1, 2], 'StateHoliday': [0, 0], 'SchoolHoliday': [0, 1], 'Promo': [0, 0]})
+    FeatureTransformer().add_holiday_and_promo_features(df, continue_promo=False)
+    assert df['IsHoliday'].tolist() == [0, 1]
+
+
+def test_datetime_features_from_categorical_dates():
+    # pd.to_datetime only goes through its cache, which keeps categoricals, for longer inputs
+    dates = ['2015-07-30', '2015-07-31'] * 50
+    df = pd.DataFrame({'Date': pd.Categorical(dates)})
+    FeatureTransformer().add_datetime_features(df)
+    expected = pd.DataFrame({'Date': pd.to_datetime(dates)})
+    FeatureTransformer().add_datetime_features(expected)
+    pd.testing.assert_frame_equal(df, expected)
+
+
+def test_promo_duration_continues_small_integer_promo_without_overflow():
+    df = pd.DataFrame({'Store': [1, 2] * 5, 'StateHoliday': '0', 'SchoolHoliday': 0, 'Promo': 1})
+    df = df.astype({'Store': 'int16', 'Promo': 'int8'})
+    transformer = FeatureTransformer()
+    transformer.promo_offsets_ = {1: 200.0, 2: 0.0}
+    transformer.add_holiday_and_promo_features(df)
+    assert df['Promo_duration'].tolist()[-2:] == [205, 5]
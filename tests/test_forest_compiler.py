@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+
+from forest_compiler import FlatForest
+
+
+@pytest.fixture(scope='module')
+def data():
+    rng = np.random.default_rng(0)
+    # Integer codes like most Rossmann features, and distances in whole meters, so every
+    # value is float32-representable as `compact` requires
+    X = pd.DataFrame({
+        'Store': rng.integers(1, 1116, 2_000),
+        'DayOfWeek': rng.integers(1, 8, 2_000),
+        'Promo': rng.integers(0, 2, 2_000),
+        'CompetitionDistance': rng.gamma(2.0, 2_000.0, 2_000).round(),
+    })
+    y = 5_000 + 300 * X['DayOfWeek'] + 2_000 * X['Promo'] + rng.normal(0, 500, 2_000)
+    return X, y
+
+
+@pytest.fixture(scope='module')
+def pipeline(data):
+    X, y = data
+    model = Pipeline([('scaler', StandardScaler()),
+                      ('model', RandomForestRegressor(n_estimators=10, min_samples_leaf=2, random_state=0, n_jobs=1))])
+    return model.fit(X, y)
+
+
+def test_predictions_are_bit_identical_to_the_pipeline(pipeline, data):
+    X, _ = data
+    flat = FlatForest.from_pipeline(pipeline)
+    assert np.array_equal(flat.predict(X), pipeline.predict(X))
+    assert np.array_equal(flat.predict(X.to_numpy()), pipeline.predict(X))
+
+
+def test_save_load_round_trip(pipeline, data, tmp_path):
+    X, _ = data
+    flat = FlatForest.from_pipeline(pipeline)
+    flat.save(tmp_path / 'forest.npz')
+    loaded = FlatForest.load(tmp_path / 'forest.npz')
+
+    assert loaded.feature_names == list(X.columns)
+    assert np.array_equal(loaded.predict(X), pipeline.predict(X))
+
+
+@pytest.mark.parametrize('value_bits', [None, 8, 16])
+def test_compact_forest_round_trips_through_a_mapped_file(pipeline, data, tmp_path, value_bits):
+    X, _ = data
+    compact = FlatForest.from_pipeline(pipeline).compact(value_bits=value_bits)
+    compact.save_mapped(tmp_path / 'forest.forest')
+    loaded = FlatForest.load_mapped(tmp_path / 'forest.forest')
+
+    assert isinstance(loaded.left, np.memmap)
+    for name in ['feature', 'threshold', 'left', 'right', 'value', 'roots']:
+        assert getattr(loaded, name).dtype == getattr(compact, name).dtype
+        assert np.array_equal(getattr(loaded, name), getattr(compact, name))
+    assert loaded.feature_names == compact.feature_names
+    assert np.array_equal(loaded.predict(X), compact.predict(X))
+
+
+def test_compact_float32_forest_keeps_every_split(pipeline, data):
+    X, _ = data
+    flat = FlatForest.from_pipeline(pipeline)
+    compact = flat.compact()
+    assert np.array_equal(compact.apply(X), flat.apply(X))
+    np.testing.assert_allclose(compact.predict(X), flat.predict(X), rtol=1e-6)
+
+
+def test_load_mapped_rejects_other_files(tmp_path):
+    (tmp_path / 'model.pkl').write_bytes(b'not a forest')
+    with pytest.raises(ValueError):
+        FlatForest.load_mapped(tmp_path / 'model.pkl')
+
+
+@pytest.mark.parametrize('tolerance', [0.0, 50.0, 500.0])
+def test_prune_changes_predictions_by_at_most_its_tolerance(pipeline, data, tolerance):
+    X, _ = data
+    flat = FlatForest.from_pipeline(pipeline)
+    pruned = flat.prune(tolerance)
+
+    assert pruned.n_nodes <= flat.n_nodes
+    assert np.abs(pruned.predict(X) - flat.predict(X)).max() <= tolerance + 1e-9
+    if tolerance == 500.0:
+        assert pruned.n_nodes < flat.n_nodes
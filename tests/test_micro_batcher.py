@@ -0,0 +1,68 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from micro_batcher import MicroBatcher
+
+
+class SumModel:
+    def predict(self, features):
+        return features.sum(axis=1)
+
+
+class FailingModel:
+    def predict(self, features):
+        raise ValueError('no model for this store')
+
+
+def test_single_request_is_not_delayed():
+    batcher = MicroBatcher(max_wait=1.0)
+    for _ in range(3):
+        start = time.monotonic()
+        assert batcher.predict(SumModel(), [[1.0, 2.0]]).tolist() == [3.0]
+        assert time.monotonic() - start < 0.5
+        assert batcher._in_flight == 0
+
+
+def test_failed_request_is_not_counted():
+    batcher = MicroBatcher(max_wait=1.0)
+    with pytest.raises(ValueError):
+        batcher.predict(FailingModel(), [[1.0]])
+    assert batcher._in_flight == 0
+
+    start = time.monotonic()
+    batcher.predict(SumModel(), [[1.0]])
+    assert time.monotonic() - start < 0.5
+
+
+def test_interrupted_submit_is_not_counted():
+    batcher = MicroBatcher(max_wait=1.0)
+    batcher.predict(SumModel(), [[1.0]])
+
+    def interrupted_put(request):
+        raise KeyboardInterrupt
+
+    batcher._queue.put = interrupted_put
+    with pytest.raises(KeyboardInterrupt):
+        batcher.predict(SumModel(), [[1.0]])
+    assert batcher._in_flight == 0
+
+
+def test_concurrent_callers_get_their_own_rows():
+    batcher = MicroBatcher(max_wait=0.05)
+    results = {}
+
+    def call(i):
+        results[i] = batcher.predict(SumModel(), [[i, 1.0], [i, 2.0]])
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    for i in range(16):
+        np.testing.assert_array_equal(results[i], [i + 1.0, i + 2.0])
+    assert batcher._in_flight == 0
@@ -0,0 +1,100 @@
+import sqlite3
+
+import numpy as np
+import pytest
+
+from prediction_cache import PredictionCache
+
+
+class CountingModel:
+    def __init__(self):
+        self.rows = 0
+
+    def predict(self, features):
+        self.rows += len(features)
+        return features.sum(axis=1)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return PredictionCache(str(tmp_path / 'cache.sqlite'), max_entries=100, ttl=60.0, stats_interval=0.0)
+
+
+def test_repeated_rows_are_hits(cache):
+    model = CountingModel()
+    features = np.arange(12, dtype=float).reshape(6, 2)
+    np.testing.assert_array_equal(cache.predict(model, features, 'v1'), features.sum(axis=1))
+    np.testing.assert_array_equal(cache.predict(model, features[::-1], 'v1'), features[::-1].sum(axis=1))
+
+    assert model.rows == 6
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['entries']) == (6, 6, 6)
+
+
+def test_equal_rows_share_a_key():
+    assert PredictionCache.keys([[-0.0, np.nan]], 'v1') == PredictionCache.keys([[0.0, float('nan')]], 'v1')
+    assert PredictionCache.keys([[1.0, 2.0]], 'v1') != PredictionCache.keys([[1.0, 2.0]], 'v2')
+
+
+def test_new_version_invalidates_old_entries(cache):
+    model = CountingModel()
+    features = np.arange(12, dtype=float).reshape(4, 3)
+    cache.predict(model, features, 'v1')
+    cache.predict(model, features, 'v2')
+
+    assert model.rows == 8
+    assert cache.stats()['entries'] == 4
+    _, missing = cache.get_many(cache.keys(features, 'v1'), 'v2')
+    assert missing.all()
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = PredictionCache(str(tmp_path / 'cache.sqlite'), max_entries=100, ttl=60.0, stats_interval=0.0)
+    model = CountingModel()
+    first = np.arange(50, dtype=float).reshape(-1, 1)
+    cache.predict(model, first, 'v1')
+    # Make the first rows stale enough for a hit to refresh their last-use time
+    cache._connection().execute('UPDATE predictions SET used = used - 60')
+    cache.predict(model, first[:10], 'v1')
+    cache.predict(model, np.arange(100, 160, dtype=float).reshape(-1, 1), 'v1')
+
+    stats = cache.stats()
+    assert stats['entries'] == 100
+    assert stats['evictions'] == 10
+    _, missing = cache.get_many(cache.keys(first, 'v1'), 'v1')
+    # The recently read rows survive; ten of the stale ones were evicted
+    assert not missing[:10].any()
+    assert missing[10:].sum() == 10
+
+
+def test_expired_entries_are_misses(tmp_path):
+    cache = PredictionCache(str(tmp_path / 'cache.sqlite'), ttl=-1.0)
+    model = CountingModel()
+    cache.predict(model, np.ones((2, 2)), 'v1')
+    cache.predict(model, np.ones((2, 2)), 'v1')
+    assert model.rows == 4
+
+
+def test_sqlite_errors_fall_back_to_the_model(tmp_path):
+    cache = PredictionCache(str(tmp_path / 'missing' / 'cache.sqlite'))
+    with pytest.raises(sqlite3.Error):
+        cache._connection()
+
+    model = CountingModel()
+    features = np.ones((3, 2))
+    np.testing.assert_array_equal(cache.predict(model, features, 'v1'), [2.0, 2.0, 2.0])
+    np.testing.assert_array_equal(cache.predict(model, features, 'v1'), [2.0, 2.0, 2.0])
+    assert model.rows == 6
+    assert cache.stats()['entries'] is None
+
+
+def test_cache_is_opt_in_and_scoped_to_the_app(monkeypatch):
+    monkeypatch.delenv('PREDICTION_CACHE', raising=False)
+    monkeypatch.delenv('PREDICTION_CACHE_PATH', raising=False)
+    assert PredictionCache.from_env(namespace='/srv/a/models') is None
+
+    monkeypatch.setenv('PREDICTION_CACHE', '1')
+    first = PredictionCache.from_env(namespace='/srv/a/models')
+    second = PredictionCache.from_env(namespace='/srv/b/models')
+    assert first.path != second.path
+    assert first.path == PredictionCache.from_env(namespace='/srv/a/models').path
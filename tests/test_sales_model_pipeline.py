@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from feature_transformer import FeatureTransformer
+from sales_model_pipeline import SalesModel
+from synthetic_data import write_dataset
+
+
+@pytest.fixture
+def model_and_new_days(tmp_path):
+    history = pd.read_csv(write_dataset(str(tmp_path), 6_000, n_stores=10)['train_cleaned'], low_memory=False)
+    history = history.sort_values('Date', kind='stable')
+    cutoff = history['Date'].unique()[-30]
+    old, new = history[history['Date'] < cutoff], history[history['Date'] >= cutoff]
+
+    model = SalesModel()
+    model.model_pipeline.set_params(model__n_estimators=5, model__n_jobs=1)
+    model.transformer = FeatureTransformer().fit(old[old['Open'] == 1])
+    processed = model.transformer.transform(old[old['Open'] == 1], continue_promo=False)
+    columns = model._feature_columns(processed, 'Sales')
+    model.model_pipeline.fit(processed[columns], processed['Sales'])
+    return model, new
+
+
+def test_update_model_advances_promo_counts_after_fitting(model_and_new_days):
+    model, new = model_and_new_days
+    offsets = dict(model.transformer.promo_offsets_)
+    model.update_model(new, n_new_trees=3, replace_oldest=True)
+
+    assert len(model.model_pipeline[-1].estimators_) == 5
+    opened = new[new['Open'] == 1]
+    for store, promo_days in opened.groupby('Store')['Promo'].sum().items():
+        assert model.transformer.promo_offsets_[store] == offsets[store] + promo_days
+
+
+def test_failed_update_leaves_model_and_transformer_unchanged(model_and_new_days):
+    model, new = model_and_new_days
+    new = new.assign(Sales=np.nan)
+    forest = model.model_pipeline[-1]
+    estimators, offsets = list(forest.estimators_), dict(model.transformer.promo_offsets_)
+
+    with pytest.raises(ValueError):
+        model.update_model(new, n_new_trees=3, replace_oldest=True)
+
+    assert forest.estimators_ == estimators
+    assert forest.n_estimators == 5
+    assert not forest.warm_start
+    assert model.transformer.promo_offsets_ == offsets